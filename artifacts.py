@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# 文件名: artifacts.py
+# 生成产物按内容哈希命名 (cover-<hash>.jpg / news-<hash>.html)：内容变了 URL 就变，
+# 同一 URL 的内容永远不变，浏览器与 RPA 页面可以放心长期缓存
+
+import hashlib
+import os
+import re
+
+# ================= ⚙️ 配置区域 =================
+HASH_LEN = 16                       # sha256 前 16 位 hex (64 bit)，同一任务目录内足够区分
+IMMUTABLE_MAX_AGE = 365 * 86400     # 哈希命名产物的缓存时长 (秒)
+
+_RE_HASHED = re.compile(r'-([0-9a-f]{%d})\.[a-z0-9]+$' % HASH_LEN)
+
+
+def content_digest(data):
+    return hashlib.sha256(data).hexdigest()[:HASH_LEN]
+
+
+def write_artifact(out_dir, stem, ext, data):
+    """写入 <stem>-<哈希>.<ext> 并返回文件名；同名文件已存在说明内容相同，直接复用"""
+    fn = f"{stem}-{content_digest(data)}.{ext}"
+    path = os.path.join(out_dir, fn)
+    if not os.path.exists(path):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f: f.write(data)
+        os.replace(tmp, path)
+    return fn
+
+
+def artifact_digest(filename):
+    """哈希命名产物返回文件名里的哈希 (即强 ETag)；其他文件返回 None"""
+    m = _RE_HASHED.search(filename)
+    return m.group(1) if m else None
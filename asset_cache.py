@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+# 文件名: asset_cache.py
+# 进程级素材缓存：底图 / 字体 / Header GIF 只解码一次
+
+import base64
+import os
+import threading
+from PIL import Image, ImageFont
+
+
+class AssetRegistry:
+    """
+    素材注册表
+    以 (类型, 路径, 尺寸) 为键缓存解码结果；每次取用时比对文件 mtime/size，
+    素材被替换后自动重新加载。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> (stamp, value)
+
+    @staticmethod
+    def _stamp(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _get(self, key, path, loader):
+        stamp = self._stamp(path)
+        if stamp is None: return None
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit and hit[0] == stamp: return hit[1]
+        value = loader()
+        with self._lock:
+            self._entries[key] = (stamp, value)
+        return value
+
+    def background(self, path, size):
+        """底图：RGBA 并预缩放到 size，返回可随意绘制的副本；文件不存在返回 None"""
+        def load():
+            with Image.open(path) as img:
+                return img.convert("RGBA").resize(size)
+        img = self._get(("bg", path, tuple(size)), path, load)
+        return img.copy() if img is not None else None
+
+    def font(self, path, size):
+        """TrueType 字体 (只读共享，不复制)；文件不存在时与 truetype 一样抛 OSError"""
+        font = self._get(("font", path, size), path, lambda: ImageFont.truetype(path, size))
+        if font is None: raise OSError(f"cannot open resource: {path}")
+        return font
+
+    def base64(self, path):
+        """文件的 Base64 文本；文件不存在返回空串"""
+        def load():
+            with open(path, "rb") as f:
+                return base64.b64encode(f.read()).decode('utf-8')
+        return self._get(("b64", path), path, load) or ""
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# 进程内唯一实例
+assets = AssetRegistry()
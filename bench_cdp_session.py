@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发布准备耗时基准：每次新建 Playwright + CDP 连接 vs 常驻 CDPSession
+
+用法: python bench_cdp_session.py [--rounds 5] [--cdp http://localhost:9222]
+- 需要已用 --remote-debugging-port 启动并登录公众号后台的 Chrome
+- 只测准备阶段 (连接 + 取得编辑器页)，不做任何发布操作
+- cold：每轮新建会话 (旧流程的开销)；pooled：同一会话连续取页 (连接复用)
+"""
+
+import argparse
+import statistics
+
+import wechat_rpa
+
+
+def noop(context, page, timings, waits, tracer):
+    return page.url
+
+
+def measure(session, rounds):
+    return [session.run(noop)[1] for _ in range(rounds)]
+
+
+def report(name, samples):
+    setup = [t["setup_ms"] for t in samples]
+    connect = [t["connect_ms"] for t in samples]
+    print(f"{name:<7} setup 中位 {statistics.median(setup):>6.0f}ms  最大 {max(setup):>6}ms  "
+          f"| connect 中位 {statistics.median(connect):>6.0f}ms  复用 {sum(t['reused_connection'] for t in samples)}/{len(samples)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="发布准备耗时基准")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--cdp", default=wechat_rpa.CDP_URL)
+    args = parser.parse_args()
+
+    cold = []
+    for _ in range(args.rounds):
+        session = wechat_rpa.CDPSession(args.cdp, warm=False)
+        cold += measure(session, 1)
+        session.shutdown()
+
+    session = wechat_rpa.CDPSession(args.cdp, warm=False)
+    pooled = measure(session, args.rounds + 1)[1:]  # 第一轮是建连，不计
+    session.shutdown()
+
+    report("cold", cold)
+    report("pooled", pooled)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+news.html 体积与粘贴耗时对比 (inline vs link 图片模式)
+
+用法: python bench_html_size.py [--content content.txt] [--repeat 5]
+- 体积：HTML 总字节、gzip 后字节
+- 生成：generate_html_file 耗时 (inline 模式 header.gif 的 Base64 走素材缓存)
+- 粘贴：若本机装有 Playwright Chromium，把 #wechat-content 用 insertHTML 写入
+  contenteditable 区域并计时 (模拟编辑器粘贴)；未安装则跳过
+"""
+
+import argparse
+import gzip
+import os
+import re
+import tempfile
+import time
+
+import server
+
+PASTE_JS = """(html) => {
+    const box = document.createElement('div');
+    box.contentEditable = 'true';
+    document.body.appendChild(box);
+    box.focus();
+    const t0 = performance.now();
+    document.execCommand('insertHTML', false, html);
+    const ms = performance.now() - t0;
+    box.remove();
+    return ms;
+}"""
+
+
+def build(content, mode, out_dir, repeat):
+    title = content.strip().split("\n")[0]
+    info = server.parse_info_from_title(title)
+    info['keywords'] = []  # 只比较 HTML，不联网搜 Logo
+    cover = server.generate_cover_image(info, out_dir)
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn = server.generate_html_file(title, content, cover_image_filename=cover, out_dir=out_dir, image_mode=mode)
+        best = min(best, time.perf_counter() - t0)
+    with open(os.path.join(out_dir, fn), encoding="utf-8") as f:
+        return f.read(), best
+
+
+def paste_times(fragments, repeat):
+    try:
+        from playwright.sync_api import sync_playwright
+        with sync_playwright() as p:
+            browser = p.chromium.launch()
+            page = browser.new_page()
+            page.set_content("<html><body></body></html>")
+            result = {mode: min(page.evaluate(PASTE_JS, html) for _ in range(repeat)) for mode, html in fragments.items()}
+            browser.close()
+            return result
+    except Exception as e:
+        print(f"⚠️ 跳过粘贴计时 (需要 Playwright Chromium): {str(e).splitlines()[0]}")
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="news.html 体积与粘贴耗时对比")
+    parser.add_argument("--content", default=os.path.join(server.BASE_DIR, "content.txt"))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    with open(args.content, encoding="utf-8") as f: content = f.read()
+
+    rows, fragments = {}, {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in server.HTML_IMAGE_MODES:
+            out_dir = os.path.join(tmp, mode)
+            os.makedirs(out_dir)
+            html, gen_s = build(content, mode, out_dir, args.repeat)
+            rows[mode] = (len(html.encode("utf-8")), len(gzip.compress(html.encode("utf-8"))), gen_s)
+            m = re.search(r'<section id="wechat-content".*</section>', html, re.S)
+            fragments[mode] = m.group(0) if m else html
+    pastes = paste_times(fragments, args.repeat)
+
+    print(f"{'模式':>8} | {'HTML 字节':>12} | {'gzip 字节':>10} | {'生成耗时':>9} | {'粘贴耗时':>9}")
+    print("-" * 62)
+    for mode, (size, gz, gen_s) in rows.items():
+        paste = f"{pastes[mode]:.1f}ms" if mode in pastes else "-"
+        print(f"{mode:>8} | {size:>12,} | {gz:>10,} | {gen_s*1000:>7.1f}ms | {paste:>9}")
+    inline, link = rows["inline"][0], rows["link"][0]
+    print(f"\nlink 模式体积为 inline 的 {link / inline:.1%} (减少 {inline - link:,} 字节)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动耗时预算检查 (python -X importtime)
+
+用法: python bench_import_time.py [--repeat 5] [--top 8] [--budget server=300,main=120]
+- 每个入口模块在全新解释器里导入 repeat 次，取累计耗时中位数，与预算比较
+- 检查重依赖 (Playwright / 搜索 / numpy / pangu / requests) 没有在导入阶段被加载
+- 列出自身耗时最高的模块，方便定位新引入的慢导入
+超预算或重依赖被提前加载时以非 0 退出，可直接放进 CI
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ================= ⚙️ 预算 =================
+IMPORT_BUDGET_MS = {"server": 300, "main": 120}
+# 只允许在首次使用时加载的重依赖
+DEFERRED_MODULES = ("playwright", "duckduckgo_search", "numpy", "pangu", "requests", "wechat_rpa")
+
+
+def import_profile(module):
+    """在子进程中导入 module，返回 {模块名: (自身 µs, 累计 µs)}"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=BASE_DIR, capture_output=True, text=True)
+    if proc.returncode != 0: raise SystemExit(f"❌ import {module} 失败:\n{proc.stderr[-2000:]}")
+    profile = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line: continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = (int(self_us), int(cum_us))
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动耗时预算检查")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8)
+    parser.add_argument("--budget", default="", help="覆盖预算，如 server=300,main=120 (毫秒)")
+    args = parser.parse_args()
+    budgets = dict(IMPORT_BUDGET_MS)
+    for item in filter(None, args.budget.split(",")):
+        name, ms = item.split("=")
+        budgets[name.strip()] = int(ms)
+
+    failed = False
+    for module, budget in budgets.items():
+        runs = [import_profile(module) for _ in range(args.repeat)]
+        total_ms = statistics.median(r[module][1] for r in runs) / 1000
+        last = runs[-1]
+        early = sorted({name.split(".")[0] for name in last} & set(DEFERRED_MODULES))
+        ok = total_ms <= budget and not early
+        failed |= not ok
+        print(f"{'✅' if ok else '❌'} {module}: {total_ms:.1f}ms (预算 {budget}ms，{args.repeat} 次中位数)")
+        if early: print(f"   ⚠️ 导入阶段加载了重依赖: {', '.join(early)}")
+        for name, (self_us, _) in sorted(last.items(), key=lambda kv: -kv[1][0])[:args.top]:
+            print(f"   {self_us/1000:>7.1f}ms  {name}")
+    if failed: raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
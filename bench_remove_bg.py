@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+去白底性能基准
+对比旧版逐像素循环与 image_ops.remove_white_bg_native，
+同时校验两者输出逐字节一致。
+
+用法: python bench_remove_bg.py [--sizes 500,1000,2000] [--repeat 3]
+"""
+
+import argparse
+import random
+import time
+from PIL import Image, ImageDraw
+
+from image_ops import remove_white_bg_native
+
+
+def legacy_remove_white_bg(img, threshold=245):
+    """旧版实现 (逐像素 Python 循环)，仅用于对照"""
+    if img.mode != 'RGBA': img = img.convert('RGBA')
+    datas = img.getdata()  # 保持旧版原样
+    new_data = []
+    for item in datas:
+        if item[0] > threshold and item[1] > threshold and item[2] > threshold:
+            new_data.append((255, 255, 255, 0))
+        else:
+            new_data.append(item)
+    clean_img = Image.new("RGBA", img.size)
+    clean_img.putdata(new_data)
+    bbox = clean_img.getbbox()
+    return clean_img.crop(bbox) if bbox else clean_img
+
+
+def make_logo(width, seed=0):
+    """模拟真实 Logo：白底 + 彩色图形 + 抗锯齿文字 + 接近阈值的噪点"""
+    rnd = random.Random(seed)
+    height = max(1, width * 2 // 5)
+    img = Image.new("RGB", (width, height), (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x0, y0 = rnd.randint(0, width - 2), rnd.randint(0, height - 2)
+        x1, y1 = rnd.randint(x0 + 1, width), rnd.randint(y0 + 1, height)
+        color = tuple(rnd.randint(0, 255) for _ in range(3))
+        if rnd.random() < 0.5: draw.ellipse((x0, y0, x1, y1), fill=color)
+        else: draw.rectangle((x0, y0, x1, y1), fill=color)
+    draw.text((width // 10, height // 3), "LOGO Inc.", fill=(20, 20, 20))
+    # 阈值附近的浅色噪点，覆盖 > / <= 边界
+    px = img.load()
+    for _ in range(width * height // 50):
+        x, y = rnd.randrange(width), rnd.randrange(height)
+        v = rnd.randint(240, 255)
+        px[x, y] = (v, rnd.randint(240, 255), v)
+    return img.resize((width, height), Image.Resampling.LANCZOS)
+
+
+def bench(fn, img, repeat):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(img)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="去白底性能基准")
+    parser.add_argument("--sizes", default="500,1000,2000", help="Logo 宽度列表 (px)")
+    parser.add_argument("--repeat", type=int, default=3, help="每组重复次数 (取最快)")
+    args = parser.parse_args()
+
+    print(f"{'尺寸':>12} | {'旧版循环':>10} | {'通道运算':>10} | {'加速比':>7} | 一致")
+    print("-" * 60)
+    for width in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        logo = make_logo(width)
+        t_old, out_old = bench(legacy_remove_white_bg, logo, args.repeat)
+        t_new, out_new = bench(remove_white_bg_native, logo, args.repeat)
+        same = out_old.size == out_new.size and out_old.tobytes() == out_new.tobytes()
+        size = f"{logo.width}x{logo.height}"
+        print(f"{size:>12} | {t_old*1000:>8.1f}ms | {t_new*1000:>8.1f}ms | {t_old/t_new:>6.1f}x | {'✅' if same else '❌'}")
+        if not same: raise SystemExit(f"❌ 输出不一致: {size}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+正文排版性能基准
+对比旧版 generate_html_file 正文循环 (两遍扫描 + 字符串 += 拼接) 与 renderer 模块，
+在不同长度的生成文章上测量耗时，并校验输出一致。
+
+用法: python bench_renderer.py [--lines 200,2000,20000] [--no-pangu]
+  --no-pangu  把 pangu 替换为原样返回，只测分类与拼接本身
+"""
+
+import argparse
+import random
+import re
+import time
+
+import pangu
+
+import renderer
+
+S_H1, S_H2, S_H3, S_TXT, S_BOLD, S_META = "h1", "h2", "h3", "txt", "bold", "meta"
+
+SAMPLE_LINES = [
+    "## 交易概览",
+    "### 细节",
+    "核心洞察",
+    "美国人工智能公司 Anthropic 已聘请硅谷律所 Wilson Sonsini 开始为可能在 2026 年进行首次公开募股（IPO）做准备。",
+    "据披露，公司在 2025 年底前的年化收入运行速度有望达到约 20–26 亿美元，客户群覆盖逾 30 万家企业。",
+    "需求侧逻辑则反映了企业级客户对**大规模语言模型服务**的逐步认可，商业化应用的潜力正在兑现。",
+    "短标题",
+    "来源：路透社",
+    "",
+]
+
+
+def make_article(n_lines, seed=0):
+    rnd = random.Random(seed)
+    return "标题行\n" + "\n".join(rnd.choice(SAMPLE_LINES) for _ in range(n_lines))
+
+
+def legacy_body(content):
+    """旧版实现 (原 generate_html_file 正文部分)，仅用于对照"""
+    lines = content.strip().split('\n')
+    body_lines = lines[1:] if len(lines) > 1 else []
+    html_body = ""
+    header_depths = []
+    for line in body_lines:
+        m = re.match(r'^(#+)\s', line.strip())
+        if m: header_depths.append(len(m.group(1)))
+    min_depth = min(header_depths) if header_depths else 0
+    for line in body_lines:
+        line = line.strip()
+        if not line: continue
+        line = pangu.spacing_text(line)
+        if "来源" in line or "链接" in line or "http" in line:
+            html_body += f'<section style="{S_META}">{line}</section>'
+            continue
+        md_match = re.match(r'^(#+)\s(.*)', line)
+        if md_match:
+            depth = len(md_match.group(1))
+            clean_text = md_match.group(2)
+            relative_level = depth - min_depth + 1
+            if relative_level == 1: html_body += f'<section style="{S_H1}">{clean_text}</section>'
+            elif relative_level == 2: html_body += f'<section style="{S_H2}">{clean_text}</section>'
+            else: html_body += f'<section style="{S_H3}">{clean_text}</section>'
+            continue
+        if "Insights" in line or "核心洞察" in line:
+            html_body += f'<section style="{S_H1}">{line}</section>'
+            continue
+        if len(line) < 24 and not re.search(r'[，。！？、：；]$', line):
+            html_body += f'<section style="{S_H1}">{line}</section>'
+        else:
+            line = re.sub(r'\*\*(.*?)\*\*', f'<span style="{S_BOLD}">\\1</span>', line)
+            html_body += f'<section style="{S_TXT}">{line}</section>'
+    return html_body
+
+
+def new_body(content):
+    lines = content.strip().split('\n')
+    heading_styles = {1: S_H1, 2: S_H2}
+    def wrap(block):
+        if block.kind == renderer.META: style = S_META
+        elif block.kind == renderer.HEADING: style = heading_styles.get(block.level, S_H3)
+        elif block.kind == renderer.TEXT: style = S_TXT
+        else: style = S_H1
+        return f'<section style="{style}">', '</section>'
+    return renderer.render_blocks(renderer.parse_blocks(lines[1:]), wrap, bold_style=S_BOLD)
+
+
+def timed(fn, arg):
+    t0 = time.perf_counter()
+    out = fn(arg)
+    return time.perf_counter() - t0, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="正文排版性能基准")
+    parser.add_argument("--lines", default="200,2000,20000", help="文章行数列表")
+    parser.add_argument("--no-pangu", action="store_true", help="跳过 pangu，只测分类与拼接")
+    args = parser.parse_args()
+    if args.no_pangu: pangu.spacing_text = lambda s: s
+
+    print(f"{'行数':>8} | {'旧版':>10} | {'renderer':>10} | {'旧版 µs/行':>10} | {'新版 µs/行':>10} | 一致")
+    print("-" * 72)
+    for n in [int(s) for s in args.lines.split(",") if s.strip()]:
+        article = make_article(n)
+        t_old, out_old = timed(legacy_body, article)
+        t_new, out_new = timed(new_body, article)
+        same = out_old == out_new
+        print(f"{n:>8} | {t_old*1000:>8.1f}ms | {t_new*1000:>8.1f}ms | {t_old/n*1e6:>10.1f} | {t_new/n*1e6:>10.1f} | {'✅' if same else '❌'}")
+        if not same: raise SystemExit(f"❌ 输出不一致: {n} 行")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中英文空格基准：pangu.spacing_text vs spacing 模块 (快速路径 + LRU 缓存)
+
+用法: python bench_spacing.py [文章或目录 ...] [--rounds 20]
+- 语料：默认 content.txt；可传多个 .txt/.md 文件或目录 (真实文章)
+- 逐行对比两者输出，必须完全一致
+- cold：清空缓存后首轮；warm：缓存已热 (模拟样板行在多篇文章间重复)
+"""
+
+import argparse
+import os
+import time
+
+import pangu
+
+import spacing
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_corpus(paths):
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            files += sorted(os.path.join(p, f) for f in os.listdir(p) if f.endswith((".txt", ".md")))
+        else:
+            files.append(p)
+    lines = []
+    for fp in files:
+        with open(fp, encoding="utf-8") as f:
+            lines += [l.strip() for l in f if l.strip()]
+    return files, lines
+
+
+def best_of(fn, lines, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for line in lines: fn(line)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="中英文空格基准")
+    parser.add_argument("paths", nargs="*", default=[os.path.join(BASE_DIR, "content.txt")])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    files, lines = load_corpus(args.paths)
+    if not lines: raise SystemExit("❌ 语料为空")
+    mismatched = [l for l in lines if spacing.spacing_text(l) != pangu.spacing_text(l)]
+    if mismatched: raise SystemExit(f"❌ 输出不一致: {mismatched[0]!r}")
+
+    fast = sum(1 for l in lines if not pangu.ANY_CJK.search(l) or not spacing._RE_TRIGGER.search(l))
+    t_pangu = best_of(pangu.spacing_text, lines, args.rounds)
+    spacing.cache_clear()
+    t0 = time.perf_counter()
+    for line in lines: spacing.spacing_text(line)
+    t_cold = time.perf_counter() - t0
+    t_warm = best_of(spacing.spacing_text, lines, args.rounds)
+
+    n = len(lines)
+    print(f"语料: {len(files)} 篇 / {n} 行 / {sum(map(len, lines)):,} 字符，输出一致 ✅")
+    print(f"快速路径命中: {fast}/{n} 行 ({fast / n:.0%})")
+    print(f"{'实现':>14} | {'总耗时':>10} | {'µs/行':>8}")
+    print("-" * 40)
+    for name, t in (("pangu", t_pangu), ("spacing cold", t_cold), ("spacing warm", t_warm)):
+        print(f"{name:>14} | {t*1000:>8.2f}ms | {t/n*1e6:>8.1f}")
+    print(f"\n缓存: {spacing.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
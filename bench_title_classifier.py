@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+标题分类基准
+对比旧版 server.parse_info_from_title / main.parse_content_text 的分类部分 (any() 链 + 多次正则)
+与 title_classifier (单条交替正则一次扫描)，并统计与旧版结果的差异。
+
+用法: python bench_title_classifier.py [--corpus titles.txt] [--n 20000] [--rounds 5]
+  --corpus  每行一个标题的真实语料；缺省用 golden 标题 + 模板生成的标题
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+from collections import Counter
+
+from title_classifier import classify_title
+from test_title_classifier import GOLDEN_PATH
+
+COMPANIES = ["Anthropic", "OpenAI", "月之暗面", "智谱 AI", "字节跳动", "英伟达", "Mistral", "宇树科技", "小米", "Stripe"]
+TEMPLATES = [
+    "{a} 收购 {b}", "{a} 宣布并购 {b}，交易额约 {n} 亿美元", "{a}完成 {n} 亿元 B 轮融资", "{a} 获投 {n} 千万美元",
+    "{a} 完成 IPO 定价", "{a} 递表港交所，拟募资 {n} 亿港元", "{a} 与 {b} 达成战略合作", "{a}携手{b}共建算力中心",
+    "{a} 发布新一代模型", "{a}：{n} 月营收同比增长", "{a} 融资 {n}M",
+]
+
+
+def _legacy_clean(text):
+    text = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', text)
+    text = text.split("：")[0].split(":")[0].strip()
+    if " " in text: return text.split(" ")[0]
+    return text
+
+
+def legacy_server(title):
+    """旧版 server.parse_info_from_title，仅用于对照"""
+    title = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', title).strip()
+    info = {"mode": "general", "keywords": []}
+    if any(k in title for k in ["收购", "并购", "买下"]):
+        info['mode'] = "acquisition"
+        split_char = "收购" if "收购" in title else "并购" if "并购" in title else "买下"
+        parts = title.split(split_char)
+        if len(parts) >= 2:
+            info['keywords'] = [_legacy_clean(parts[0]), _legacy_clean(parts[1])]
+            return info
+    if any(k in title for k in ["融资", "获投", "完成"]):
+        info['mode'] = "finance"
+        company_part = re.split(r'(完成|获投|融资|宣布)', title)[0]
+        info['keywords'] = [_legacy_clean(company_part)]
+        amt_match = re.search(r'(\d+(?:\.\d+)?\s*(?:亿|万|千万|百万)?\s*(?:美元|人民币|元|B|M)?)', title)
+        info['amount'] = amt_match.group(1).strip() if amt_match else ""
+        return info
+    info['keywords'] = [_legacy_clean(title)]
+    return info
+
+
+def legacy_main(title):
+    """旧版 main.parse_content_text 的分类部分，仅用于对照"""
+    info = {"type": "通用", "amount": "", "company": "", "buyer": "", "target": ""}
+    if any(k in title for k in ["收购", "并购", "买下"]):
+        info['type'] = "收购"
+        split_char = "收购" if "收购" in title else "并购" if "并购" in title else "买下"
+        parts = title.split(split_char)
+        if len(parts) >= 2:
+            info['buyer'] = _legacy_clean(parts[0])
+            info['target'] = _legacy_clean(parts[1])
+    elif any(k in title for k in ["融资", "获投", "完成"]):
+        info['type'] = "融资"
+        amt_match = re.search(r'(\d+(?:\.\d+)?(?:亿|万|千万|百万)?(?:美元|人民币|元|B|M))', title)
+        if amt_match: info['amount'] = amt_match.group(1)
+        company_part = re.split(r'(完成|获投|融资|宣布)', title)[0]
+        info['company'] = _legacy_clean(company_part)
+    else:
+        info['company'] = _legacy_clean(title.split(" ")[0])
+    return info
+
+
+def make_corpus(n, seed=0):
+    rnd = random.Random(seed)
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        titles = [c["title"] for c in json.load(f)]
+    while len(titles) < n:
+        a, b = rnd.sample(COMPANIES, 2)
+        titles.append(rnd.choice(TEMPLATES).format(a=a, b=b, n=rnd.choice(["3", "10", "6.75", "500"])))
+    return titles[:n]
+
+
+def best_of(fn, titles, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for t in titles: fn(t)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="标题分类基准")
+    parser.add_argument("--corpus", help="每行一个标题的语料文件")
+    parser.add_argument("--n", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    if args.corpus:
+        with open(args.corpus, encoding="utf-8") as f: titles = [l.strip() for l in f if l.strip()]
+    else:
+        titles = make_corpus(args.n)
+
+    n = len(titles)
+    print(f"语料: {n} 条标题")
+    print(f"{'实现':>18} | {'总耗时':>10} | {'µs/条':>8}")
+    print("-" * 44)
+    for name, fn in (("旧版 server", legacy_server), ("旧版 main", legacy_main), ("title_classifier", classify_title)):
+        t = best_of(fn, titles, args.rounds)
+        print(f"{name:>18} | {t*1000:>8.1f}ms | {t/n*1e6:>8.2f}")
+
+    modes = Counter(classify_title(t).mode for t in titles)
+    changed = Counter((legacy_server(t)['mode'], classify_title(t).mode) for t in titles
+                      if legacy_server(t)['mode'] != classify_title(t).mode)
+    drift = sum(1 for t in titles if legacy_server(t).get('amount', '') != legacy_main(t)['amount'])
+    print(f"\n模式分布: {dict(modes)}")
+    print(f"相对旧版 server 改判: {dict(changed) or '无'}")
+    print(f"旧版 server/main 金额不一致: {drift}/{n} 条")
+
+
+if __name__ == "__main__":
+    main()
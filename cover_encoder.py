@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+# 文件名: cover_encoder.py
+# 封面编码：在字节预算与 SSIM 下限之间搜索最低可用质量 (从上次选中的质量起步)
+
+import io
+
+from PIL import Image
+
+# ================= ⚙️ 默认参数 =================
+COVER_FORMATS = ("jpeg", "webp")
+DEFAULT_MAX_BYTES = 200 * 1024
+DEFAULT_SSIM_FLOOR = 0.985
+QUALITY_MIN, QUALITY_MAX = 50, 95
+SSIM_BLOCK = 8
+EXTENSIONS = {"jpeg": "jpg", "webp": "webp"}
+MIME_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp"}
+
+# (格式, SSIM 下限) -> 上次选中的质量；同一套底图 / 字体下结果很稳定 (通常就是 QUALITY_MIN)，
+# 从它起步通常 1~2 次编码即可确定，不用每张封面都完整二分
+_last_quality = {}
+
+
+def _luma(img):
+    import numpy as np  # numpy 只在编码封面时需要，不拖慢进程启动
+    return np.asarray(img.convert("L"), dtype=np.float32)
+
+
+def ssim(a, b):
+    """灰度 SSIM：8x8 不重叠分块求局部 SSIM 再取均值 (比高斯窗快，足够做质量门槛)；a/b 为图片或灰度数组"""
+    x = _luma(a) if isinstance(a, Image.Image) else a
+    y = _luma(b) if isinstance(b, Image.Image) else b
+    h, w = (x.shape[0] // SSIM_BLOCK) * SSIM_BLOCK, (x.shape[1] // SSIM_BLOCK) * SSIM_BLOCK
+    shape = (h // SSIM_BLOCK, SSIM_BLOCK, w // SSIM_BLOCK, SSIM_BLOCK)
+    x, y = x[:h, :w].reshape(shape), y[:h, :w].reshape(shape)
+    mx, my = x.mean(axis=(1, 3)), y.mean(axis=(1, 3))
+    vx = (x * x).mean(axis=(1, 3)) - mx * mx
+    vy = (y * y).mean(axis=(1, 3)) - my * my
+    cov = (x * y).mean(axis=(1, 3)) - mx * my
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    s = ((2 * mx * my + c1) * (2 * cov + c2)) / ((mx ** 2 + my ** 2 + c1) * (vx + vy + c2))
+    return float(s.mean())
+
+
+def _encode(img, fmt, quality, progressive, optimize):
+    buf = io.BytesIO()
+    if fmt == "webp":
+        img.save(buf, "WEBP", quality=quality, method=4)
+    else:
+        img.save(buf, "JPEG", quality=quality, progressive=progressive, optimize=optimize)
+    return buf.getvalue()
+
+
+def _lowest_passing(ok, lo, hi, seed):
+    """单调条件 ok 在 [lo, hi] 内的最小满足值 (都不满足返回 hi)：从 seed 起倍增步长找到区间，再在区间内二分"""
+    seed = min(max(seed, lo), hi)
+    if ok(seed):
+        good, step = seed, 1
+        while good > lo:
+            probe = max(lo, good - step)
+            if not ok(probe):
+                lo = probe + 1
+                break
+            good, step = probe, step * 2
+    else:
+        bad, step = seed, 1
+        while True:
+            if bad >= hi: return hi
+            probe = min(hi, bad + step)
+            if ok(probe): break
+            bad, step = probe, step * 2
+        good, lo = probe, bad + 1
+    hi = good - 1
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        if ok(mid): good, hi = mid, mid - 1
+        else: lo = mid + 1
+    return good
+
+
+def encode_cover(img, fmt="jpeg", max_bytes=DEFAULT_MAX_BYTES, ssim_floor=DEFAULT_SSIM_FLOOR,
+                 progressive=True, optimize=True, quality_range=(QUALITY_MIN, QUALITY_MAX)):
+    """
+    编码封面，返回 (bytes, params)
+    1. 找 SSIM >= ssim_floor 的最低质量 (文件最小)；从同格式同下限上次选中的质量起步
+    2. 若该质量仍超出 max_bytes，则改取预算内的最高质量 (预算优先，ssim_ok=False)
+    3. 最低质量也超预算时按最低质量输出 (budget_ok=False)
+    params 记录格式、质量、字节数、SSIM 与尝试次数，便于写入任务结果
+    """
+    if fmt not in COVER_FORMATS: raise ValueError(f"不支持的封面格式: {fmt}")
+    img = img.convert("RGB")
+    ref = _luma(img)
+    tried = {}  # quality -> (data, ssim)
+
+    def attempt(q):
+        if q not in tried:
+            data = _encode(img, fmt, q, progressive, optimize)
+            tried[q] = (data, ssim(ref, Image.open(io.BytesIO(data))))
+        return tried[q]
+
+    # 最低满足 SSIM 的质量；最高质量都不满足时就用最高质量
+    seed_key = (fmt, ssim_floor)
+    quality = _lowest_passing(lambda q: attempt(q)[1] >= ssim_floor, *quality_range,
+                              seed=_last_quality.get(seed_key, quality_range[0]))
+    _last_quality[seed_key] = quality
+    if max_bytes and len(attempt(quality)[0]) > max_bytes:
+        lo, hi = quality_range[0], quality - 1
+        quality = quality_range[0]
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            if len(attempt(mid)[0]) <= max_bytes: quality, lo = mid, mid + 1
+            else: hi = mid - 1
+
+    data, score = attempt(quality)
+    params = {
+        "format": fmt, "quality": quality, "bytes": len(data), "ssim": round(score, 4),
+        "ssim_floor": ssim_floor, "max_bytes": max_bytes,
+        "ssim_ok": score >= ssim_floor, "budget_ok": not max_bytes or len(data) <= max_bytes,
+        "attempts": len(tried),
+    }
+    if fmt == "jpeg": params.update(progressive=progressive, optimize=optimize)
+    return data, params
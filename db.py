@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# 文件名: db.py
+# SQLite 访问层：每线程复用连接 + WAL + 固定 SQL (走 sqlite3 语句缓存)；users.db 另带登录成功结果短期缓存
+
+import hashlib
+import hmac
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# ================= ⚙️ 配置区域 =================
+BUSY_TIMEOUT = 5          # 秒；写锁被占用时等待而不是立即报 database is locked
+STATEMENT_CACHE = 64      # 每个连接缓存的预编译语句数
+AUTH_CACHE_TTL = 300      # 登录成功结果的缓存秒数 (改密码后最多这么久旧密码仍可用，可调 invalidate)
+AUTH_CACHE_SIZE = 1024
+
+# 所有 SQL 都是常量字符串，同一连接上重复执行时直接复用预编译语句
+SQL_CREATE_USERS = '''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+SQL_INSERT_USER = 'INSERT OR IGNORE INTO users (username, password_hash) VALUES (?, ?)'
+SQL_USER_EXISTS = 'SELECT 1 FROM users WHERE username = ?'
+SQL_PASSWORD_HASH = 'SELECT password_hash FROM users WHERE username = ?'
+
+
+class SQLiteStore:
+    """
+    每个线程持有一个长连接 (sqlite3 连接不能跨线程共用)，fork 后的子进程自动重建；
+    WAL 模式下读不阻塞写、写不阻塞读。子类可覆盖 _setup(conn) 在新连接上建表
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _setup(self, conn):
+        pass
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, cached_statements=STATEMENT_CACHE)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._setup(conn)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def close(self):
+        """关闭当前线程的连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class UserDB(SQLiteStore):
+    """
+    用户库
+    - 验证成功的 (用户名, 密码) 以 HMAC 摘要为键缓存 AUTH_CACHE_TTL 秒，
+      重复登录不再重算 werkzeug 的慢哈希；失败结果不缓存
+    """
+
+    def __init__(self, path, auth_ttl=AUTH_CACHE_TTL, auth_size=AUTH_CACHE_SIZE):
+        super().__init__(path)
+        self.auth_ttl = auth_ttl
+        self.auth_size = auth_size
+        self._auth_lock = threading.Lock()
+        self._auth_cache = OrderedDict()  # 摘要 -> (用户名, 过期时间)
+        self._secret = os.urandom(16)     # 进程内随机密钥，内存里不留可逆的密码信息
+
+    def init_schema(self):
+        conn = self.connection()
+        with conn: conn.execute(SQL_CREATE_USERS)
+
+    def ensure_user(self, username, password):
+        """用户不存在时创建 (已存在则不改密码)"""
+        conn = self.connection()
+        if conn.execute(SQL_USER_EXISTS, (username,)).fetchone(): return False
+        with conn: conn.execute(SQL_INSERT_USER, (username, generate_password_hash(password)))
+        return True
+
+    def _auth_key(self, username, password):
+        return hmac.new(self._secret, f"{username}\0{password}".encode("utf-8"), hashlib.sha256).digest()
+
+    def verify(self, username, password):
+        key = self._auth_key(username, password)
+        now = time.time()
+        with self._auth_lock:
+            hit = self._auth_cache.get(key)
+            if hit and hit[1] > now:
+                self._auth_cache.move_to_end(key)
+                return True
+        row = self.connection().execute(SQL_PASSWORD_HASH, (username,)).fetchone()
+        if not row or not check_password_hash(row[0], password): return False
+        with self._auth_lock:
+            self._auth_cache[key] = (username, now + self.auth_ttl)
+            self._auth_cache.move_to_end(key)
+            while len(self._auth_cache) > self.auth_size: self._auth_cache.popitem(last=False)
+        return True
+
+    def invalidate(self, username=None):
+        """清除登录缓存 (改密码 / 删用户后调用)；username 为空时全部清除"""
+        with self._auth_lock:
+            if username is None: self._auth_cache.clear()
+            else:
+                for key in [k for k, (u, _) in self._auth_cache.items() if u == username]:
+                    del self._auth_cache[key]
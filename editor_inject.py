@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# 文件名: editor_inject.py
+# 正文直接注入公众号编辑器 (#ueditor_0 iframe)，不经过系统剪贴板；
+# 正文含本地图片或注入失败时回退到复制粘贴，回退路径用跨进程文件锁独占剪贴板
+
+import fcntl
+import os
+import re
+import tempfile
+
+# ================= ⚙️ 配置区域 =================
+CONTENT_MODES = ("inject", "paste")
+CONTENT_MODE = os.environ.get('AUTOWECHAT_RPA_CONTENT', 'inject')
+CLIPBOARD_LOCK_PATH = os.path.join(tempfile.gettempdir(), "autowechat-clipboard.lock")
+
+_RE_ARTICLE = re.compile(r'<section id="wechat-content".*</section>', re.S)
+_RE_IMG_SRC = re.compile(r'<img\b[^>]*?\bsrc="([^"]+)"', re.I)
+_RE_REMOTE_SRC = re.compile(r'^https?://', re.I)
+
+# 优先走 UEditor 的 setContent (编辑器自己的内容模型、撤销栈、字数统计都会更新)；
+# 拿不到实例时直接写 iframe body。两种方式都补发编辑器监听的 input / keyup 事件
+JS_INJECT = """(html) => {
+    const f = document.getElementById('ueditor_0');
+    const doc = f && f.contentDocument;
+    if (!doc || !doc.body) return null;
+    const instances = window.UE && UE.instants ? Object.keys(UE.instants).map(k => UE.instants[k]) : [];
+    const ue = instances.find(e => e.iframe === f || e.document === doc);
+    let mode = 'dom';
+    if (ue && typeof ue.setContent === 'function') {
+        ue.setContent(html);
+        if (typeof ue.fireEvent === 'function') ue.fireEvent('contentchange');
+        mode = 'ue';
+    } else {
+        doc.body.innerHTML = html;
+    }
+    doc.body.dispatchEvent(new InputEvent('input', {bubbles: true, inputType: 'insertFromPaste'}));
+    doc.body.dispatchEvent(new KeyboardEvent('keyup', {bubbles: true}));
+    return {mode: mode, length: doc.body.innerText.trim().length, images: doc.body.querySelectorAll('img').length};
+}"""
+
+
+def article_html(html_path):
+    """读取 news.html 里的正文容器 (#wechat-content，含根样式)"""
+    with open(html_path, encoding="utf-8") as f:
+        html = f.read()
+    m = _RE_ARTICLE.search(html)
+    return m.group(0) if m else html
+
+
+def image_sources(html):
+    return _RE_IMG_SRC.findall(html)
+
+
+def needs_paste(html):
+    """
+    正文里有非 http(s) 的图片 (inline 模式的 data URI、link 模式的相对路径)：
+    注入后编辑器保存时不会把它们转存到公众号图床，只能走复制粘贴让编辑器自己上传
+    """
+    return any(not _RE_REMOTE_SRC.match(src) for src in image_sources(html))
+
+
+def injected_ok(result, expected_images=0):
+    """JS_INJECT 的返回值表明正文确实写进去了，且图片一张没少"""
+    return bool(result) and result.get("length", 0) > 0 and result.get("images", 0) >= expected_images
+
+
+class ClipboardLock:
+    """
+    系统剪贴板只有一份：复制粘贴回退路径在整机范围内串行 (flock，多进程 / 多线程都有效)
+    with ClipboardLock(): 复制 ... 粘贴
+    """
+
+    def __init__(self, path=CLIPBOARD_LOCK_PATH):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
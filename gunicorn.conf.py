@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# 文件名: gunicorn.conf.py
+# 生产部署：gunicorn -c gunicorn.conf.py wsgi:app
+# 进程数 / 线程数通过环境变量调整；封面渲染是 CPU 密集型，进程数决定能用满几个核
+
+import multiprocessing
+import os
+
+# ================= ⚙️ 配置区域 =================
+bind = os.environ.get('AUTOWECHAT_BIND', '0.0.0.0:23456')
+workers = int(os.environ.get('AUTOWECHAT_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('AUTOWECHAT_THREADS', 4))  # 每个 worker 的请求线程 (SSE 长连接也占一个)
+worker_class = 'gthread'
+
+# master 里执行 create_app (建库 / 预热 / 清理线程)，worker fork 后共享预热好的缓存
+# 发布 worker (浏览器线程) 不在 master 里启动，另行运行 python publish_queue.py
+preload_app = True
+
+# 同步生成 (/api/process) 含联网搜 Logo，给足超时
+timeout = int(os.environ.get('AUTOWECHAT_TIMEOUT', 120))
+# 退出的 worker 先等在途请求、再等后台生成任务，各最多 graceful_timeout 秒；
+# 这段时间不再给 master 报心跳，两段加起来要小于 timeout，否则会被当成卡死强杀
+graceful_timeout = int(os.environ.get('AUTOWECHAT_GRACEFUL_TIMEOUT', timeout // 3))
+keepalive = 5
+
+# 定期回收 worker，防止长期运行的内存增长；加抖动避免同时重启
+# 回收时 worker_exit 先收尾本进程的生成任务 (见下)，不会留下一直 running 的 job.json
+max_requests = int(os.environ.get('AUTOWECHAT_MAX_REQUESTS', 1000))
+max_requests_jitter = 100
+
+# 生成任务队列按进程计：整个服务最多 workers x (AUTOWECHAT_JOB_WORKERS + AUTOWECHAT_JOB_QUEUE) 个任务，
+# 同时渲染的最多 workers x AUTOWECHAT_JOB_WORKERS 个；按机器核数调小这两个值，而不是只看单进程
+
+accesslog = '-'
+errorlog = '-'
+
+
+def worker_exit(arbiter, worker):
+    """worker 退出 (max_requests 回收 / 重启)：没开始的生成任务取消，执行中的等完，超时的标记失败"""
+    from server import jobs
+    aborted = jobs.shutdown(timeout=graceful_timeout)
+    if aborted: worker.log.warning("worker %s 退出，%s 个生成任务已标记失败", worker.pid, aborted)
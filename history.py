@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# 文件名: history.py
+# 生成历史：相同输入 (正文 + 手动关键词 + 排版版本 + 输出选项) 直接复用上次的封面与 HTML
+
+import hashlib
+import json
+import time
+
+from db import SQLiteStore
+
+SQL_CREATE_HISTORY = '''
+    CREATE TABLE IF NOT EXISTS history (
+        key TEXT PRIMARY KEY,
+        job_id TEXT NOT NULL,
+        result TEXT NOT NULL,
+        bytes INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        last_used REAL NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0
+    )
+'''
+SQL_CREATE_LAST_USED_INDEX = 'CREATE INDEX IF NOT EXISTS history_last_used ON history (last_used)'
+SQL_GET = 'SELECT job_id, result FROM history WHERE key = ?'
+SQL_TOUCH = 'UPDATE history SET last_used = ?, hits = hits + 1 WHERE key = ?'
+SQL_PUT = 'INSERT OR REPLACE INTO history (key, job_id, result, bytes, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?)'
+SQL_DELETE = 'DELETE FROM history WHERE key = ?'
+SQL_EXPIRED = 'SELECT key, job_id FROM history WHERE last_used < ?'
+SQL_TOTAL_BYTES = 'SELECT COALESCE(SUM(bytes), 0), COUNT(*) FROM history'
+SQL_OLDEST = 'SELECT key, job_id, bytes FROM history ORDER BY last_used LIMIT ?'
+SQL_STATS = 'SELECT COUNT(*), COALESCE(SUM(bytes), 0), COALESCE(SUM(hits), 0) FROM history'
+
+
+def history_key(text, keywords, renderer_version, **options):
+    """输入指纹：正文、手动关键词、排版版本与影响产物的选项 (图片模式 / 封面格式等)"""
+    payload = json.dumps([text, list(keywords or []), renderer_version, sorted(options.items())],
+                         ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class HistoryStore(SQLiteStore):
+    """
+    历史记录表
+    get 命中后由调用方确认产物仍在磁盘 (可能已被目录清理线程删除)，不在则 delete；
+    evict 按最近使用时间淘汰过期记录，再按总字节数从最久未用的开始淘汰，返回被淘汰的 job_id
+    """
+
+    def _setup(self, conn):
+        with conn:
+            conn.execute(SQL_CREATE_HISTORY)
+            conn.execute(SQL_CREATE_LAST_USED_INDEX)
+
+    def get(self, key):
+        conn = self.connection()
+        row = conn.execute(SQL_GET, (key,)).fetchone()
+        if not row: return None
+        with conn: conn.execute(SQL_TOUCH, (time.time(), key))
+        return row[0], json.loads(row[1])
+
+    def put(self, key, job_id, result, size):
+        now = time.time()
+        conn = self.connection()
+        with conn: conn.execute(SQL_PUT, (key, job_id, json.dumps(result, ensure_ascii=False), size, now, now))
+
+    def delete(self, key):
+        conn = self.connection()
+        with conn: conn.execute(SQL_DELETE, (key,))
+
+    def evict(self, max_age, max_bytes):
+        conn = self.connection()
+        evicted = []
+        with conn:
+            for key, job_id in conn.execute(SQL_EXPIRED, (time.time() - max_age,)).fetchall():
+                conn.execute(SQL_DELETE, (key,))
+                evicted.append(job_id)
+            total, count = conn.execute(SQL_TOTAL_BYTES).fetchone()
+            if total > max_bytes:
+                for key, job_id, size in conn.execute(SQL_OLDEST, (count,)).fetchall():
+                    if total <= max_bytes: break
+                    conn.execute(SQL_DELETE, (key,))
+                    evicted.append(job_id)
+                    total -= size
+        return evicted
+
+    def stats(self):
+        count, size, hits = self.connection().execute(SQL_STATS).fetchone()
+        return {"entries": count, "bytes": size, "hits": hits}
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+# 文件名: http_client.py
+# 出站图片下载的共享连接池 (server.py 与 main.py 共用)
+
+import threading
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from PIL import ImageFile
+
+# ================= ⚙️ 配置区域 =================
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+POOL_HOSTS = 32              # 连接池缓存的主机数
+PER_HOST_LIMIT = 4           # 单主机最大并发连接
+MAX_IMAGE_BYTES = 8 * 1024 * 1024    # 响应体字节上限
+MAX_IMAGE_PIXELS = 4096 * 4096       # 解码后像素上限
+CHUNK_SIZE = 64 * 1024
+HEADER_SNIFF_BYTES = 256 * 1024      # 超过这个字节数还认不出图片头就不再解析
+
+# 允许的 Content-Type (部分图床返回 octet-stream)
+_ALLOWED_TYPES = ("application/octet-stream", "binary/octet-stream")
+
+
+class FetchError(Exception):
+    """图片下载失败；reason 取值: status / content_type / too_large / decode / cancelled / network"""
+
+    def __init__(self, reason, msg=""):
+        super().__init__(f"{reason}: {msg}" if msg else reason)
+        self.reason = reason
+
+
+_session = None
+_session_lock = threading.Lock()
+_host_slots = {}
+
+
+def get_session():
+    """进程内共享的 keep-alive Session (懒加载)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                # requests 加载较慢，第一次下载时才导入
+                import requests
+                from requests.adapters import HTTPAdapter
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=PER_HOST_LIMIT, pool_block=True)
+                s.mount("http://", adapter)
+                s.mount("https://", adapter)
+                s.headers["User-Agent"] = USER_AGENT
+                _session = s
+    return _session
+
+
+def _host_slot(host):
+    with _session_lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = _host_slots[host] = threading.BoundedSemaphore(PER_HOST_LIMIT)
+        return slot
+
+
+def _check_content_type(resp):
+    ctype = resp.headers.get("Content-Type", "").split(";")[0].strip().lower()
+    if not ctype: return
+    if ctype == "image/svg+xml" or not (ctype.startswith("image/") or ctype in _ALLOWED_TYPES):
+        raise FetchError("content_type", ctype)
+
+
+def fetch_image(url, timeout=5, max_bytes=MAX_IMAGE_BYTES, max_pixels=MAX_IMAGE_PIXELS, cancel=None):
+    """
+    流式下载图片，返回可直接 Image.open 的 BytesIO
+    - 响应头 Content-Type / Content-Length 先行校验
+    - 首个数据块是 '<' 开头 (HTML 错误页 / SVG) 立即放弃
+    - 字节数超过 max_bytes、图片头声明的像素数超过 max_pixels 时中途终止
+    - cancel (threading.Event) 被置位时在下一个数据块终止
+    """
+    import requests
+    host = urlsplit(url).hostname or ""
+    buf = BytesIO()
+    parser = ImageFile.Parser()
+    with _host_slot(host):
+        try:
+            with get_session().get(url, timeout=timeout, stream=True) as resp:
+                if resp.status_code != 200: raise FetchError("status", str(resp.status_code))
+                _check_content_type(resp)
+                length = resp.headers.get("Content-Length", "")
+                if length.isdigit() and int(length) > max_bytes: raise FetchError("too_large", f"{length} bytes")
+                for chunk in resp.iter_content(CHUNK_SIZE):
+                    if cancel is not None and cancel.is_set(): raise FetchError("cancelled")
+                    if not buf.tell() and chunk.lstrip().startswith(b"<"): raise FetchError("content_type", "markup")
+                    buf.write(chunk)
+                    if buf.tell() > max_bytes: raise FetchError("too_large", f"> {max_bytes} bytes")
+                    # 图片头一旦可解析就检查尺寸，之后不再喂给解析器
+                    if parser is not None:
+                        try: parser.feed(chunk)
+                        except Exception: parser = None
+                        if parser is not None and parser.image is not None:
+                            w, h = parser.image.size
+                            if w * h > max_pixels: raise FetchError("too_large", f"{w}x{h}")
+                            parser = None
+                        elif buf.tell() > HEADER_SNIFF_BYTES:
+                            parser = None
+        except requests.RequestException as e:
+            raise FetchError("network", str(e))
+    if not buf.tell(): raise FetchError("decode", "empty body")
+    buf.seek(0)
+    return buf
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# 文件名: image_ops.py
+# 图像公共算法 (server.py 与 main.py 共用)
+
+from PIL import Image, ImageChops
+
+
+def _threshold_lut(threshold):
+    """单通道查找表：大于阈值 -> 255，否则 -> 0"""
+    return [255 if v > threshold else 0 for v in range(256)]
+
+
+def remove_white_bg_native(img, threshold=245):
+    """
+    去白底 (Pillow 通道运算版)
+    R/G/B 三个通道同时大于阈值的像素变为 (255, 255, 255, 0)，其余像素原样保留，
+    输出与旧版逐像素循环完全一致，但全程在 C 层完成，没有 Python 级别的像素循环。
+    """
+    if img.mode != 'RGBA': img = img.convert('RGBA')
+    r, g, b, _ = img.split()
+    lut = _threshold_lut(threshold)
+    # 0/255 二值图相乘 = 逻辑与
+    mask = ImageChops.multiply(ImageChops.multiply(r.point(lut), g.point(lut)), b.point(lut))
+    clean_img = img.copy()
+    clean_img.paste((255, 255, 255, 0), mask=mask)
+    bbox = clean_img.getbbox()
+    return clean_img.crop(bbox) if bbox else clean_img
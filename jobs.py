@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+# 文件名: jobs.py
+# 生成任务队列：提交立即返回 job_id，有界线程池在后台执行
+
+import json
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+STATE_FILE = "job.json"
+
+
+class QueueFull(Exception):
+    """排队任务已达上限"""
+
+
+class Job:
+    def __init__(self, job_id, state_path=None):
+        self.id = job_id
+        self.state_path = state_path  # 每次变更写一份 JSON 快照，供其他进程查询
+        self.state = QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self.events = []
+        self._cond = threading.Condition()
+
+    def emit(self, stage, **data):
+        """记录一个进度事件；elapsed_ms 从提交时刻起算 (含排队时间)"""
+        with self._cond:
+            self._append(stage, data)
+
+    def finish(self, state, **data):
+        """置为结束状态并追加同名事件 (同一把锁内完成，SSE 读者不会漏掉最后一条)"""
+        with self._cond:
+            if self.finished: return  # 已被 JobManager.shutdown 标记失败，不再改写
+            self.finished_at = time.time()
+            self.state = state
+            self._append(state, data)
+
+    def _append(self, stage, data):
+        self.events.append({"stage": stage, "elapsed_ms": int((time.time() - self.created_at) * 1000), **data})
+        self._persist()
+        self._cond.notify_all()
+
+    def _persist(self):
+        """先写临时文件再替换，读者不会读到半个 JSON；写失败不影响任务本身"""
+        if not self.state_path: return
+        tmp = f"{self.state_path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({**self.to_dict(), "events": self.events}, f, ensure_ascii=False)
+            os.replace(tmp, self.state_path)
+        except (OSError, TypeError, ValueError):
+            try: os.unlink(tmp)
+            except OSError: pass
+
+    @property
+    def finished(self):
+        return self.state in (DONE, FAILED)
+
+    def wait_events(self, start, timeout=15):
+        """阻塞直到有下标 >= start 的新事件或任务结束，返回 (新事件列表, 是否已结束)"""
+        with self._cond:
+            self._cond.wait_for(lambda: len(self.events) > start or self.finished, timeout=timeout)
+            return self.events[start:], self.finished
+
+    def to_dict(self):
+        d = {"job_id": self.id, "state": self.state, "created_at": self.created_at}
+        if self.started_at: d["queued_ms"] = int((self.started_at - self.created_at) * 1000)
+        if self.finished_at and self.started_at: d["run_ms"] = int((self.finished_at - self.started_at) * 1000)
+        if self.result is not None: d["result"] = self.result
+        if self.error is not None: d["error"] = self.error
+        return d
+
+
+class JobManager:
+    """
+    有界任务队列
+    workers 个线程并发执行，最多再排队 max_pending 个；超出直接拒绝 (QueueFull)，
+    保证高负载下吞吐与排队时长可预期。已结束的任务保留 retention 秒供查询。
+    多进程部署时任务只存在于提交它的进程，其他进程通过 snapshot() 读磁盘快照；
+    上限也是按进程计的，整个服务最多 进程数 x (workers + max_pending) 个任务。
+    """
+
+    def __init__(self, workers=4, max_pending=32, retention=3600, name="job", state_dir=None):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retention = retention
+        self.state_dir = state_dir  # 设置后快照写到 state_dir/<job_id>/job.json (目录需已存在)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._active = 0  # 排队中 + 执行中
+        self._closed = False
+
+    def submit(self, job_id, fn, *args, **kwargs):
+        """
+        提交任务；fn 的返回值作为 result，异常信息写入 error
+        fn 会额外收到关键字参数 emit=job.emit，用于上报阶段进度
+        """
+        with self._lock:
+            self._prune()
+            if self._closed: raise QueueFull("服务进程正在重启，请稍后重试")
+            if self._active >= self.workers + self.max_pending:
+                raise QueueFull(f"队列已满 ({self._active} 个任务)")
+            job = self._jobs[job_id] = Job(job_id, self._state_path(job_id))
+            self._active += 1
+        job.emit(QUEUED)
+        job.future = self._pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        job.started_at = time.time()
+        job.state = RUNNING
+        job.emit("started")
+        try:
+            job.result = fn(*args, emit=job.emit, **kwargs)
+            job.finish(DONE)
+        except Exception as e:
+            traceback.print_exc()
+            job.error = str(e)
+            job.finish(FAILED, error=job.error)
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def shutdown(self, timeout=30):
+        """
+        进程退出前调用：不再接收新任务，还没开始的直接取消，执行中的最多再等 timeout 秒
+        取消 / 超时的任务标记为失败，快照不会停在 queued / running；返回被标记失败的任务数
+        """
+        with self._lock:
+            self._closed = True
+            pending = [j for j in self._jobs.values() if not j.finished]
+        aborted = 0
+        for job in pending:
+            if job.future is not None and job.future.cancel():
+                with self._lock: self._active -= 1
+                aborted += self._abort(job, "服务进程重启，任务未执行，请重新提交")
+        wait([j.future for j in pending if j.future is not None], timeout=timeout)
+        for job in pending:
+            if not job.finished: aborted += self._abort(job, "服务进程重启，任务中断，请重新提交")
+        return aborted
+
+    @staticmethod
+    def _abort(job, msg):
+        with job._cond:  # 与任务自己收尾互斥：刚好执行完的不改判
+            if job.finished: return 0
+            job.error = msg
+            job.finish(FAILED, error=msg)
+        return 1
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _state_path(self, job_id):
+        return os.path.join(self.state_dir, job_id, STATE_FILE) if self.state_dir else None
+
+    def snapshot(self, job_id):
+        """读取任务快照 (含 events)；没有快照或 job_id 非法时返回 None"""
+        if not self.state_dir or not job_id or os.path.basename(job_id) != job_id or job_id.startswith("."): return None
+        try:
+            with open(self._state_path(job_id), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def active_ids(self, stale_after=None):
+        """
+        排队 / 执行中的任务 id：本进程内存里的 + 磁盘快照里的 (其他 worker 进程提交的)
+        stale_after 秒内没更新过的快照视为进程已退出留下的残骸，不算在内
+        """
+        with self._lock:
+            ids = {j.id for j in self._jobs.values() if not j.finished}
+        if not self.state_dir: return ids
+        now = time.time()
+        try: names = os.listdir(self.state_dir)
+        except OSError: return ids
+        for name in names:
+            path = self._state_path(name)
+            try:
+                if stale_after and now - os.path.getmtime(path) > stale_after: continue
+            except OSError:
+                continue
+            snap = self.snapshot(name)
+            if snap and snap.get("state") in (QUEUED, RUNNING): ids.add(name)
+        return ids
+
+    def stats(self):
+        with self._lock:
+            return {"workers": self.workers, "max_pending": self.max_pending, "active": self._active}
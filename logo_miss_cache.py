@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# 文件名: logo_miss_cache.py
+# Logo 负缓存：记录搜不到的关键词，TTL 内直接跳过全网搜索
+
+import json
+import os
+import threading
+import time
+
+# 未命中原因
+REASON_NO_RESULTS = "no_results"          # 搜索引擎无结果
+REASON_TOO_SMALL = "too_small"            # 有候选图但都不够清晰
+REASON_DOWNLOAD_FAILED = "download_failed"  # 候选图全部下载/解码失败
+
+
+class LogoMissCache:
+    """
+    持久化负缓存 (JSON 文件)
+    结构: {keyword: {"reason": str, "ts": float}}；文件被其他进程改写后自动重新读取。
+    """
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._stamp = None
+
+    def _reload(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            self._entries, self._stamp = {}, None
+            return
+        stamp = (st.st_mtime_ns, st.st_size)
+        if stamp == self._stamp: return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+        self._stamp = stamp
+
+    def _flush(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+        st = os.stat(self.path)
+        self._stamp = (st.st_mtime_ns, st.st_size)
+
+    def _alive(self, entry, now):
+        return now - entry.get("ts", 0) < self.ttl
+
+    def get(self, keyword):
+        """TTL 内的未命中记录，没有返回 None"""
+        with self._lock:
+            self._reload()
+            entry = self._entries.get(keyword)
+        if entry and self._alive(entry, time.time()): return entry
+        return None
+
+    def record(self, keyword, reason):
+        with self._lock:
+            self._reload()
+            self._entries[keyword] = {"reason": reason, "ts": time.time()}
+            self._flush()
+
+    def purge(self, keyword=None):
+        """
+        删除指定关键词 (不传则清空全部)，顺带清理过期记录
+        返回被删掉的匹配条数：指定关键词时为 0 / 1，清空全部时为仍在 TTL 内的条数 (顺带清掉的过期记录不计)
+        """
+        with self._lock:
+            self._reload()
+            now = time.time()
+            if keyword is None:
+                purged = sum(1 for v in self._entries.values() if self._alive(v, now))
+                self._entries = {}
+            else:
+                purged = int(self._entries.pop(keyword, None) is not None)
+                self._entries = {k: v for k, v in self._entries.items() if self._alive(v, now)}
+            self._flush()
+            return purged
+
+    def entries(self):
+        """当前有效记录 (含剩余秒数)"""
+        with self._lock:
+            self._reload()
+            items = dict(self._entries)
+        now = time.time()
+        return {
+            k: {**v, "expires_in": int(self.ttl - (now - v.get("ts", 0)))}
+            for k, v in items.items() if self._alive(v, now)
+        }
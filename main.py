@@ -1,11 +1,11 @@
 import os
 import re
-import requests
 import webbrowser
-import pangu
 from PIL import Image, ImageDraw, ImageFont, UnidentifiedImageError
-from io import BytesIO
-from duckduckgo_search import DDGS # 核心搜索库
+from image_ops import remove_white_bg_native
+from http_client import fetch_image, FetchError
+from title_classifier import classify_title, format_amount, MODE_TYPES, PAIR_MODES
+from renderer import parse_blocks, render_blocks, META, HEADING, INSIGHT, SHORT, TEXT
 
 # ================= ⚙️ 配置区域 =================
 # 1. 定义项目根目录 (修复点)
@@ -17,9 +17,10 @@ ASSETS_DIR = os.path.join(BASE_DIR, "assets")
 OUTPUT_DIR = os.path.join(BASE_DIR, "output")
 LOGOS_DIR = os.path.join(BASE_DIR, "logos")
 
-# 3. 确保文件夹存在
-os.makedirs(LOGOS_DIR, exist_ok=True)
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+# 3. 确保文件夹存在 (运行时调用，导入模块不创建目录)
+def ensure_dirs():
+    os.makedirs(LOGOS_DIR, exist_ok=True)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 # ================= 🎨 样式定义 =================
 S_CONTAINER = 'max-width: 677px; margin: 0 auto; background: #ffffff; box-shadow: 0 2px 10px rgba(0,0,0,0.05); border-radius: 6px; overflow: hidden; box-sizing: border-box;'
@@ -35,22 +36,6 @@ S_SOURCE = 'display: block; font-size: 12px; color: #bbb; text-align: right; mar
 
 # ================= 🖼️ 图像处理核心 =================
 
-def remove_white_bg_native(img, threshold=245):
-    """原生算法去白底"""
-    if img.mode != 'RGBA': img = img.convert('RGBA')
-    datas = img.getdata()
-    new_data = []
-    for item in datas:
-        # 如果是接近白色，变透明
-        if item[0] > threshold and item[1] > threshold and item[2] > threshold:
-            new_data.append((255, 255, 255, 0))
-        else:
-            new_data.append(item)
-    img.putdata(new_data)
-    bbox = img.getbbox()
-    if bbox: img = img.crop(bbox)
-    return img
-
 def resize_logo_normalized(logo_img, max_h, max_w):
     w, h = logo_img.size
     scale = min(max_h/h, max_w/w)
@@ -89,6 +74,7 @@ def search_logo_with_ai(keyword):
     search_term = f"{keyword} logo png transparent"
     
     try:
+        from duckduckgo_search import DDGS  # 核心搜索库 (首次搜索时才加载)
         with DDGS() as ddgs:
             # 搜索图片，只找 PNG，结果限制前4个
             results = ddgs.images(
@@ -109,30 +95,26 @@ def search_logo_with_ai(keyword):
                 
                 print(f"      ⬇️ 尝试下载: {img_url[:60]}...")
                 try:
-                    headers = {
-                        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-                    }
-                    resp = requests.get(img_url, headers=headers, timeout=5)
-                    
-                    if resp.status_code == 200:
-                        img_data = BytesIO(resp.content)
-                        try:
-                            img = Image.open(img_data)
-                        except:
-                            continue # 即使报错也继续找下一个
-                        
-                        if img.format == 'SVG': 
-                            print("      ❌ 遇到 SVG 代码，跳过")
-                            continue
-                            
-                        # 检查清晰度
-                        if img.width > 300:
-                            print(f"      ✅ 捕获高清图! 尺寸: {img.width}x{img.height}")
-                            return img
-                        else:
-                            print(f"      ⚠️ 图片太小 ({img.width}px)，寻找下一张...")
+                    img_data = fetch_image(img_url, timeout=5)
+                except FetchError as e:
+                    # SVG / HTML 错误页 / 超大文件在下载中途就会被拒绝
+                    print(f"      ❌ 下载被拒 ({e.reason})，跳过")
+                    continue
+                try:
+                    img = Image.open(img_data)
                 except:
+                    continue # 即使报错也继续找下一个
+                
+                if img.format == 'SVG': 
+                    print("      ❌ 遇到 SVG 代码，跳过")
                     continue
+                    
+                # 检查清晰度
+                if img.width > 300:
+                    print(f"      ✅ 捕获高清图! 尺寸: {img.width}x{img.height}")
+                    return img
+                else:
+                    print(f"      ⚠️ 图片太小 ({img.width}px)，寻找下一张...")
 
     except Exception as e:
         print(f"   ❌ AI 搜索模块报错: {e}")
@@ -147,10 +129,9 @@ def download_logo_clearbit(name):
     for d in domains:
         try:
             url = f"https://logo.clearbit.com/{d}?size=600"
-            resp = requests.get(url, timeout=3)
-            if resp.status_code == 200:
-                print(f"   ✅ Clearbit 命中: {d}")
-                return Image.open(BytesIO(resp.content))
+            img = Image.open(fetch_image(url, timeout=3))
+            print(f"   ✅ Clearbit 命中: {d}")
+            return img
         except: pass
     return None
 
@@ -196,11 +177,6 @@ def get_logo(keyword):
 
 # ================= 📝 文本与排版 =================
 
-def clean_company_name(text):
-    text = text.split("：")[0].split(":")[0].strip()
-    if " " in text: return text.split(" ")[0]
-    return text
-
 def parse_content_text(raw_text):
     info = {"type": "通用", "amount": "", "company": "", "buyer": "", "target": "", "body_html": "", "title": ""}
     lines = [line.strip() for line in raw_text.split('\n') if line.strip()]
@@ -209,55 +185,35 @@ def parse_content_text(raw_text):
     info['title'] = lines[0]
     title = info['title']
     
-    if any(k in title for k in ["收购", "并购", "买下"]):
-        info['type'] = "收购"
-        split_char = "收购" if "收购" in title else "并购" if "并购" in title else "买下"
-        parts = title.split(split_char)
-        if len(parts) >= 2:
-            info['buyer'] = clean_company_name(parts[0])
-            info['target'] = clean_company_name(parts[1])
-    elif any(k in title for k in ["融资", "获投", "完成"]):
-        info['type'] = "融资"
-        amt_match = re.search(r'(\d+(?:\.\d+)?(?:亿|万|千万|百万)?(?:美元|人民币|元|B|M))', title)
-        if amt_match: info['amount'] = amt_match.group(1)
-        company_part = re.split(r'(完成|获投|融资|宣布)', title)[0]
-        info['company'] = clean_company_name(company_part)
+    t = classify_title(title)
+    info['type'] = MODE_TYPES.get(t.mode, "通用")
+    info['amount'] = t.amount
+    if t.mode in PAIR_MODES and len(t.companies) >= 2:
+        info['buyer'], info['target'] = t.companies[:2]
     else:
-        info['type'] = "通用"
-        info['company'] = clean_company_name(title.split(" ")[0])
+        info['company'] = t.companies[0]
 
     print(f"🤖 智能分类: [{info['type']}] | 主体: {info.get('company') or (info.get('buyer') + ' & ' + info.get('target'))}")
 
-    body_parts = []
     H1_KEYS = ["核心洞察", "Core Insights", "关键要点", "深度分析"]
-    for line in lines[1:]:
-        line = pangu.spacing_text(line)
-        line = re.sub(r'\*\*(.*?)\*\*', f'<span style="{S_HIGHLIGHT}">\\1</span>', line)
-        if line.startswith("# "): body_parts.append(f'<p style="{S_H1}">{line[2:].strip()}</p>')
-        elif line.startswith("## "): body_parts.append(f'<p style="{S_H2}">{line[3:].strip()}</p>')
-        elif line in H1_KEYS: body_parts.append(f'<p style="{S_H1}">{line}</p>')
-        elif "来源" in line: body_parts.append(f'<p style="{S_SOURCE}">{line}</p>')
-        else: body_parts.append(f'<p style="{S_P}">{line}</p>')
+    def wrap(block):
+        if block.kind == META: style = S_SOURCE
+        elif block.kind == HEADING: style = S_H1 if block.level == 1 else S_H2
+        elif block.kind == INSIGHT: style = S_H1
+        else: style = S_P
+        return f'<p style="{style}">', '</p>'
+    # 固定的段落标题关键词按 INSIGHT (H1) 处理，其余短句在预览里仍按正文显示
+    # 预览沿用旧规则：# 标题优先于来源行，# 为 H1、## 及更深为 H2 (不按全文最浅层级归一化)
+    blocks = [b._replace(kind=INSIGHT) if b.text in H1_KEYS else b
+              for b in parse_blocks(lines[1:], meta_first=False, relative_levels=False)]
+    body_html = render_blocks(blocks, wrap, bold_style=S_HIGHLIGHT, bold_kinds=(META, HEADING, INSIGHT, SHORT, TEXT))
 
     js = """<script>function copyToWeChat(){const r=document.createRange();r.selectNodeContents(document.getElementById('wechat-content'));window.getSelection().removeAllRanges();window.getSelection().addRange(r);document.execCommand('copy');alert('✅ 已复制！');}</script>"""
-    info['body_html'] = f"""<!DOCTYPE html><html><head><meta charset='UTF-8'></head><body style='background:#f2f2f2;padding:20px;font-family:-apple-system;'><div style='text-align:center;margin-bottom:20px;'><button onclick='copyToWeChat()' style='background:#1658ff;color:white;border:none;padding:12px 25px;border-radius:6px;cursor:pointer;font-weight:bold;'>📋 复制到公众号</button></div><div id='wechat-content' style='{S_CONTAINER}'><div style='width:100%;background:#f8f8f8;text-align:center;min-height:100px;'><img src='header.gif' style='width:100%;display:block;'></div><div style='{S_META_WRAPPER}'><p style='{S_META_P}'><span style='{S_META_BOLD}'>作者</span> | INP Family</p></div><div style='{S_PADDING}'>{''.join(body_parts)}</div></div>{js}</body></html>"""
+    info['body_html'] = f"""<!DOCTYPE html><html><head><meta charset='UTF-8'></head><body style='background:#f2f2f2;padding:20px;font-family:-apple-system;'><div style='text-align:center;margin-bottom:20px;'><button onclick='copyToWeChat()' style='background:#1658ff;color:white;border:none;padding:12px 25px;border-radius:6px;cursor:pointer;font-weight:bold;'>📋 复制到公众号</button></div><div id='wechat-content' style='{S_CONTAINER}'><div style='width:100%;background:#f8f8f8;text-align:center;min-height:100px;'><img src='header.gif' style='width:100%;display:block;'></div><div style='{S_META_WRAPPER}'><p style='{S_META_P}'><span style='{S_META_BOLD}'>作者</span> | INP Family</p></div><div style='{S_PADDING}'>{body_html}</div></div>{js}</body></html>"""
     return info
 
 # ================= 🎨 绘制封面 =================
 
-def format_amount(amt):
-    if not amt: return "$", "0", ""
-    sym = "¥" if "元" in amt or "人民币" in amt else "$"
-    num_match = re.search(r'(\d+(?:\.\d+)?)', amt)
-    val = float(num_match.group(1)) if num_match else 0
-    mult = 1
-    if "亿" in amt: mult = 10**8
-    elif "万" in amt: mult = 10**4
-    val = val * mult
-    if val >= 10**9: return sym, f"{val/10**9:g}", "B"
-    if val >= 10**6: return sym, f"{val/10**6:g}", "M"
-    return sym, f"{val:g}", ""
-
 def generate_cover(info):
     SCALE = 2
     W, H = 900*SCALE, 383*SCALE
@@ -292,7 +248,7 @@ def generate_cover(info):
         l = resize_logo_normalized(l, 100*SCALE, 400*SCALE)
         base.paste(l, (int((W-l.width)/2), int(280*SCALE-l.height/2)), l)
                 
-    elif mode == "收购":
+    elif mode in ("收购", "合作") and info.get('buyer'):
         GAP = 64*SCALE
         l1, l2 = get_logo(info.get('buyer')), get_logo(info.get('target'))
         
@@ -318,6 +274,7 @@ def generate_cover(info):
 
 def main():
     print("🚀 启动自动化排版 (AI Search V6.1)...")
+    ensure_dirs()
     txt_path = os.path.join(BASE_DIR, "content.txt")
     if not os.path.exists(txt_path): 
         print(f"❌ 找不到 content.txt，请在 {BASE_DIR} 下创建文件。")
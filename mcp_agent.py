@@ -3,17 +3,51 @@
 # 版本: V24 (自动跳转 + 强力修复二合一版)
 
 import asyncio
+import glob
 import os
 import re
-from mcp.server.fastmcp import FastMCP
-from playwright.async_api import async_playwright, Page
+import time
+from mcp.server.fastmcp import FastMCP, Context
+from playwright.async_api import async_playwright, Page, TimeoutError as PlaywrightTimeout
+from rpa_waits import WaitLog, WAIT_TIMEOUT_MS, QUIET_MS, QUIET_TIMEOUT_MS, \
+    JS_FOCUSED, JS_HAS_SELECTION, JS_ARM_COPY, JS_COPIED, JS_VALUE_EMPTY, JS_DOM_QUIET
+from rpa_trace import Tracer, traced, current_span, outcome_of, OK, ERROR
+from editor_inject import article_html, image_sources, needs_paste, injected_ok, ClipboardLock, CONTENT_MODE, JS_INJECT
 
 # ================= 配置区域 =================
 PROJECT_DIR = "/Users/wangyu/AutoWeChat"
-NEWS_HTML_PATH = os.path.join(PROJECT_DIR, "output", "news.html")
+OUTPUT_DIR = os.path.join(PROJECT_DIR, "output")
+NEWS_HTML_PATH = os.path.join(OUTPUT_DIR, "news.html")
 
 mcp = FastMCP("WeChatAgent")
-browser_storage = {"playwright": None, "page": None}
+browser_storage = {"playwright": None, "page": None, "html_path": None}
+tracer = Tracer("mcp_agent")  # 每次从 Step 0 开始算一次新的发布 (run_id)
+
+AUTHOR = "INP Family"
+
+# 标题 / 作者走 evaluate 参数传入 (标题里有引号、反斜杠也不会破坏脚本)
+JS_SET_FIELDS = """(fields) => {
+    for (const [id, value] of fields) {
+        const e = document.getElementById(id);
+        if (!e) continue;
+        e.value = value;
+        e.dispatchEvent(new Event('input', {bubbles: true}));
+    }
+}"""
+
+# 摘要框不经键盘直接清空 (不抢焦点，可与模版弹窗并行)：补发 input / change 和失焦事件，让编辑器按"编辑完成"提交
+JS_CLEAR_DIGEST = """id => {
+    const e = document.getElementById(id);
+    if (!e) return false;
+    e.value = '';
+    for (const type of ['input', 'change']) e.dispatchEvent(new Event(type, {bubbles: true}));
+    e.dispatchEvent(new FocusEvent('blur'));
+    e.dispatchEvent(new FocusEvent('focusout', {bubbles: true}));
+    return true;
+}"""
+# 提交后编辑器若按正文回填摘要，说明 JS 清空没被它的数据模型接受
+JS_VALUE_FILLED = "sel => { const e = document.querySelector(sel); return !e || !!(e.value || e.textContent || '').trim(); }"
+DIGEST_COMMIT_MS = 800  # 清空后观察这么久仍为空才算生效
 
 # ================= 核心连接逻辑 =================
 async def get_page() -> Page:
@@ -45,11 +79,18 @@ async def get_page() -> Page:
             raise RuntimeError(f"无法连接 Chrome，请确认浏览器已用命令行启动。错误: {e}")
     return browser_storage["page"]
 
+def latest_news_html() -> str:
+    """最新任务目录 (output/<job_id>/news-<hash>.html) 下的文章；没有任务目录时退回旧路径"""
+    candidates = glob.glob(os.path.join(OUTPUT_DIR, "*", "news*.html"))
+    return max(candidates, key=os.path.getmtime) if candidates else NEWS_HTML_PATH
+
 # ================= 🛠️ 自动化工具箱 =================
 
 @mcp.tool()
+@traced(tracer, "navigate")
 async def step0_ensure_editor() -> str:
     """Step 0: 强制进入文章编辑器 (自动跳转)"""
+    tracer.new_run()
     page = await get_page()
     print("Step 0: 检查编辑器状态...")
 
@@ -76,48 +117,95 @@ async def step0_ensure_editor() -> str:
     
     return "❌ 无法跳转：请先在浏览器手动登录微信公众号后台（看到首页即可）"
 
-@mcp.tool()
-async def step1_copy_local() -> str:
-    """Step 1: 复制本地 news.html 内容"""
-    if not os.path.exists(NEWS_HTML_PATH): return "❌ 错误：找不到 news.html 文件"
-    
-    page = await get_page()
-    # 新开一个标签页去复制，防止干扰主流程
+async def copy_to_clipboard(page: Page, html_path: str, waits: WaitLog):
+    """新开一个标签页打开本地文章并全选复制 (防止干扰主流程)"""
     cp = await page.context.new_page()
-    await cp.goto(f"file://{NEWS_HTML_PATH}")
-    
-    # 模拟全选复制
-    await cp.keyboard.press("Meta+A")
-    await asyncio.sleep(0.5)
-    await cp.keyboard.press("Meta+C")
-    await asyncio.sleep(0.5)
-    
-    await cp.close()
+    try:
+        await cp.goto(f"file://{html_path}")
+        # 模拟全选复制 (等选区出现、copy 事件触发，而不是固定 sleep)
+        await cp.keyboard.press("Meta+A")
+        await waits.arun("source_selected", 0.5, cp.wait_for_function, JS_HAS_SELECTION, timeout=WAIT_TIMEOUT_MS)
+        await cp.evaluate(JS_ARM_COPY)
+        await cp.keyboard.press("Meta+C")
+        await waits.arun("clipboard_written", 0.5, cp.wait_for_function, JS_COPIED, timeout=WAIT_TIMEOUT_MS)
+    finally:
+        await cp.close()  # 复制失败也关掉源文件标签页
     await page.bring_to_front() # 回到微信页面
-    return "✅ 本地内容已复制到剪贴板"
+
+async def paste_into_editor(page: Page, waits: WaitLog):
+    await page.locator("#ueditor_0").click()
+    await waits.arun("editor_focused", 0.5, page.wait_for_function, JS_FOCUSED, arg="ueditor_0", timeout=WAIT_TIMEOUT_MS)
+    await page.keyboard.press("Meta+A")
+    await page.keyboard.press("Backspace") # 先清空
+    await page.keyboard.press("Meta+V") # 再粘贴
+    await waits.arun("paste_settled", 0, page.evaluate, JS_DOM_QUIET, ["#ueditor_0", QUIET_MS, QUIET_TIMEOUT_MS])
+
+async def inject_into_editor(page: Page, html_path: str, waits: WaitLog):
+    """正文直接写入编辑器 iframe，返回 'ue' / 'dom'；失败返回 None"""
+    try:
+        html = article_html(html_path)
+        if needs_paste(html): return None  # 本地图片注入后不会被上传，交给复制粘贴
+        result = await page.evaluate(JS_INJECT, html)
+    except Exception as e:
+        print(f"⚠️ 注入失败，改用复制粘贴: {e}")
+        return None
+    if not injected_ok(result, len(image_sources(html))): return None
+    await waits.arun("inject_settled", 0, page.evaluate, JS_DOM_QUIET, ["#ueditor_0", QUIET_MS, QUIET_TIMEOUT_MS])
+    return result["mode"]
+
+@mcp.tool()
+@traced(tracer, "copy")
+async def step1_copy_local(html_path: str = "") -> str:
+    """Step 1: 选定本地 news.html (html_path 留空则取最新一次生成的文章)；paste 模式下同时复制到剪贴板"""
+    browser_storage["html_path"] = None  # 失败时不留上一篇的路径，Step 2 不会拿旧文章去发
+    html_path = html_path or latest_news_html()
+    if not os.path.exists(html_path): return "❌ 错误：找不到 news.html 文件"
+    if CONTENT_MODE == "inject":
+        browser_storage["html_path"] = html_path
+        return f"✅ 已选定本地文章，Step 2 直接注入编辑器 (不占用剪贴板): {html_path}"
+
+    page = await get_page()
+    waits = WaitLog()
+    try:
+        await copy_to_clipboard(page, html_path, waits)
+    except Exception as e:
+        return f"❌ 复制本地文章失败: {e}"
+    browser_storage["html_path"] = html_path
+    return f"✅ 本地内容已复制到剪贴板 ({waits.brief()})"
 
 @mcp.tool()
+@traced(tracer, "paste")
 async def step2_paste_content(title: str) -> str:
-    """Step 2: 注入标题并粘贴正文"""
+    """Step 2: 注入标题并写入正文 (默认直接注入，失败时加剪贴板锁复制粘贴)"""
     page = await get_page()
     
     # 1. 暴力移除遮罩 (防弹窗干扰)
     await page.evaluate("document.querySelectorAll('.media_list_box_mask, .weui-desktop-mask').forEach(e => e.remove())")
 
     # 2. JS 注入标题和作者
-    await page.evaluate(f"document.getElementById('title').value = '{title}'; document.getElementById('title').dispatchEvent(new Event('input'));")
-    await page.evaluate("document.getElementById('author').value = 'INP Family'; document.getElementById('author').dispatchEvent(new Event('input'));")
+    await page.evaluate(JS_SET_FIELDS, [["title", title], ["author", AUTHOR]])
     
-    # 3. 粘贴正文
-    await page.locator("#ueditor_0").click()
-    await asyncio.sleep(0.5)
-    await page.keyboard.press("Meta+A")
-    await page.keyboard.press("Backspace") # 先清空
-    await page.keyboard.press("Meta+V") # 再粘贴
-    
-    return "✅ 标题与正文粘贴完成"
+    # 3. 写入正文
+    waits = WaitLog()
+    html_path = browser_storage.get("html_path") or latest_news_html()
+    if CONTENT_MODE != "inject":
+        await paste_into_editor(page, waits)  # Step 1 已复制
+        return f"✅ 标题与正文粘贴完成 ({waits.brief()})"
+
+    mode = await inject_into_editor(page, html_path, waits) if os.path.exists(html_path) else None
+    current_span().set(mode=mode or "paste", fallback=not mode)
+    if mode: return f"✅ 标题与正文注入完成 [{mode}] ({waits.brief()})"
+    lock = ClipboardLock()
+    await asyncio.to_thread(lock.__enter__)  # 整机只有一个剪贴板，等其他发布用完
+    try:
+        await copy_to_clipboard(page, html_path, waits)
+        await paste_into_editor(page, waits)
+    finally:
+        lock.__exit__()
+    return f"✅ 注入失败，已改用复制粘贴 ({waits.brief()})"
 
 @mcp.tool()
+@traced(tracer, "template")
 async def step3_insert_template() -> str:
     """Step 3: 插入快讯模版 (强力点击版)"""
     page = await get_page()
@@ -135,11 +223,12 @@ async def step3_insert_template() -> str:
         # 2. 等待弹窗
         dialog = page.locator(".weui-desktop-dialog__wrp")
         await dialog.wait_for(state="visible")
-        await asyncio.sleep(2) # 必须死等一会，让列表渲染
 
         # 3. 寻找“快讯”并强制点击
-        # 策略：找到包含文字的 li 标签
+        # 策略：找到包含文字的 li 标签 (列表异步渲染，等它出现即可，不再死等)
+        waits = WaitLog()
         target_item = dialog.locator("li").filter(has_text="快讯").first
+        await waits.arun("template_list", 2, target_item.wait_for, state="visible", timeout=WAIT_TIMEOUT_MS)
         
         if await target_item.count() > 0:
             # 强制点击元素中心
@@ -154,71 +243,76 @@ async def step3_insert_template() -> str:
         else:
             return "❌ 未找到'快讯'模版，请检查模版库"
 
-        return "✅ 模版插入完成"
+        return f"✅ 模版插入完成 ({waits.brief()})"
     except Exception as e:
         return f"❌ 模版步骤出错: {e}"
 
 @mcp.tool()
+@traced(tracer, "digest")
 async def step4_clear_abstract() -> str:
     """Step 4: 清空摘要 (强制聚焦版)"""
     page = await get_page()
     print("Step 4: 正在清空摘要...")
     
     try:
+        waits = WaitLog()
         # 1. 滚到底部
         await page.evaluate("window.scrollTo(0, document.body.scrollHeight);")
-        await asyncio.sleep(0.5)
+        await waits.arun("digest_visible", 0.5, page.locator("#digest").wait_for, state="visible", timeout=WAIT_TIMEOUT_MS)
         
         # 2. JS 强制让输入框获得焦点 (解决点不中的问题)
         # 微信摘要框通常 ID 是 digest
         await page.evaluate("document.getElementById('digest').focus()")
-        await asyncio.sleep(0.2)
+        await waits.arun("digest_focused", 0.2, page.wait_for_function, JS_FOCUSED, arg="digest", timeout=WAIT_TIMEOUT_MS)
         
         # 3. 物理点击辅助
         await page.locator("#digest").click()
         
-        # 4. 键盘狂删
+        # 4. 键盘狂删 (按键按顺序派发，无需间隔；删完确认输入框已空)
         await page.keyboard.press("Meta+A")
-        await asyncio.sleep(0.1)
+        waits.skip("digest_select_all", 0.1)
         await page.keyboard.press("Backspace")
         await page.keyboard.press("Backspace") # 多按一次保平安
+        await waits.arun("digest_cleared", 0, page.wait_for_function, JS_VALUE_EMPTY, arg="#digest", timeout=WAIT_TIMEOUT_MS)
         
         await page.evaluate("window.scrollTo(0, 0)")
-        return "✅ 摘要已彻底清空"
+        return f"✅ 摘要已彻底清空 ({waits.brief()})"
     except Exception as e:
         return f"❌ 摘要清空失败: {e}"
 
 @mcp.tool()
+@traced(tracer, "cover")
 async def step5_set_cover() -> str:
     """Step 5: 设置封面 (真实鼠标模拟版)"""
     page = await get_page()
     print("Step 5: 正在设置封面...")
     
     try:
+        waits = WaitLog()
         # 1. 回到顶部
         await page.evaluate("window.scrollTo(0, 0)")
-        await asyncio.sleep(1)
         
         # 2. 模拟鼠标滑入封面区域
         cover_area = page.locator(".js_cover_btn_area").first
+        await waits.arun("cover_area_visible", 1, cover_area.wait_for, state="visible", timeout=WAIT_TIMEOUT_MS)
         box = await cover_area.bounding_box()
         
+        # 3. 点击“从正文选择”
+        # 使用 Force=True 无视任何透明遮挡
+        btn = page.get_by_text("从正文选择").first
         if box:
             # 移动鼠标到区域中心，触发悬停菜单
             await page.mouse.move(box["x"] + box["width"]/2, box["y"] + box["height"]/2)
-            await asyncio.sleep(0.5)
             # 再动一下，确保触发
             await page.mouse.move(box["x"] + box["width"]/2 + 5, box["y"] + box["height"]/2 + 5)
-            await asyncio.sleep(0.5)
+            await waits.arun("cover_menu", 1, btn.wait_for, state="visible", timeout=WAIT_TIMEOUT_MS)
         
-        # 3. 点击“从正文选择”
-        # 使用 Force=True 无视任何透明遮挡
-        btn = page.get_by_text("从正文选择").first
         if await btn.is_visible():
             await btn.click(force=True)
         else:
             # 如果悬停没出来，尝试盲点
             print("⚠️ 按钮未浮现，尝试点击区域...")
+            current_span().retry()
             await cover_area.click() 
             # 再次尝试找按钮
             if await btn.is_visible(): await btn.click(force=True)
@@ -230,7 +324,8 @@ async def step5_set_cover() -> str:
         
         if count > 0:
             await imgs.nth(count - 1).click() # 点最后一张
-            await asyncio.sleep(0.5)
+            await waits.arun("picker_selected", 0.5, page.locator("button:has-text('下一步'), button:has-text('完成')").first.wait_for,
+                             state="visible", timeout=WAIT_TIMEOUT_MS)
             
             # 点下一步/完成
             next_btn = page.locator("button", has_text="下一步")
@@ -239,7 +334,7 @@ async def step5_set_cover() -> str:
             finish_btn = page.locator("button", has_text="完成")
             if await finish_btn.is_visible(): await finish_btn.click()
             
-            return "✅ 封面已设置为最后一张图"
+            return f"✅ 封面已设置为最后一张图 ({waits.brief()})"
         else:
             return "⚠️ 正文中没有发现图片"
             
@@ -247,6 +342,7 @@ async def step5_set_cover() -> str:
         return f"❌ 封面设置出错: {e}"
 
 @mcp.tool()
+@traced(tracer, "settings")
 async def step6_settings() -> str:
     """Step 6: 收尾设置 (原创/留言)"""
     # 这里保持简单的逻辑即可
@@ -254,5 +350,64 @@ async def step6_settings() -> str:
     await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
     return "✅ 配置完成，请人工最后检查并群发"
 
+@traced(tracer, "digest")
+async def clear_abstract_js() -> str:
+    """
+    摘要框用 JS 清空 (publish_article 里与模版步骤并行)：清空并补发提交事件后再观察 DIGEST_COMMIT_MS，
+    期间被编辑器回填 (或摘要框不见了) 返回 ⚠️，由调用方退回 Step 4 的键盘方式
+    """
+    page = await get_page()
+    current_span().set(mode="js")
+    try:
+        if not await page.evaluate(JS_CLEAR_DIGEST, "digest"): return "⚠️ 未找到摘要框"
+        await page.wait_for_function(JS_VALUE_FILLED, arg="#digest", timeout=DIGEST_COMMIT_MS)
+        return "⚠️ 摘要 JS 清空后被编辑器回填"
+    except PlaywrightTimeout:
+        return "✅ 摘要已清空 (JS)"  # 观察期内一直为空
+    except Exception as e:
+        return f"⚠️ 摘要 JS 清空未生效: {e}"
+
+async def _timed(step, coro):
+    t0 = time.perf_counter()
+    try:
+        message = await coro
+    except Exception as e:  # 步骤工具没兜住的异常也记成失败，后续步骤据此停止
+        message = f"❌ {step} 出错: {e}"
+    return {"step": step, "outcome": outcome_of(message), "message": message, "ms": int((time.perf_counter() - t0) * 1000)}
+
+@mcp.tool()
+@traced(tracer, "publish")
+async def publish_article(title: str, ctx: Context, html_path: str = "") -> dict:
+    """
+    一次调用跑完 Step 0 ~ Step 6 (服务端串起来，省掉 7 次往返)；模版插入与摘要清空并行。
+    每完成一段推送一次进度；返回每一步的结果 (step / outcome / message / ms)，进入编辑器或写入正文失败时提前停止
+    """
+    steps = []
+    stages = 5
+    browser_storage["html_path"] = None  # 本次发布只用 Step 1 选定的文章
+
+    async def stage(n, label, *results):
+        steps.extend(results)
+        await ctx.report_progress(n, stages, f"{label}: " + " | ".join(r["message"] for r in results))
+        return all(r["outcome"] != ERROR for r in results)
+
+    ok = await stage(1, "编辑器", await _timed("navigate", step0_ensure_editor()))
+    if ok:
+        copied = await _timed("copy", step1_copy_local(html_path))
+        # Step 1 失败 (找不到文章 / 复制失败) 时不写正文，免得把编辑器里的旧内容或上一篇发出去
+        pasted = [await _timed("paste", step2_paste_content(title))] if copied["outcome"] != ERROR else []
+        ok = await stage(2, "正文", copied, *pasted)
+    if ok:
+        template, digest = await asyncio.gather(_timed("template", step3_insert_template()), _timed("digest", clear_abstract_js()))
+        if digest["outcome"] != OK:  # 回退到键盘清空 (此时模版弹窗已关)
+            digest = {**await _timed("digest", step4_clear_abstract()), "fallback": True}
+        await stage(3, "模版 / 摘要", template, digest)
+        await stage(4, "封面", await _timed("cover", step5_set_cover()))
+        await stage(5, "收尾", await _timed("settings", step6_settings()))
+
+    failed = [r["step"] for r in steps if r["outcome"] == ERROR]
+    if failed: current_span().fail(f"失败步骤: {', '.join(failed)}")
+    return {"ok": not failed, "run_id": tracer.run_id, "completed": ok, "steps": steps}
+
 if __name__ == "__main__":
     mcp.run()
\ No newline at end of file
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+# 文件名: publish_queue.py
+# 发布队列：任务持久化在 SQLite (重启不丢)，每个公众号账号一个 worker 线程——
+# 同一账号串行 (同一个浏览器 / 编辑器)，不同账号并行 (各自独立的 Chrome / CDP 端口)
+# 生产环境 worker 单独一个进程：python publish_queue.py (Web 进程只入队，不在 gunicorn master 里跑浏览器线程)
+
+import fcntl
+import json
+import os
+import signal
+import threading
+import time
+import traceback
+import uuid
+
+from db import SQLiteStore
+
+# ================= ⚙️ 配置区域 =================
+# 账号表在 config.py 的 WECHAT_ACCOUNTS 里配置，未配置时只有一个连本机 9222 的 default 账号；
+# 每个账号用一个独立的 Chrome：--remote-debugging-port=<端口> --user-data-dir=<独立目录>，各自扫码登录
+DEFAULT_ACCOUNTS = {"default": {"cdp_url": "http://localhost:9222", "author": "INP Family"}}
+PUBLISH_POLL = 1.0        # worker 空闲时检查新任务的间隔 (秒)；其他进程提交的任务靠它发现
+PUBLISH_LIST_LIMIT = 50
+# 进程中途退出时草稿可能已写了一半 (甚至已保存)，自动重跑会产生重复草稿，只标记失败等人工确认后重试
+ORPHAN_ERROR = "发布进程中途退出，需人工确认"
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+SQL_CREATE_PUBLISH = '''
+    CREATE TABLE IF NOT EXISTS publish_jobs (
+        id TEXT PRIMARY KEY,
+        account TEXT NOT NULL,
+        state TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        result TEXT,
+        error TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        created_at REAL NOT NULL,
+        started_at REAL,
+        finished_at REAL
+    )
+'''
+SQL_CREATE_ACCOUNT_INDEX = 'CREATE INDEX IF NOT EXISTS publish_jobs_account ON publish_jobs (account, state, created_at)'
+SQL_INSERT = 'INSERT INTO publish_jobs (id, account, state, payload, created_at) VALUES (?, ?, ?, ?, ?)'
+SQL_NEXT = 'SELECT id, payload FROM publish_jobs WHERE account = ? AND state = ? ORDER BY created_at LIMIT 1'
+SQL_CLAIM = 'UPDATE publish_jobs SET state = ?, started_at = ?, attempts = attempts + 1 WHERE id = ? AND state = ?'
+SQL_FINISH = 'UPDATE publish_jobs SET state = ?, result = ?, error = ?, finished_at = ? WHERE id = ?'
+SQL_FAIL_ORPHANS = 'UPDATE publish_jobs SET state = ?, error = ?, finished_at = ? WHERE state = ?'
+SQL_RETRY = ('UPDATE publish_jobs SET state = ?, result = NULL, error = NULL, started_at = NULL, finished_at = NULL '
+             'WHERE id = ? AND state = ?')
+SQL_GET = 'SELECT * FROM publish_jobs WHERE id = ?'
+SQL_LIST = 'SELECT * FROM publish_jobs ORDER BY created_at DESC LIMIT ?'
+SQL_LIST_ACCOUNT = 'SELECT * FROM publish_jobs WHERE account = ? ORDER BY created_at DESC LIMIT ?'
+SQL_COUNTS = 'SELECT account, state, COUNT(*) FROM publish_jobs GROUP BY account, state'
+SQL_PENDING_PAYLOADS = 'SELECT payload FROM publish_jobs WHERE state IN (?, ?)'
+
+
+def load_accounts():
+    """config.WECHAT_ACCOUNTS (config.py 不入库，可能不存在)；没有则用 DEFAULT_ACCOUNTS"""
+    try:
+        from config import WECHAT_ACCOUNTS
+    except ImportError:
+        return dict(DEFAULT_ACCOUNTS)
+    return dict(WECHAT_ACCOUNTS) or dict(DEFAULT_ACCOUNTS)
+
+
+class PublishStore(SQLiteStore):
+    """发布任务表；claim 是条件 UPDATE，同一任务不会被领取两次"""
+
+    def _setup(self, conn):
+        with conn:
+            conn.execute(SQL_CREATE_PUBLISH)
+            conn.execute(SQL_CREATE_ACCOUNT_INDEX)
+
+    def enqueue(self, account, payload):
+        job_id = f"pub-{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        conn = self.connection()
+        with conn: conn.execute(SQL_INSERT, (job_id, account, QUEUED, json.dumps(payload, ensure_ascii=False), time.time()))
+        return job_id
+
+    def claim(self, account):
+        """领取该账号最早的排队任务，返回 (job_id, payload)；没有则 None"""
+        conn = self.connection()
+        while True:
+            row = conn.execute(SQL_NEXT, (account, QUEUED)).fetchone()
+            if not row: return None
+            with conn: claimed = conn.execute(SQL_CLAIM, (RUNNING, time.time(), row[0], QUEUED)).rowcount
+            if claimed: return row[0], json.loads(row[1])
+
+    def finish(self, job_id, state, result=None, error=None):
+        conn = self.connection()
+        with conn:
+            conn.execute(SQL_FINISH, (state, json.dumps(result, ensure_ascii=False) if result is not None else None,
+                                      error, time.time(), job_id))
+
+    def recover(self):
+        """调度器启动时把上次进程退出时仍在 running 的任务置为失败 (不自动重跑，见 ORPHAN_ERROR)，返回条数"""
+        conn = self.connection()
+        with conn: return conn.execute(SQL_FAIL_ORPHANS, (FAILED, ORPHAN_ERROR, time.time(), RUNNING)).rowcount
+
+    def retry(self, job_id):
+        """失败的任务重新排队 (人工确认后显式调用)；任务不存在或不是 failed 状态返回 False"""
+        conn = self.connection()
+        with conn: return conn.execute(SQL_RETRY, (QUEUED, job_id, FAILED)).rowcount == 1
+
+    @staticmethod
+    def _row_dict(cursor, row):
+        d = {col[0]: value for col, value in zip(cursor.description, row)}
+        d["job_id"] = d.pop("id")
+        for key in ("payload", "result"):
+            if d.get(key) is not None: d[key] = json.loads(d[key])
+        return d
+
+    def get(self, job_id):
+        cur = self.connection().execute(SQL_GET, (job_id,))
+        row = cur.fetchone()
+        return self._row_dict(cur, row) if row else None
+
+    def list(self, account=None, limit=PUBLISH_LIST_LIMIT):
+        conn = self.connection()
+        cur = conn.execute(SQL_LIST_ACCOUNT, (account, limit)) if account else conn.execute(SQL_LIST, (limit,))
+        return [self._row_dict(cur, row) for row in cur.fetchall()]
+
+    def pending_paths(self):
+        """排队 / 执行中的任务引用的本地文件 (html_path / cover_path)，清理产物目录时要跳过"""
+        paths = set()
+        for (payload,) in self.connection().execute(SQL_PENDING_PAYLOADS, (QUEUED, RUNNING)).fetchall():
+            data = json.loads(payload)
+            paths.update(data[key] for key in ("html_path", "cover_path") if data.get(key))
+        return paths
+
+    def counts(self):
+        counts = {}
+        for account, state, n in self.connection().execute(SQL_COUNTS).fetchall():
+            counts.setdefault(account, {})[state] = n
+        return counts
+
+
+class PublishScheduler:
+    """
+    每个账号一个常驻线程：领取任务 -> runner(job_id, account, 账号配置, payload) -> 写回结果
+    多进程部署时只有拿到 lock_path 文件锁的进程运行 worker (即单独运行的 python publish_queue.py)，
+    gunicorn 的 web 进程只负责入队、重试与查询
+    """
+
+    def __init__(self, store, accounts, runner, lock_path=None, poll=PUBLISH_POLL):
+        self.store = store
+        self.accounts = accounts
+        self.runner = runner
+        self.lock_path = lock_path
+        self.poll = poll
+        self._wakeups = {account: threading.Event() for account in accounts}
+        self._threads = []
+        self._lock_fd = None
+        self._stop = threading.Event()
+
+    def submit(self, account, payload):
+        if account not in self.accounts: raise KeyError(account)
+        job_id = self.store.enqueue(account, payload)
+        self._wakeups[account].set()  # 同进程内提交立即唤醒；跨进程靠轮询
+        return job_id
+
+    def retry(self, job_id, account):
+        if not self.store.retry(job_id): return False
+        if account in self._wakeups: self._wakeups[account].set()
+        return True
+
+    def _acquire_leader(self):
+        if not self.lock_path: return True
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    def start(self):
+        """启动各账号 worker；已有别的进程在调度时返回 False"""
+        if self._threads: return True
+        if not self._acquire_leader(): return False
+        self.store.recover()
+        for account in self.accounts:
+            t = threading.Thread(target=self._worker, args=(account,), name=f"publish-{account}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return True
+
+    def stop(self):
+        self._stop.set()
+        for event in self._wakeups.values(): event.set()
+
+    def wait(self):
+        """阻塞到 stop() 之后各 worker 退出 (正在执行的发布会先做完)"""
+        for t in self._threads:
+            while t.is_alive(): t.join(1)
+
+    @property
+    def running(self):
+        return any(t.is_alive() for t in self._threads)
+
+    def _worker(self, account):
+        wakeup = self._wakeups[account]
+        while not self._stop.is_set():
+            try:
+                claimed = self.store.claim(account)
+            except Exception:
+                traceback.print_exc()
+                claimed = None
+            if not claimed:
+                wakeup.wait(self.poll)
+                wakeup.clear()
+                continue
+            job_id, payload = claimed
+            try:
+                result = self.runner(job_id, account, self.accounts[account], payload)
+                self.store.finish(job_id, DONE, result=result)
+            except Exception as e:
+                traceback.print_exc()
+                self.store.finish(job_id, FAILED, error=str(e))
+
+    def stats(self):
+        """running 只反映当前进程 (多进程部署时 worker 只在持锁进程里)"""
+        return {"accounts": list(self.accounts), "running_here": self.running, "counts": self.store.counts()}
+
+
+def main():
+    """独立的发布进程：与 server 共用 publish.db / 账号表 / 发布函数；同一时间只有一个进程能拿到 publish.lock"""
+    from server import publisher  # 在这里导入，避免 server <-> publish_queue 循环导入
+    if not publisher.start():
+        print("⚠️ 已有发布进程在运行 (publish.lock 被占用)，退出")
+        return
+    for sig in (signal.SIGINT, signal.SIGTERM): signal.signal(sig, lambda *_: publisher.stop())
+    print(f"📮 发布 worker 已启动，账号: {', '.join(publisher.accounts)}")
+    publisher.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# 文件名: renderer.py
+# 正文排版引擎：逐行分类成块 (AST)，再按各自样式拼接 HTML (server.py 与 main.py 共用)
+
+import re
+from collections import namedtuple
+
+from spacing import spacing_text
+
+# 排版规则版本号：分类/样式逻辑变化时 +1 (历史记录据此判断旧结果是否可复用)
+RENDERER_VERSION = 1
+
+# ================= 块类型 =================
+META = "meta"        # 来源 / 链接
+HEADING = "heading"  # Markdown # 标题 (level 为相对层级，从 1 开始)
+INSIGHT = "insight"  # "核心洞察" / "Insights" 段落标题
+SHORT = "short"      # 短句 (< 24 字且不以标点结尾)，视作小标题
+TEXT = "text"        # 普通正文
+
+Block = namedtuple("Block", "kind text level")
+
+_RE_HEADING = re.compile(r'^(#+)\s(.*)')
+_RE_HEADING_DEPTH = re.compile(r'^(#+)\s')
+_RE_END_PUNCT = re.compile(r'[，。！？、：；]$')
+_RE_BOLD = re.compile(r'\*\*(.*?)\*\*')
+
+META_KEYS = ("来源", "链接", "http")
+INSIGHT_KEYS = ("Insights", "核心洞察")
+SHORT_LINE_LEN = 24
+_RE_META = re.compile("|".join(map(re.escape, META_KEYS)))
+_RE_INSIGHT = re.compile("|".join(map(re.escape, INSIGHT_KEYS)))
+
+
+def parse_blocks(lines, meta_first=True, relative_levels=True):
+    """
+    单次扫描正文行，返回 Block 列表
+    空行跳过；每行先做中英文空格处理再分类
+    meta_first: 含来源 / 链接的行优先判为 META (公众号排版)；False 时 # 标题优先 (main.py 预览的旧规则)
+    relative_levels: 标题层级按全文最浅的 # 归一化为 1；False 时 level 即 # 的个数
+    """
+    raw = []
+    min_depth = None
+    for line in lines:
+        line = line.strip()
+        m = _RE_HEADING_DEPTH.match(line)
+        if m:
+            depth = len(m.group(1))
+            if min_depth is None or depth < min_depth: min_depth = depth
+        if not line: continue
+        line = spacing_text(line)
+        m = _RE_HEADING.match(line)
+        if _RE_META.search(line) and (meta_first or not m):
+            raw.append((META, line, 0))
+        elif m:
+            raw.append((HEADING, m.group(2), len(m.group(1))))
+        elif _RE_INSIGHT.search(line):
+            raw.append((INSIGHT, line, 0))
+        elif len(line) < SHORT_LINE_LEN and not _RE_END_PUNCT.search(line):
+            raw.append((SHORT, line, 0))
+        else:
+            raw.append((TEXT, line, 0))
+    base = (min_depth or 0) if relative_levels else 1
+    return [Block(kind, text, depth - base + 1 if kind == HEADING else 0) for kind, text, depth in raw]
+
+
+def render_blocks(blocks, wrap, bold_style=None, bold_kinds=(TEXT,)):
+    """
+    把块列表拼成 HTML 片段 (list-join，长文线性)
+    wrap(block) 返回 (开标签, 闭标签)，只能取决于 kind 与 level (结果按二者缓存)；
+    bold_kinds 中的块会把 **xx** 替换成 bold_style 高亮
+    """
+    bold_repl = f'<span style="{bold_style}">\\1</span>' if bold_style else None
+    tags = {}  # (kind, level) -> (开标签, 闭标签)，同类块只调用一次 wrap
+    out = []
+    for block in blocks:
+        text = block.text
+        if bold_repl and block.kind in bold_kinds and "**" in text: text = _RE_BOLD.sub(bold_repl, text)
+        key = (block.kind, block.level)
+        pair = tags.get(key)
+        if pair is None: pair = tags[key] = wrap(block)
+        out.append(pair[0])
+        out.append(text)
+        out.append(pair[1])
+    return "".join(out)
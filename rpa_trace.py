@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+# 文件名: rpa_trace.py
+# RPA 步骤追踪：每个步骤一个 span (耗时 / 重试次数 / 结果)，追加写入 logs/rpa_trace.jsonl；
+# python rpa_trace.py summary 汇总最近若干次发布里各步骤的 p50 / p95
+
+import argparse
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+
+# ================= ⚙️ 配置区域 =================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TRACE_PATH = os.environ.get('AUTOWECHAT_RPA_TRACE', os.path.join(BASE_DIR, 'logs', 'rpa_trace.jsonl'))
+SUMMARY_RUNS = 50  # summary 默认统计最近多少次发布
+
+# 结果
+OK = "ok"
+WARNING = "warning"
+ERROR = "error"
+
+_write_lock = threading.Lock()
+_current_span = contextvars.ContextVar("rpa_span", default=None)
+
+
+def new_run_id():
+    return f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+class Span:
+    """一个步骤；retry() 记一次重试，set() 附加字段，fail() / warn() 标记结果 (异常抛出时自动标 error)"""
+
+    def __init__(self, step):
+        self.step = step
+        self.outcome = OK
+        self.retries = 0
+        self.error = None
+        self.attrs = {}
+
+    def retry(self):
+        self.retries += 1
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def fail(self, error):
+        self.outcome, self.error = ERROR, str(error)
+
+    def warn(self, message):
+        if self.outcome == OK: self.outcome, self.error = WARNING, str(message)
+
+
+class Tracer:
+    """
+    一次发布 (run_id) 内的所有 span 写进同一个 JSONL 文件，每行一个步骤
+    写文件失败只打印提示，不影响发布本身
+    """
+
+    def __init__(self, source, run_id=None, path=TRACE_PATH, **attrs):
+        self.source = source
+        self.run_id = run_id or new_run_id()
+        self.path = path
+        self.attrs = attrs
+
+    def new_run(self, run_id=None):
+        self.run_id = run_id or new_run_id()
+
+    def span(self, step):
+        return _SpanContext(self, step)
+
+    def record(self, span, started, ms):
+        line = {"ts": round(started, 3), "run_id": self.run_id, "source": self.source, "step": span.step,
+                "ms": ms, "outcome": span.outcome, "retries": span.retries, **self.attrs, **span.attrs}
+        if span.error: line["error"] = (span.error.strip().splitlines() or [""])[0][:200]
+        data = json.dumps(line, ensure_ascii=False) + "\n"
+        try:
+            with _write_lock:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f: f.write(data)
+        except OSError as e:
+            print(f"⚠️ 追踪日志写入失败: {e}")
+
+
+class _SpanContext:
+    def __init__(self, tracer, step):
+        self.tracer = tracer
+        self.span = Span(step)
+
+    def __enter__(self):
+        self.started = time.time()
+        self.t0 = time.perf_counter()
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        if exc is not None: self.span.fail(f"{exc_type.__name__}: {exc}")
+        self.tracer.record(self.span, self.started, int((time.perf_counter() - self.t0) * 1000))
+        return False
+
+
+def current_span():
+    """当前正在记录的 span (被 traced 包装的函数内部用来 retry() / set())；不在 span 内时返回一个不落盘的空 span"""
+    return _current_span.get() or Span(None)
+
+
+def outcome_of(result):
+    """mcp_agent 步骤工具的提示语 -> 结果：以 ❌ / ⚠️ 开头记为 error / warning"""
+    if isinstance(result, str):
+        if result.startswith("❌"): return ERROR
+        if result.startswith("⚠️"): return WARNING
+    return OK
+
+
+def traced(tracer, step):
+    """
+    异步工具函数的装饰器：整个函数一个 span；返回的提示语以 ❌ / ⚠️ 开头时记为 error / warning
+    (mcp_agent 的步骤工具出错时返回提示语而不是抛异常)
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with tracer.span(step) as span:
+                result = await fn(*args, **kwargs)
+                outcome = outcome_of(result)
+                if outcome == ERROR: span.fail(result)
+                elif outcome == WARNING: span.warn(result)
+                return result
+        return wrapper
+    return decorator
+
+
+# ================= 📊 汇总 =================
+def load_spans(path=TRACE_PATH, runs=SUMMARY_RUNS, source=None):
+    """读取最近 runs 次发布的 span (按 run_id 首次出现的顺序取最后 runs 个)"""
+    spans = []
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try: span = json.loads(line)
+                except ValueError: continue
+                if source and span.get("source") != source: continue
+                spans.append(span)
+    except OSError:
+        return []
+    run_ids = list(dict.fromkeys(s["run_id"] for s in spans))[-runs:]
+    keep = set(run_ids)
+    return [s for s in spans if s["run_id"] in keep]
+
+
+def percentile(values, p):
+    """最近秩法 (nearest-rank)"""
+    ordered = sorted(values)
+    if not ordered: return 0
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(spans):
+    """按 (来源, 步骤) 汇总：次数、p50、p95、最大值、错误数、告警数、总重试；步骤按首次出现顺序"""
+    groups = {}
+    for s in spans:
+        groups.setdefault((s.get("source", ""), s["step"]), []).append(s)
+    rows = []
+    for (source, step), items in groups.items():
+        ms = [s["ms"] for s in items]
+        rows.append({
+            "source": source, "step": step, "count": len(items),
+            "p50_ms": percentile(ms, 50), "p95_ms": percentile(ms, 95), "max_ms": max(ms),
+            "errors": sum(1 for s in items if s.get("outcome") == ERROR),
+            "warnings": sum(1 for s in items if s.get("outcome") == WARNING),
+            "retries": sum(s.get("retries", 0) for s in items),
+        })
+    return rows
+
+
+def print_summary(rows, runs):
+    if not rows:
+        print("(没有追踪记录)")
+        return
+    print(f"最近 {runs} 次发布的步骤耗时:")
+    print(f"{'source':<12}{'step':<16}{'count':>6}{'p50':>9}{'p95':>9}{'max':>9}{'error':>6}{'warn':>6}{'retry':>6}")
+    for r in rows:
+        print(f"{r['source']:<12}{r['step']:<16}{r['count']:>6}{r['p50_ms']:>7}ms{r['p95_ms']:>7}ms{r['max_ms']:>7}ms"
+              f"{r['errors']:>6}{r['warnings']:>6}{r['retries']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RPA 步骤耗时追踪")
+    sub = parser.add_subparsers(dest="command", required=True)
+    summary = sub.add_parser("summary", help="各步骤 p50 / p95")
+    summary.add_argument("--runs", type=int, default=SUMMARY_RUNS, help="统计最近多少次发布")
+    summary.add_argument("--source", choices=("wechat_rpa", "mcp_agent"))
+    summary.add_argument("--path", default=TRACE_PATH)
+    summary.add_argument("--json", action="store_true", help="输出 JSON")
+    args = parser.parse_args()
+
+    spans = load_spans(args.path, args.runs, args.source)
+    rows = summarize(spans)
+    if args.json: print(json.dumps(rows, ensure_ascii=False, indent=2))
+    else: print_summary(rows, len({s["run_id"] for s in spans}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# 文件名: rpa_waits.py
+# RPA 显式等待：用页面状态 (元素可见 / 焦点 / 剪贴板事件 / DOM 静默) 代替固定 sleep
+# 同步 (wechat_rpa) 与异步 (mcp_agent) 共用同一组 JS 条件；WaitLog 记录每步实际等待与原固定 sleep 的差值
+
+import time
+
+# ================= ⚙️ 配置区域 =================
+WAIT_TIMEOUT_MS = 5000      # 软等待上限：超时只记录，不中断流程 (旧逻辑里这些位置本来就是盲等)
+EDITOR_TIMEOUT_MS = 30000   # 编辑器加载上限
+QUIET_MS = 300              # DOM 连续这么久没有变化即视为渲染 / 粘贴完成
+QUIET_TIMEOUT_MS = 8000
+
+# 编辑器 iframe (UEditor) 的 body 可编辑即就绪
+JS_EDITOR_READY = """() => {
+    const f = document.getElementById('ueditor_0');
+    const b = f && f.contentDocument && f.contentDocument.body;
+    return !!(b && b.isContentEditable && f.contentDocument.readyState === 'complete');
+}"""
+
+# 焦点落在指定 id 的元素上 (焦点在 iframe 内时 activeElement 是 iframe 本身)
+JS_FOCUSED = "id => !!document.activeElement && document.activeElement.id === id"
+
+# 全选后确实有选区
+JS_HAS_SELECTION = "() => document.getSelection().toString().length > 0"
+
+# 复制前挂 copy 监听，复制后等它触发 (剪贴板写入在 copy 事件后同步完成)
+JS_ARM_COPY = "() => { window.__rpaCopied = false; document.addEventListener('copy', () => { window.__rpaCopied = true; }, {once: true}); }"
+JS_COPIED = "() => window.__rpaCopied === true"
+
+JS_VALUE_EMPTY = "sel => { const e = document.querySelector(sel); return !!e && !(e.value || e.textContent || '').trim(); }"
+
+# 等目标 (普通选择器，或 '#ueditor_0' 这类 iframe 则看其 body) 出现内容，且 quiet 毫秒内无 DOM 变化；
+# 返回 true = 已静默，false = 超时
+JS_DOM_QUIET = """([sel, quiet, timeout]) => new Promise(resolve => {
+    const el = document.querySelector(sel);
+    const root = el && el.tagName === 'IFRAME' ? el.contentDocument && el.contentDocument.body : el;
+    if (!root) return resolve(false);
+    let timer = null;
+    const done = ok => { observer.disconnect(); clearTimeout(timer); clearTimeout(limit); resolve(ok); };
+    const arm = () => { clearTimeout(timer); timer = setTimeout(() => { if (root.childNodes.length) done(true); else arm(); }, quiet); };
+    const observer = new MutationObserver(arm);
+    observer.observe(root, {childList: true, subtree: true, characterData: true, attributes: true});
+    const limit = setTimeout(() => done(false), timeout);
+    arm();
+})"""
+
+
+class WaitLog:
+    """
+    记录每一步的显式等待：fixed_ms 为旧流程在这一步的固定 sleep，waited_ms 为实际等待
+    soft=True 的等待失败 / 超时只记一笔继续往下走，和旧的盲等行为一致
+    """
+
+    def __init__(self):
+        self.entries = []
+
+    def _record(self, step, fixed, t0, error=None):
+        waited = int((time.perf_counter() - t0) * 1000)
+        entry = {"step": step, "fixed_ms": int(fixed * 1000), "waited_ms": waited, "saved_ms": int(fixed * 1000) - waited}
+        if error is not None: entry["error"] = str(error).splitlines()[0][:120]
+        self.entries.append(entry)
+
+    def run(self, step, fixed, fn, *args, soft=True, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self._record(step, fixed, t0, e)
+            if not soft: raise
+            return None
+        self._record(step, fixed, t0)
+        return result
+
+    def skip(self, step, fixed):
+        """旧流程的固定 sleep 直接删除 (后续操作本身按顺序执行，不需要任何等待)"""
+        self._record(step, fixed, time.perf_counter())
+
+    async def arun(self, step, fixed, fn, *args, soft=True, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception as e:
+            self._record(step, fixed, t0, e)
+            if not soft: raise
+            return None
+        self._record(step, fixed, t0)
+        return result
+
+    def summary(self):
+        return {
+            "fixed_ms": sum(e["fixed_ms"] for e in self.entries),
+            "waited_ms": sum(e["waited_ms"] for e in self.entries),
+            "saved_ms": sum(e["saved_ms"] for e in self.entries),
+            "steps": self.entries,
+        }
+
+    def brief(self):
+        s = self.summary()
+        return f"等待 {s['waited_ms']}ms，原固定 sleep {s['fixed_ms']}ms，节省 {s['saved_ms']}ms"
+
+    def print_report(self):
+        print("⏱️ 显式等待 vs 固定 sleep:")
+        for e in self.entries:
+            flag = f"  ⚠️ {e['error']}" if "error" in e else ""
+            print(f"   {e['step']:<24} 固定 {e['fixed_ms']:>5}ms  实际 {e['waited_ms']:>5}ms  节省 {e['saved_ms']:>6}ms{flag}")
+        print(f"   合计: {self.brief()}")
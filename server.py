@@ -5,18 +5,30 @@ import time
 import json
 import logging
 import base64
-import requests
-import pangu
 import shutil
 import traceback
-import sqlite3
-from io import BytesIO
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from functools import wraps
-from flask import Flask, request, jsonify, send_from_directory, render_template_string, session, redirect, url_for
-from werkzeug.security import generate_password_hash, check_password_hash
+from urllib.parse import urlsplit
+from flask import Flask, Response, request, jsonify, send_from_directory, render_template_string, session, redirect, url_for, stream_with_context
+from werkzeug.security import safe_join
 from PIL import Image, ImageDraw, ImageFont
-from duckduckgo_search import DDGS
-import wechat_rpa
+from image_ops import remove_white_bg_native
+from asset_cache import assets
+from cover_encoder import encode_cover, COVER_FORMATS, EXTENSIONS, MIME_TYPES
+from artifacts import write_artifact, artifact_digest, IMMUTABLE_MAX_AGE
+from spacing import spacing_text
+from title_classifier import classify_title, format_amount, ACQUISITION, FINANCE, GENERAL, PAIR_MODES
+from renderer import parse_blocks, render_blocks, META, HEADING, TEXT, RENDERER_VERSION
+from http_client import fetch_image, FetchError
+from db import UserDB
+from workspace import new_workspace, start_sweeper, WORKSPACE_MAX_AGE
+from history import HistoryStore, history_key
+from jobs import JobManager, QueueFull, DONE, FAILED
+from publish_queue import PublishStore, PublishScheduler, load_accounts, PUBLISH_LIST_LIMIT, FAILED as PUBLISH_FAILED
+from logo_miss_cache import LogoMissCache, REASON_NO_RESULTS, REASON_TOO_SMALL, REASON_DOWNLOAD_FAILED
 
 # ================= ⚙️ 配置区域 =================
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -24,59 +36,73 @@ ASSETS_DIR = os.path.join(BASE_DIR, 'assets')
 LOGOS_DIR = os.path.join(BASE_DIR, 'logos')
 OUTPUT_DIR = os.path.join(BASE_DIR, 'output')
 DB_PATH = os.path.join(BASE_DIR, 'users.db')
-
-for d in [ASSETS_DIR, LOGOS_DIR, OUTPUT_DIR]:
-    if not os.path.exists(d): os.makedirs(d)
+LOGO_MISS_PATH = os.path.join(BASE_DIR, 'logos_miss.json')
 
 FONT_IMPACT_PATH = os.path.join(ASSETS_DIR, 'Impact.ttf')
 FONT_NORMAL_PATH = os.path.join(ASSETS_DIR, 'font.ttf') 
 
+# Logo 并发解析：关键词级线程池 + 候选图下载线程池 (分开两个池，避免嵌套等待死锁)
+LOGO_SEARCH_WORKERS = 4
+LOGO_DOWNLOAD_WORKERS = 8
+_logo_pool = ThreadPoolExecutor(max_workers=LOGO_SEARCH_WORKERS, thread_name_prefix="logo")
+_download_pool = ThreadPoolExecutor(max_workers=LOGO_DOWNLOAD_WORKERS, thread_name_prefix="logo-dl")
+
+# Logo 负缓存：搜不到的关键词在 TTL 内不再重复搜索
+LOGO_MISS_TTL = int(os.environ.get('AUTOWECHAT_LOGO_MISS_TTL', 24 * 3600))  # 秒
+logo_misses = LogoMissCache(LOGO_MISS_PATH, LOGO_MISS_TTL)
+
 app = Flask(__name__)
 app.secret_key = 'autowechat_secret_key_2025_inp_secure'
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# ================= 🧹 清理函数 =================
-def clean_output_dir():
-    try:
-        if os.path.exists(OUTPUT_DIR):
-            for filename in os.listdir(OUTPUT_DIR):
-                file_path = os.path.join(OUTPUT_DIR, filename)
-                try:
-                    if os.path.isfile(file_path) or os.path.islink(file_path):
-                        os.unlink(file_path)
-                    elif os.path.isdir(file_path):
-                        shutil.rmtree(file_path)
-                except: pass
-    except: pass
+# 正文图片模式：inline = Base64 内嵌 (可直接复制进公众号，默认)；link = 引用 URL (HTML 体积小，适合预览)
+HTML_IMAGE_MODES = ("inline", "link")
+HTML_IMAGE_MODE = os.environ.get('AUTOWECHAT_HTML_IMAGES', 'inline')
+ASSET_URL_PREFIX = '/assets'
+
+# 封面编码：在字节预算内找满足 SSIM 下限的最低质量；格式可选 jpeg (渐进式 + optimize) / webp
+COVER_FORMAT = os.environ.get('AUTOWECHAT_COVER_FORMAT', 'jpeg')
+COVER_MAX_BYTES = int(os.environ.get('AUTOWECHAT_COVER_MAX_KB', 200)) * 1024
+COVER_SSIM_FLOOR = float(os.environ.get('AUTOWECHAT_COVER_SSIM', 0.985))
+COVER_PROGRESSIVE = True
+
+# 生成任务队列：并发数 / 排队上限可通过环境变量调整
+JOB_WORKERS = int(os.environ.get('AUTOWECHAT_JOB_WORKERS', 4))
+JOB_QUEUE_DEPTH = int(os.environ.get('AUTOWECHAT_JOB_QUEUE', 32))
+# 状态快照写进任务目录 (job.json)，多进程部署时任一 worker 都能查询进度
+jobs = JobManager(workers=JOB_WORKERS, max_pending=JOB_QUEUE_DEPTH, state_dir=OUTPUT_DIR)
+# /output/ 下不对外提供的文件：任务快照 (含错误信息与本地路径) 与写入中的临时文件
+PRIVATE_OUTPUT_SUFFIXES = ('.json', '.tmp')
+JOB_SNAPSHOT_POLL = 0.5  # 其他 worker 上的任务：SSE 轮询快照的间隔 (秒)
+
+# 生成历史：相同输入直接返回上次的产物；按最近使用时间 / 总大小淘汰 (连同任务目录)
+HISTORY_DB_PATH = os.path.join(BASE_DIR, 'history.db')
+HISTORY_MAX_AGE = int(os.environ.get('AUTOWECHAT_HISTORY_MAX_AGE', WORKSPACE_MAX_AGE))
+HISTORY_MAX_BYTES = int(os.environ.get('AUTOWECHAT_HISTORY_MAX_MB', 200)) * 1024 * 1024
+gen_history = HistoryStore(HISTORY_DB_PATH)
+
+# 发布队列：任务存 publish.db，每个公众号账号 (config.WECHAT_ACCOUNTS) 一个 worker，账号内串行、账号间并行
+PUBLISH_DB_PATH = os.path.join(BASE_DIR, 'publish.db')
+PUBLISH_LOCK_PATH = os.path.join(BASE_DIR, 'publish.lock')  # 多进程部署时只有持锁进程执行发布
+publish_accounts = load_accounts()
+
+def ensure_dirs():
+    """创建素材 / Logo / 输出目录 (启动时调用一次，导入模块本身不碰文件系统)"""
+    for d in [ASSETS_DIR, LOGOS_DIR, OUTPUT_DIR]: os.makedirs(d, exist_ok=True)
 
 # ================= 🔐 数据库与用户认证 =================
+users_db = UserDB(DB_PATH)
+
+DEFAULT_USER = ('INP', 'INPinp123')
+
 def init_database():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    cursor.execute('SELECT COUNT(*) FROM users WHERE username = ?', ('INP',))
-    if cursor.fetchone()[0] == 0:
-        password_hash = generate_password_hash('INPinp123')
-        cursor.execute('INSERT INTO users (username, password_hash) VALUES (?, ?)', ('INP', password_hash))
-    conn.commit()
-    conn.close()
+    users_db.init_schema()
+    users_db.ensure_user(*DEFAULT_USER)
+    users_db.close()  # 启动线程 (gunicorn 下是 master) 不保留连接，fork 出的 worker 各自重连
 
 def verify_user(username, password):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('SELECT password_hash FROM users WHERE username = ?', (username,))
-    result = cursor.fetchone()
-    conn.close()
-    if result and check_password_hash(result[0], password): return True
-    return False
+    return users_db.verify(username, password)
 
 def login_required(f):
     @wraps(f)
@@ -125,20 +151,6 @@ def safe_open_image(img_data):
         return safe_img
     except: return None
 
-def remove_white_bg_native(img, threshold=245):
-    if img.mode != 'RGBA': img = img.convert('RGBA')
-    datas = img.getdata()
-    new_data = []
-    for item in datas:
-        if item[0] > threshold and item[1] > threshold and item[2] > threshold:
-            new_data.append((255, 255, 255, 0))
-        else:
-            new_data.append(item)
-    clean_img = Image.new("RGBA", img.size)
-    clean_img.putdata(new_data)
-    bbox = clean_img.getbbox()
-    return clean_img.crop(bbox) if bbox else clean_img
-
 def resize_logo_normalized(img, max_h, max_w):
     w, h = img.size
     scale = min(max_h/h, max_w/w)
@@ -146,65 +158,99 @@ def resize_logo_normalized(img, max_h, max_w):
 
 def is_high_quality(img): return img.width >= 200
 
-def search_logo_with_ai(keyword):
-    clean_keyword = re.sub(r'[^\w\s\-\.\u4e00-\u9fa5]', '', keyword).strip()
+def _download_logo_candidate(url, cancel):
+    """下载单个候选图，返回 (img, 未命中原因)；合格 (宽 > 200px) 时原因为 None"""
+    if cancel.is_set(): return None, None
+    try:
+        img = safe_open_image(fetch_image(url, timeout=5, cancel=cancel))
+    except FetchError as e:
+        return None, None if e.reason == "cancelled" else REASON_DOWNLOAD_FAILED
+    except Exception:  # 解码异常等，算一次下载失败，不中断整个 Logo 查找
+        return None, REASON_DOWNLOAD_FAILED
+    if img is None: return None, REASON_DOWNLOAD_FAILED
+    if img.width > 200: return img, None
+    return None, REASON_TOO_SMALL
+
+def _first_good_candidate(urls):
+    """
+    候选图并行下载，第一个通过质量门禁的胜出，其余立即取消
+    返回 (img, 未命中原因)；只要有一张图因太小被拒，原因记为 too_small
+    """
+    if not urls: return None, REASON_NO_RESULTS
+    cancel = threading.Event()
+    futures = [_download_pool.submit(_download_logo_candidate, u, cancel) for u in urls]
+    reasons = set()
+    try:
+        for fut in as_completed(futures):
+            img, reason = fut.result()
+            if img is not None: return img, None
+            reasons.add(reason)
+    finally:
+        cancel.set()
+        for fut in futures: fut.cancel()
+    return None, REASON_TOO_SMALL if REASON_TOO_SMALL in reasons else REASON_DOWNLOAD_FAILED
+
+# Logo 来源 (进度事件中的缓存命中情况)
+LOGO_DISK_HIT = "disk_hit"
+LOGO_NEGATIVE_HIT = "negative_hit"
+LOGO_SEARCHED = "searched"
+LOGO_NOT_FOUND = "not_found"
+LOGO_SEARCH_ERROR = "search_error"
+
+def clean_logo_keyword(keyword):
+    """Logo 文件名 / 负缓存共用的关键词规范化"""
+    return re.sub(r'[^\w\s\-\.\u4e00-\u9fa5]', '', keyword).strip()
+
+def resolve_logo(keyword):
+    """获取 Logo，返回 (img 或 None, 来源)"""
+    clean_keyword = clean_logo_keyword(keyword)
     local_path = os.path.join(LOGOS_DIR, f"{clean_keyword}.png")
     if os.path.exists(local_path):
-        return safe_open_image(local_path)
+        return safe_open_image(local_path), LOGO_DISK_HIT
+    if logo_misses.get(clean_keyword): return None, LOGO_NEGATIVE_HIT
     try:
+        from duckduckgo_search import DDGS  # 首次联网搜索时才加载
         with DDGS() as ddgs:
             results = list(ddgs.images(f"{clean_keyword} logo png transparent", type_image='transparent', max_results=3))
-            for res in results:
-                try:
-                    resp = requests.get(res['image'], headers={"User-Agent": "Mozilla/5.0"}, timeout=5)
-                    if resp.status_code == 200:
-                        img = safe_open_image(BytesIO(resp.content))
-                        if img and img.width > 200:
-                            img = remove_white_bg_native(img)
-                            img.save(local_path, "PNG")
-                            return img
-                except: continue
-    except: pass
-    return None
-
-def clean_company_name(text):
-    text = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', text) 
-    text = text.split("：")[0].split(":")[0].strip()
-    if " " in text: return text.split(" ")[0]
-    return text
+    except: return None, LOGO_SEARCH_ERROR  # 搜索接口异常 (限流/断网) 属于临时故障，不写负缓存
+    img, reason = _first_good_candidate([res['image'] for res in results if res.get('image')])
+    if img is None:
+        logo_misses.record(clean_keyword, reason)
+        return None, LOGO_NOT_FOUND
+    img = remove_white_bg_native(img)
+    # 先写临时文件再替换，并发请求同一关键词时不会读到半个 PNG
+    tmp_path = f"{local_path}.{threading.get_ident()}.tmp"
+    try:
+        img.save(tmp_path, "PNG")
+        os.replace(tmp_path, local_path)
+    except:
+        if os.path.exists(tmp_path): os.unlink(tmp_path)
+    return img, LOGO_SEARCHED
+
+def search_logo_with_ai(keyword):
+    return resolve_logo(keyword)[0]
+
+def resolve_logo_offline(keyword):
+    """只查本地 Logo 库，不联网 (批量渲染子进程使用，搜索已在主进程统一完成)"""
+    clean_keyword = re.sub(r'[^\w\s\-\.\u4e00-\u9fa5]', '', keyword).strip()
+    local_path = os.path.join(LOGOS_DIR, f"{clean_keyword}.png")
+    if os.path.exists(local_path): return safe_open_image(local_path), LOGO_DISK_HIT
+    return None, LOGO_NOT_FOUND
+
+def _logo_with_event(keyword, emit=None, resolver=resolve_logo):
+    t0 = time.time()
+    img, source = resolver(keyword)
+    if emit: emit("logo_resolved", keyword=keyword, cache=source, found=img is not None, lookup_ms=int((time.time() - t0) * 1000))
+    return img
+
+def search_logos_concurrently(keywords, emit=None, resolver=resolve_logo):
+    """多个关键词同时解析 Logo，返回顺序与输入一致"""
+    return list(_logo_pool.map(lambda k: _logo_with_event(k, emit, resolver), keywords))
 
 def parse_info_from_title(title):
-    title = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', title).strip()
-    info = {"mode": "general", "keywords": []}
-    if any(k in title for k in ["收购", "并购", "买下"]):
-        info['mode'] = "acquisition"
-        split_char = "收购" if "收购" in title else "并购" if "并购" in title else "买下"
-        parts = title.split(split_char)
-        if len(parts) >= 2:
-            info['keywords'] = [clean_company_name(parts[0]), clean_company_name(parts[1])]
-            return info
-    if any(k in title for k in ["融资", "获投", "完成"]):
-        info['mode'] = "finance"
-        company_part = re.split(r'(完成|获投|融资|宣布)', title)[0]
-        info['keywords'] = [clean_company_name(company_part)]
-        amt_match = re.search(r'(\d+(?:\.\d+)?\s*(?:亿|万|千万|百万)?\s*(?:美元|人民币|元|B|M)?)', title)
-        info['amount'] = amt_match.group(1).strip() if amt_match else ""
-        return info
-    info['keywords'] = [clean_company_name(title)]
-    return info
-
-def format_amount(amt):
-    if not amt: return "$", "0", ""
-    sym = "$"
-    num_match = re.search(r'(\d+(?:\.\d+)?)', amt.replace(' ', ''))
-    val = float(num_match.group(1)) if num_match else 0
-    mult = 1
-    if "亿" in amt: mult = 10**8
-    elif "万" in amt: mult = 10**4
-    val = val * mult
-    if val >= 10**9: return sym, f"{val/10**9:g}", "B"
-    if val >= 10**6: return sym, f"{val/10**6:g}", "M"
-    return sym, f"{val:g}", ""
+    """标题 -> 封面参数 {mode, keywords, amount} (规则见 title_classifier)"""
+    t = classify_title(title)
+    return {"mode": t.mode, "keywords": t.companies, "amount": t.amount}
 
 def safe_paste(base, img, pos):
     try: base.paste(img, pos, img)
@@ -212,26 +258,34 @@ def safe_paste(base, img, pos):
         try: base.paste(img, pos)
         except: pass
 
-def generate_cover_image(info):
+# 封面画布 (2 倍图) 与底图；上市 / 合作等新模式没有专属底图，回落到通用底图
+COVER_SCALE = 2
+COVER_SIZE = (900 * COVER_SCALE, 383 * COVER_SCALE)
+COVER_BACKGROUNDS = {FINANCE: "bg_finance.jpg", ACQUISITION: "bg_merge.jpg"}
+COVER_DEFAULT_BG = "bg_general.jpg"
+COVER_FONT_SIZES = (40 * COVER_SCALE, 128 * COVER_SCALE)
+
+def render_cover_image(info, emit=None, resolver=resolve_logo):
+    """绘制封面，返回 RGBA 图 (未编码)"""
     mode = info['mode']
     keywords = info['keywords']
-    SCALE = 2
-    W, H = 900 * SCALE, 383 * SCALE
+    SCALE = COVER_SCALE
+    W, H = COVER_SIZE
     BLUE = (22, 88, 255)
     
-    bg_map = {"finance": "bg_finance.jpg", "acquisition": "bg_merge.jpg"}
-    bg_path = os.path.join(ASSETS_DIR, bg_map.get(mode, "bg_general.jpg"))
-    base = Image.open(bg_path).convert("RGBA").resize((W, H)) if os.path.exists(bg_path) else Image.new("RGBA", (W, H), (255,255,255))
+    bg_path = os.path.join(ASSETS_DIR, COVER_BACKGROUNDS.get(mode, COVER_DEFAULT_BG))
+    base = assets.background(bg_path, (W, H))
+    if base is None: base = Image.new("RGBA", (W, H), (255,255,255))
     draw = ImageDraw.Draw(base)
     
     try:
-        fx = ImageFont.truetype(FONT_IMPACT_PATH, 40*SCALE)
-        fs = ImageFont.truetype(FONT_IMPACT_PATH, 40*SCALE)
-        fn = ImageFont.truetype(FONT_IMPACT_PATH, 128*SCALE)
-        fu = ImageFont.truetype(FONT_IMPACT_PATH, 40*SCALE)
+        fx = assets.font(FONT_IMPACT_PATH, 40*SCALE)
+        fs = assets.font(FONT_IMPACT_PATH, 40*SCALE)
+        fn = assets.font(FONT_IMPACT_PATH, 128*SCALE)
+        fu = assets.font(FONT_IMPACT_PATH, 40*SCALE)
     except: fn = ImageFont.load_default()
         
-    if mode == "finance":
+    if mode == FINANCE:
         s, n, u = format_amount(info.get('amount', ''))
         ws, wn, wu = fs.getlength(s), fn.getlength(n), fu.getlength(u)
         total_w = ws + wn + wu + 20*SCALE
@@ -240,17 +294,17 @@ def generate_cover_image(info):
         draw.text((sx+ws+10*SCALE, base_y), n, font=fn, fill=BLUE, anchor="ls")
         draw.text((sx+ws+10*SCALE+wn+10*SCALE, base_y), u, font=fu, fill=BLUE, anchor="ls")
         if keywords:
-            l = search_logo_with_ai(keywords[0])
+            l = _logo_with_event(keywords[0], emit, resolver)
             if l:
                 l = resize_logo_normalized(l, 100*SCALE, 400*SCALE)
                 pos = (int((W-l.width)/2), int(280*SCALE-l.height/2))
                 safe_paste(base, l, pos)
-    elif mode == "acquisition" and len(keywords) >= 2:
+    elif mode in PAIR_MODES and len(keywords) >= 2:
         PAD = 27 * SCALE
         LINE_W = max(1, 1 * SCALE) 
         MAX_W = 360 * SCALE
         MAX_H = 143 * SCALE
-        l1, l2 = search_logo_with_ai(keywords[0]), search_logo_with_ai(keywords[1])
+        l1, l2 = search_logos_concurrently(keywords[:2], emit, resolver)
         if l1 and l2:
             l1 = resize_logo_normalized(l1, MAX_H, MAX_W)
             l2 = resize_logo_normalized(l2, MAX_H, MAX_W)
@@ -265,14 +319,21 @@ def generate_cover_image(info):
             safe_paste(base, l2, (l2_x, int((H-l2.height)/2)))
     else:
         if keywords:
-            l = search_logo_with_ai(keywords[0])
+            l = _logo_with_event(keywords[0], emit, resolver)
             if l:
                 l = resize_logo_normalized(l, 150*SCALE, 500*SCALE)
                 safe_paste(base, l, (int((W-l.width)/2), int((H-l.height)/2)))
+    return base
+
+def save_cover_image(img, out_dir=OUTPUT_DIR, fmt=None):
+    """按封面编码配置写盘，返回 (文件名, 编码参数)"""
+    fmt = fmt if fmt in COVER_FORMATS else COVER_FORMAT
+    data, params = encode_cover(img, fmt, max_bytes=COVER_MAX_BYTES, ssim_floor=COVER_SSIM_FLOOR,
+                                progressive=COVER_PROGRESSIVE, optimize=True)
+    return write_artifact(out_dir, "cover", EXTENSIONS[fmt], data), params
 
-    fn = "cover.jpg"
-    base.convert("RGB").save(os.path.join(OUTPUT_DIR, fn), quality=95)
-    return fn
+def generate_cover_image(info, out_dir=OUTPUT_DIR, emit=None, resolver=resolve_logo):
+    return save_cover_image(render_cover_image(info, emit, resolver), out_dir)[0]
 
 # ================= 5. HTML 生成 (已恢复 Header 和 Author) =================
 def image_to_base64(path):
@@ -280,8 +341,13 @@ def image_to_base64(path):
     with open(path, "rb") as f:
         return base64.b64encode(f.read()).decode('utf-8')
 
-def generate_html_file(title, content, cover_image_filename=None):
-    title = pangu.spacing_text(title)
+def generate_html_file(title, content, cover_image_filename=None, out_dir=OUTPUT_DIR, image_mode=None):
+    """
+    生成公众号 HTML；image_mode 见 HTML_IMAGE_MODES (默认取 HTML_IMAGE_MODE)
+    inline 模式下 header.gif 的 Base64 由素材缓存复用，只有封面每次编码
+    """
+    image_mode = image_mode if image_mode in HTML_IMAGE_MODES else HTML_IMAGE_MODE
+    title = spacing_text(title)
     FONT = "-apple-system, BlinkMacSystemFont, 'Helvetica Neue', 'PingFang SC', 'Microsoft YaHei', Arial, sans-serif"
     
     S_ROOT = f"margin: 0 auto; max-width: 677px; background-color: #ffffff; padding: 20px 8px; box-sizing: border-box; font-family: {FONT};"
@@ -303,42 +369,24 @@ def generate_html_file(title, content, cover_image_filename=None):
 
     lines = content.strip().split('\n')
     body_lines = lines[1:] if len(lines) > 1 else []
-    
-    html_body = ""
-    header_depths = []
-    for line in body_lines: 
-        m = re.match(r'^(#+)\s', line.strip())
-        if m: header_depths.append(len(m.group(1)))
-    min_depth = min(header_depths) if header_depths else 0
-    
-    for line in body_lines:
-        line = line.strip()
-        if not line: continue
-        line = pangu.spacing_text(line)
-        if "来源" in line or "链接" in line or "http" in line:
-            html_body += f'<section style="{S_META}">{line}</section>'
-            continue
-        md_match = re.match(r'^(#+)\s(.*)', line)
-        if md_match:
-            depth = len(md_match.group(1))
-            clean_text = md_match.group(2)
-            relative_level = depth - min_depth + 1
-            if relative_level == 1: html_body += f'<section style="{S_H1}">{clean_text}</section>'
-            elif relative_level == 2: html_body += f'<section style="{S_H2}">{clean_text}</section>'
-            else: html_body += f'<section style="{S_H3}">{clean_text}</section>'
-            continue
-        if "Insights" in line or "核心洞察" in line:
-            html_body += f'<section style="{S_H1}">{line}</section>'
-            continue
-        if len(line) < 24 and not re.search(r'[，。！？、：；]$', line):
-            html_body += f'<section style="{S_H1}">{line}</section>'
-        else:
-            line = re.sub(r'\*\*(.*?)\*\*', f'<span style="{S_BOLD}">\\1</span>', line)
-            html_body += f'<section style="{S_TXT}">{line}</section>'
+    heading_styles = {1: S_H1, 2: S_H2}
+    def wrap(block):
+        if block.kind == META: style = S_META
+        elif block.kind == HEADING: style = heading_styles.get(block.level, S_H3)
+        elif block.kind == TEXT: style = S_TXT
+        else: style = S_H1
+        return f'<section style="{style}">', '</section>'
+    html_body = render_blocks(parse_blocks(body_lines), wrap, bold_style=S_BOLD)
 
     # ✅ 恢复：Header GIF
-    b64_header = image_to_base64(os.path.join(ASSETS_DIR, 'header.gif'))
-    img_tag = f'<img src="data:image/gif;base64,{b64_header}" style="width: 100%; display: block; margin: 0; border-radius: 4px;" alt="Header">' if b64_header else ""
+    header_path = os.path.join(ASSETS_DIR, 'header.gif')
+    if image_mode == "link":
+        # 相对 HTML 所在目录的路径：file:// 打开 (复制粘贴) 与 /output/ 下经 HTTP 访问都能解析到 assets/header.gif
+        header_src = os.path.relpath(header_path, out_dir).replace(os.sep, '/') if os.path.exists(header_path) else ""
+    else:
+        b64_header = assets.base64(header_path)
+        header_src = f"data:image/gif;base64,{b64_header}" if b64_header else ""
+    img_tag = f'<img src="{header_src}" style="width: 100%; display: block; margin: 0; border-radius: 4px;" alt="Header">' if header_src else ""
 
     # ✅ 恢复：作者栏 (两行，右对齐)
     author_block = f'''
@@ -350,10 +398,17 @@ def generate_html_file(title, content, cover_image_filename=None):
 
     cover_img_tag = ""
     if cover_image_filename:
-        b64_cover = image_to_base64(os.path.join(OUTPUT_DIR, cover_image_filename))
-        if b64_cover:
+        cover_path = os.path.join(out_dir, cover_image_filename)
+        if image_mode == "link":
+            # 与 HTML 同目录，相对路径即可 (封面名带哈希，HTML 内容随封面变化，两者一起失效)
+            cover_src = cover_image_filename if os.path.exists(cover_path) else ""
+        else:
+            b64_cover = image_to_base64(cover_path)
+            mime = MIME_TYPES["webp"] if cover_image_filename.endswith(".webp") else MIME_TYPES["jpeg"]
+            cover_src = f"data:{mime};base64,{b64_cover}" if b64_cover else ""
+        if cover_src:
             # 封面图放在最后
-            cover_img_tag = f'<p style="text-align:center; margin-top:20px;"><img src="data:image/jpeg;base64,{b64_cover}" style="width: 80%; border:1px solid #eee;" alt="COVER"></p>'
+            cover_img_tag = f'<p style="text-align:center; margin-top:20px;"><img src="{cover_src}" style="width: 80%; border:1px solid #eee;" alt="COVER"></p>'
 
     full_html = f'''<!DOCTYPE html>
 <html lang="zh-CN">
@@ -371,9 +426,205 @@ def generate_html_file(title, content, cover_image_filename=None):
 </body>
 </html>'''
 
-    fn = "news.html"
-    with open(os.path.join(OUTPUT_DIR, fn), 'w', encoding='utf-8') as f: f.write(full_html)
-    return fn
+    return write_artifact(out_dir, "news", "html", full_html.encode('utf-8'))
+
+# ================= 6. 生成流水线 =================
+def build_info(text, manual_keywords):
+    """取首行为标题并识别模式；手动指定的 Logo 关键词优先"""
+    title = text.split('\n')[0]
+    info = parse_info_from_title(title)
+    if manual_keywords:
+        info['keywords'] = manual_keywords
+        info['mode'] = ACQUISITION if len(manual_keywords) >= 2 else GENERAL
+    return title, info
+
+def run_generate_pipeline(text, manual_keywords, job_id, job_dir, emit=None, image_mode=None, cover_format=None):
+    """
+    解析标题 -> 封面 -> HTML，产物写入任务目录；返回相对 output/ 的路径与封面编码参数
+    emit(stage, **data) 用于上报阶段进度 (SSE)
+    """
+    emit = emit or (lambda stage, **data: None)
+    title, info = build_info(text, manual_keywords)
+    emit("title_parsed", mode=info['mode'], keywords=info['keywords'])
+    cover, encoding = save_cover_image(render_cover_image(info, emit=emit), job_dir, cover_format)
+    emit("cover_rendered", file=cover, encoding=encoding)
+    html = generate_html_file(title, text, cover_image_filename=cover, out_dir=job_dir, image_mode=image_mode)
+    emit("html_written", file=html, bytes=os.path.getsize(os.path.join(job_dir, html)))
+    return {"cover": f"{job_id}/{cover}", "html": f"{job_id}/{html}", "cover_encoding": encoding}
+
+def logo_state(keywords):
+    """封面会用到的 Logo 在本地库里的状态 [(规范化关键词, 文件修改时间 或 None)]；换图 / 新搜到 Logo 后随之变化"""
+    state = []
+    for keyword in keywords:
+        clean_keyword = clean_logo_keyword(keyword)
+        try: mtime = os.stat(os.path.join(LOGOS_DIR, f"{clean_keyword}.png")).st_mtime_ns
+        except OSError: mtime = None
+        state.append((clean_keyword, mtime))
+    return state
+
+def generation_key(text, manual_keywords, image_mode=None, cover_format=None):
+    """历史记录键：默认值先展开，显式传默认值与不传视为同一输入；Logo 库有变化时不再命中旧产物"""
+    return history_key(text, manual_keywords, RENDERER_VERSION,
+                       image_mode=image_mode if image_mode in HTML_IMAGE_MODES else HTML_IMAGE_MODE,
+                       cover_format=cover_format if cover_format in COVER_FORMATS else COVER_FORMAT,
+                       cover_max_bytes=COVER_MAX_BYTES, cover_ssim=COVER_SSIM_FLOOR,
+                       logos=logo_state(build_info(text, manual_keywords)[1]['keywords']))
+
+def lookup_history(key):
+    """命中且产物仍在磁盘时返回 (job_id, result)；顺带刷新任务目录时间，常用结果不会被清理线程回收"""
+    hit = gen_history.get(key)
+    if not hit: return None
+    job_id, result = hit
+    if not all(os.path.exists(os.path.join(OUTPUT_DIR, result[k])) for k in ("cover", "html")):
+        gen_history.delete(key)
+        return None
+    try: os.utime(os.path.join(OUTPUT_DIR, job_id))
+    except OSError: pass
+    return hit
+
+def record_history(key, job_id, result):
+    """
+    写入历史；超出保留期 / 总大小的旧记录连同任务目录一起删除
+    仍被排队任务或待发布任务引用的目录只删记录，目录留给清理线程在不再引用后回收
+    """
+    size = sum(os.path.getsize(os.path.join(OUTPUT_DIR, result[k])) for k in ("cover", "html"))
+    gen_history.put(key, job_id, result, size)
+    evicted = [old for old in gen_history.evict(HISTORY_MAX_AGE, HISTORY_MAX_BYTES) if old != job_id]
+    if not evicted: return
+    in_use = workspaces_in_use()
+    for old in evicted:
+        if old not in in_use: shutil.rmtree(os.path.join(OUTPUT_DIR, old), ignore_errors=True)
+
+def generate_and_record(text, manual_keywords, job_id, job_dir, emit=None, image_mode=None, cover_format=None):
+    """跑生成流水线并写入历史；Logo 可能是这次才搜到的，按生成后的 Logo 状态记键，下次同样的输入才能命中"""
+    options = {"image_mode": image_mode, "cover_format": cover_format}
+    result = run_generate_pipeline(text, manual_keywords, job_id, job_dir, emit=emit, **options)
+    record_history(generation_key(text, manual_keywords, **options), job_id, result)
+    return result
+
+# ================= 7. 批量生成 (进程池) =================
+BATCH_MAX_ITEMS = 100
+BATCH_WORKERS = int(os.environ.get('AUTOWECHAT_BATCH_WORKERS', os.cpu_count() or 2))
+_batch_pool = None
+_batch_pool_lock = threading.Lock()
+
+def get_batch_pool():
+    """懒加载进程池；用 spawn 启动，避免 fork 继承主进程里的线程与锁"""
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is None:
+            _batch_pool = ProcessPoolExecutor(max_workers=BATCH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _batch_pool
+
+def parse_batch_items(items):
+    """items 每项为文本，或 {"text": ..., "keywords": [...]}；返回 [(text, keywords)]，格式不对抛 ValueError"""
+    parsed = []
+    for index, item in enumerate(items):
+        if isinstance(item, str): text, keywords = item, []
+        elif isinstance(item, dict): text, keywords = item.get('text', ''), item.get('keywords') or []
+        else: raise ValueError(f"第 {index} 项应为文本或对象")
+        if not isinstance(text, str) or not text.strip(): raise ValueError(f"第 {index} 项缺少文本")
+        if not isinstance(keywords, list) or not all(isinstance(k, str) for k in keywords):
+            raise ValueError(f"第 {index} 项的 keywords 应为字符串列表")
+        parsed.append((text, keywords))
+    return parsed
+
+def render_batch_item(title, text, info, job_id, job_dir, image_mode=None, cover_format=None):
+    """子进程内渲染单条快讯：Logo 只读本地库 (主进程已统一搜索)"""
+    t0 = time.time()
+    cover, encoding = save_cover_image(render_cover_image(info, resolver=resolve_logo_offline), job_dir, cover_format)
+    t1 = time.time()
+    html = generate_html_file(title, text, cover_image_filename=cover, out_dir=job_dir, image_mode=image_mode)
+    t2 = time.time()
+    return {"cover": f"{job_id}/{cover}", "html": f"{job_id}/{html}", "cover_encoding": encoding,
+            "timings": {"cover_ms": int((t1 - t0) * 1000), "html_ms": int((t2 - t1) * 1000)}}
+
+def run_batch(items, host, image_mode=None, cover_format=None, refresh=False):
+    """
+    批量生成：查历史 -> 解析未命中的标题 -> 全批次 Logo 去重后并发搜索一次 -> 进程池并行渲染 -> 写历史
+    items 为 parse_batch_items 的结果；image_mode / cover_format / refresh 与 /api/process 含义相同，对整批生效
+    返回清单 (每条的 URL 与耗时 + 整批耗时)
+    """
+    t0 = time.time()
+    options = {"image_mode": image_mode, "cover_format": cover_format}
+    manifest = [None] * len(items)
+    parsed = []
+    for index, (text, keywords) in enumerate(items):
+        key = generation_key(text, keywords, **options)
+        hit = None if refresh else lookup_history(key)
+        if hit:
+            job_id, result = hit
+            manifest[index] = {"index": index, "job_id": job_id, **output_urls(result, host),
+                               "cover_encoding": result.get("cover_encoding"), "cached": True}
+        else:
+            parsed.append((index, text, keywords) + build_info(text, keywords))
+    t1 = time.time()
+
+    unique_keywords = list(dict.fromkeys(k for *_, info in parsed for k in info['keywords'] if k))
+    sources = {}
+    def lookup(keyword):
+        sources[keyword] = resolve_logo(keyword)[1]
+    list(_logo_pool.map(lookup, unique_keywords))
+    t2 = time.time()
+
+    pool = get_batch_pool()
+    futures = []
+    for index, text, keywords, title, info in parsed:
+        job_id, job_dir = new_workspace(OUTPUT_DIR)
+        futures.append((index, text, keywords, job_id, title, pool.submit(render_batch_item, title, text, info, job_id, job_dir, **options)))
+    for index, text, keywords, job_id, title, fut in futures:
+        entry = {"index": index, "job_id": job_id, "title": title, "cached": False}
+        try:
+            result = fut.result()
+            timings = result.pop("timings")
+            record_history(generation_key(text, keywords, **options), job_id, result)  # Logo 已在上面搜好，按当前状态记键
+            entry.update(output_urls(result, host))
+            entry["cover_encoding"] = result["cover_encoding"]
+            entry["timings"] = timings
+        except Exception as e:
+            entry["error"] = str(e)
+        manifest[index] = entry
+    t3 = time.time()
+    return {
+        "items": manifest,
+        "logos": sources,
+        "timings": {"parse_ms": int((t1 - t0) * 1000), "logos_ms": int((t2 - t1) * 1000),
+                    "render_ms": int((t3 - t2) * 1000), "total_ms": int((t3 - t0) * 1000),
+                    "workers": BATCH_WORKERS},
+    }
+
+def output_urls(result, host):
+    return {"cover_url": f"{host}/output/{result['cover']}", "html_url": f"{host}/output/{result['html']}"}
+
+# ================= 8. 发布队列 =================
+_rpa_sessions = {}
+
+def run_publish_job(job_id, account, cfg, payload):
+    """账号 worker 线程里执行一次发布；每个账号复用自己的 CDP 会话 (对应一个独立的 Chrome)，追踪日志以任务 id 为 run_id"""
+    import wechat_rpa  # 连带加载 Playwright，只在真正发布时导入
+    session = _rpa_sessions.get(account)
+    if session is None: session = _rpa_sessions[account] = wechat_rpa.CDPSession(cfg.get("cdp_url", wechat_rpa.CDP_URL))
+    bot = wechat_rpa.WeChatBot(headless=False, session=session)
+    timings = bot.run_publish(
+        title=payload["title"],
+        author=cfg.get("author", "INP Family"),
+        content_html="",
+        cover_path=payload["cover_path"],
+        html_path=payload["html_path"],
+        run_id=job_id
+    )
+    if timings is None: raise RuntimeError("发布流程出错，详见服务日志")
+    return {"timings": timings}
+
+def workspaces_in_use():
+    """仍被引用的任务目录名：排队 / 执行中的生成任务 + 待发布任务的 html / 封面；清理与历史淘汰都要跳过"""
+    in_use = jobs.active_ids(stale_after=WORKSPACE_MAX_AGE)
+    for path in publisher.store.pending_paths():
+        rel = os.path.relpath(os.path.abspath(path), OUTPUT_DIR)
+        if not rel.startswith(os.pardir): in_use.add(rel.split(os.sep)[0])
+    return in_use
+
+publisher = PublishScheduler(PublishStore(PUBLISH_DB_PATH), publish_accounts, run_publish_job, lock_path=PUBLISH_LOCK_PATH)
 
 # ================= 路由部分 (保持不变) =================
 @app.route('/login', methods=['GET', 'POST'])
@@ -458,12 +709,13 @@ def home():
                 const keywords = kwStr ? kwStr.split(/[,，]/).map(s => s.trim()).filter(s => s) : [];
                 
                 try {
-                    const res = await fetch('/api/process', {
+                    const res = await fetch('/api/jobs', {
                         method: 'POST',
                         headers: {'Content-Type': 'application/json'},
                         body: JSON.stringify({ text, keywords })
                     });
-                    const data = await res.json();
+                    let data = await res.json();
+                    if(data.job_id && !data.cached) data = await waitForJob(data.job_id, btn);
                     
                     if(data.html_url) {
                         document.getElementById('cover-link').href = data.cover_url;
@@ -489,6 +741,37 @@ def home():
                 btn.disabled = false;
             }
 
+            const STAGE_TEXT = {
+                queued: "⏳ 排队中", started: "⏳ 开始处理", title_parsed: "📝 标题已解析",
+                logo_resolved: "🔍 Logo", cover_rendered: "🖼 封面已生成", html_written: "📄 排版完成"
+            };
+
+            // 优先用 SSE 实时显示进度；浏览器不支持或连接断开时退回轮询
+            function waitForJob(jobId, btn) {
+                return new Promise((resolve) => {
+                    if(!window.EventSource) return resolve(pollJob(jobId, btn));
+                    const es = new EventSource('/api/jobs/' + jobId + '/events');
+                    const onStage = (e) => {
+                        const ev = JSON.parse(e.data);
+                        let label = STAGE_TEXT[ev.stage] || ev.stage;
+                        if(ev.stage === 'logo_resolved') label += ` ${ev.keyword} (${ev.cache})`;
+                        btn.innerText = `${label} · ${ev.elapsed_ms}ms`;
+                    };
+                    Object.keys(STAGE_TEXT).forEach(s => es.addEventListener(s, onStage));
+                    ['done', 'failed'].forEach(s => es.addEventListener(s, (e) => { es.close(); resolve(JSON.parse(e.data)); }));
+                    es.onerror = () => { es.close(); resolve(pollJob(jobId, btn)); };
+                });
+            }
+
+            async function pollJob(jobId, btn) {
+                while(true) {
+                    const data = await (await fetch('/api/jobs/' + jobId)).json();
+                    if(data.state !== 'queued' && data.state !== 'running') return data;
+                    btn.innerText = data.state === 'queued' ? "⏳ 排队中..." : "⏳ 正在搜图与排版...";
+                    await new Promise(r => setTimeout(r, 1000));
+                }
+            }
+
             async function publishToWeChat() {
                 const btn = document.getElementById('btn-publish');
                 if(!window.currentData) return;
@@ -505,12 +788,21 @@ def home():
                         body: JSON.stringify(window.currentData)
                     });
                     const data = await res.json();
-                    
-                    if(data.status === 'success') {
-                        alert(data.msg);
+                    if(data.status !== 'queued') throw new Error(data.msg);
+
+                    // 发布在后台队列里执行 (同一账号排队)，轮询任务状态
+                    btn.innerText = "⏳ 已排队，等待机器人...";
+                    let job = data;
+                    while(job.state !== 'done' && job.state !== 'failed') {
+                        await new Promise(r => setTimeout(r, 2000));
+                        job = await (await fetch(data.status_url)).json();
+                        if(job.state === 'running') btn.innerText = "🤖 机器人正在操作...";
+                    }
+                    if(job.state === 'done') {
+                        alert("✅ 浏览器操作已完成！");
                         btn.innerText = "✅ 发布流程结束";
                     } else {
-                        alert("❌ 机器人报告错误: " + data.msg);
+                        alert("❌ 机器人报告错误: " + job.error);
                         btn.innerText = "❌ 重试发布";
                         btn.disabled = false;
                     }
@@ -525,59 +817,261 @@ def home():
     </html>
     ''', username=username)
 
+def output_path_from_url(url):
+    """把 /output/<job_id>/<file> 形式的 URL 还原为本地路径 (防目录穿越)；无效返回 None"""
+    path = urlsplit(url).path
+    if '/output/' not in path: return None
+    return safe_join(OUTPUT_DIR, path.split('/output/', 1)[1])
+
+@app.route(f'{ASSET_URL_PREFIX}/<path:filename>')
+def get_asset(filename):
+    """link 模式下 HTML 引用的公共素材 (仅图片)"""
+    if not filename.lower().endswith(('.gif', '.jpg', '.jpeg', '.png')): return jsonify({"code": 404}), 404
+    return send_from_directory(ASSETS_DIR, filename, max_age=86400)
+
 @app.route('/output/<path:filename>')
-def get_file(filename): return send_from_directory(OUTPUT_DIR, filename)
+def get_file(filename):
+    """
+    哈希命名的产物：强 ETag (即文件名里的哈希) + 一年 immutable 缓存，If-None-Match 命中返回 304
+    其他产物仍可条件请求，但每次回源校验；任务状态快照 (job.json) 与临时文件不对外提供
+    """
+    if filename.lower().endswith(PRIVATE_OUTPUT_SUFFIXES): return jsonify({"code": 404}), 404
+    digest = artifact_digest(filename)
+    if digest is None: return send_from_directory(OUTPUT_DIR, filename, max_age=0)
+    resp = send_from_directory(OUTPUT_DIR, filename, etag=digest, max_age=IMMUTABLE_MAX_AGE)
+    resp.cache_control.public = True
+    resp.cache_control.immutable = True
+    return resp
 
 @app.route('/api/process', methods=['POST'])
 @login_required
 def manual_test():
-    clean_output_dir()
     try:
         data = request.json
         text = data.get('text', '')
         manual_keywords = data.get('keywords', [])
-        title = text.split('\n')[0]
-        info = parse_info_from_title(title)
-        if manual_keywords:
-            info['keywords'] = manual_keywords
-            info['mode'] = "acquisition" if len(manual_keywords) >= 2 else "general"
-
         host = request.host_url.rstrip('/')
-        cover = generate_cover_image(info)
-        html = generate_html_file(title, text, cover_image_filename=cover)
-        return jsonify({"cover_url": f"{host}/output/{cover}", "html_url": f"{host}/output/{html}"})
+        options = {"image_mode": data.get('image_mode'), "cover_format": data.get('cover_format')}
+        key = generation_key(text, manual_keywords, **options)
+        # 同样的输入生成过且产物还在：直接返回 (refresh=true 强制重新生成)
+        hit = None if data.get('refresh') else lookup_history(key)
+        if hit:
+            job_id, result = hit
+            return jsonify({"job_id": job_id, **output_urls(result, host), "cover_encoding": result.get("cover_encoding"), "cached": True})
+        # 每个请求独立目录，并发生成互不覆盖；旧目录由后台清理线程回收
+        job_id, job_dir = new_workspace(OUTPUT_DIR)
+        result = generate_and_record(text, manual_keywords, job_id, job_dir, **options)
+        return jsonify({"job_id": job_id, **output_urls(result, host), "cover_encoding": result["cover_encoding"], "cached": False})
     except Exception as e:
         traceback.print_exc()
         return jsonify({"code": 500, "msg": str(e)}), 500
 
-@app.route('/api/publish_rpa', methods=['POST'])
+@app.route('/api/process_batch', methods=['POST'])
 @login_required
-def publish_rpa_action():
+def process_batch():
+    """
+    批量生成：items 为文本列表，或 {"text": ..., "keywords": [...]} 列表
+    image_mode / cover_format / refresh 与 /api/process 相同，对整批生效；命中历史的条目直接返回 (cached)
+    """
     try:
-        data = request.json
-        title = data.get('title', '未命名快讯')
-        html_url = data.get('html_url') 
-        cover_url = data.get('cover_url') 
-        
-        if not html_url or not cover_url: return jsonify({"status": "error", "msg": "缺少文件路径"}), 400
-
-        filename_html = html_url.split('/')[-1]
-        filename_cover = cover_url.split('/')[-1]
-        local_cover_path = os.path.join(OUTPUT_DIR, filename_cover)
-        
-        bot = wechat_rpa.WeChatBot(headless=False)
-        bot.run_publish(
-            title=title, 
-            author="INP Family", 
-            content_html="",
-            cover_path=local_cover_path
-        )
-        return jsonify({"status": "success", "msg": "✅ 浏览器操作已完成！"})
+        data = request.json or {}
+        items = data.get('items') or []
+        if not isinstance(items, list) or not items: return jsonify({"code": 400, "msg": "items 不能为空"}), 400
+        if len(items) > BATCH_MAX_ITEMS: return jsonify({"code": 400, "msg": f"单批最多 {BATCH_MAX_ITEMS} 条"}), 400
+        try: items = parse_batch_items(items)
+        except ValueError as e: return jsonify({"code": 400, "msg": str(e)}), 400
+        return jsonify(run_batch(items, request.host_url.rstrip('/'), image_mode=data.get('image_mode'),
+                                 cover_format=data.get('cover_format'), refresh=bool(data.get('refresh'))))
     except Exception as e:
         traceback.print_exc()
-        return jsonify({"status": "error", "msg": str(e)}), 500
+        return jsonify({"code": 500, "msg": str(e)}), 500
+
+@app.route('/api/jobs', methods=['GET', 'POST'])
+@login_required
+def submit_job():
+    """POST: 异步提交生成任务，立即返回 job_id；GET: 队列负载"""
+    if request.method == 'GET': return jsonify(jobs.stats())
+    data = request.json or {}
+    text = data.get('text', '')
+    if not text.strip(): return jsonify({"code": 400, "msg": "缺少文本"}), 400
+    keywords = data.get('keywords', [])
+    options = {"image_mode": data.get('image_mode'), "cover_format": data.get('cover_format')}
+    key = generation_key(text, keywords, **options)
+    hit = None if data.get('refresh') else lookup_history(key)
+    if hit:
+        # 历史命中：不排队，直接带上产物 URL 返回 (job_id 仍指向当初生成它的任务)
+        job_id, result = hit
+        return jsonify({"job_id": job_id, **output_urls(result, request.host_url.rstrip('/')),
+                        "cover_encoding": result.get("cover_encoding"), "cached": True})
+    job_id, job_dir = new_workspace(OUTPUT_DIR)
+    try:
+        jobs.submit(job_id, generate_and_record, text, keywords, job_id, job_dir, **options)
+    except QueueFull as e:
+        os.rmdir(job_dir)
+        return jsonify({"code": 503, "msg": str(e)}), 503
+    return jsonify({"job_id": job_id, "status_url": url_for('job_status', job_id=job_id), "cached": False}), 202
+
+@app.route('/api/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job: data = job.to_dict()
+    else:
+        # 任务由其他 worker 进程执行：读磁盘快照
+        data = jobs.snapshot(job_id)
+        if not data: return jsonify({"code": 404, "msg": "任务不存在或已过期"}), 404
+        data.pop('events', None)
+    if data['state'] == DONE: data.update(output_urls(data['result'], request.host_url.rstrip('/')))
+    return jsonify(data)
+
+def _snapshot_events(job_id):
+    """其他 worker 上的任务：轮询快照，产出 (新事件列表, 是否已结束, result)"""
+    sent, idle = 0, 0.0
+    while True:
+        snap = jobs.snapshot(job_id) or {}
+        events = snap.get('events', [])[sent:]
+        finished = snap.get('state') in (DONE, FAILED)
+        sent += len(events)
+        if events or finished or idle >= 15:
+            idle = 0.0
+            yield events, finished, snap.get('result')
+            if finished: return
+        time.sleep(JOB_SNAPSHOT_POLL)
+        idle += JOB_SNAPSHOT_POLL
+
+@app.route('/api/jobs/<job_id>/events')
+@login_required
+def job_events(job_id):
+    """SSE 进度流：每个阶段一条事件 (含 elapsed_ms)，任务结束后关闭"""
+    job = jobs.get(job_id)
+    if not job and not jobs.snapshot(job_id): return jsonify({"code": 404, "msg": "任务不存在或已过期"}), 404
+    host = request.host_url.rstrip('/')
+
+    def local_events():
+        sent = 0
+        while True:
+            events, finished = job.wait_events(sent)
+            sent += len(events)
+            done = finished and sent == len(job.events)
+            yield events, done, job.result
+            if done: return
+
+    def stream():
+        for events, finished, result in (local_events() if job else _snapshot_events(job_id)):
+            for event in events:
+                if event['stage'] == DONE: event = {**event, **output_urls(result, host)}
+                yield f"event: {event['stage']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+            if not events and not finished: yield ": keep-alive\n\n"
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/admin/logo_misses', methods=['GET', 'POST'])
+@login_required
+def logo_misses_admin():
+    """GET: 查看 Logo 负缓存；POST: 清除 (body 里带 keyword 只清一个，按与搜索相同的规则规范化)"""
+    if request.method == 'GET':
+        return jsonify({"ttl": LOGO_MISS_TTL, "entries": logo_misses.entries()})
+    keyword = (request.get_json(silent=True) or request.form).get('keyword')
+    keyword = clean_logo_keyword(keyword) if keyword else None
+    if keyword == "": return jsonify({"code": 400, "msg": "关键词无效"}), 400
+    return jsonify({"keyword": keyword, "purged": logo_misses.purge(keyword)})
+
+@app.route('/api/admin/history')
+@login_required
+def history_admin():
+    """生成历史概况：条数 / 产物总字节 / 累计命中次数"""
+    return jsonify({**gen_history.stats(), "max_age": HISTORY_MAX_AGE, "max_bytes": HISTORY_MAX_BYTES})
+
+@app.route('/api/publish_rpa', methods=['POST'])
+@login_required
+def publish_rpa_action():
+    """发布进队列后立即返回 202；进度查 /api/publish/<job_id>"""
+    data = request.json or {}
+    title = data.get('title', '未命名快讯')
+    html_url = data.get('html_url') 
+    cover_url = data.get('cover_url') 
+    account = data.get('account') or next(iter(publish_accounts))
+
+    if not html_url or not cover_url: return jsonify({"status": "error", "msg": "缺少文件路径"}), 400
+    if account not in publish_accounts: return jsonify({"status": "error", "msg": f"未知账号: {account}"}), 400
+
+    local_html_path = output_path_from_url(html_url)
+    local_cover_path = output_path_from_url(cover_url)
+    if not local_html_path or not local_cover_path: return jsonify({"status": "error", "msg": "文件路径无效"}), 400
+
+    job_id = publisher.submit(account, {"title": title, "html_path": local_html_path, "cover_path": local_cover_path,
+                                        "html_url": html_url, "cover_url": cover_url})
+    return jsonify({"status": "queued", "job_id": job_id, "account": account,
+                    "status_url": url_for('publish_status', job_id=job_id)}), 202
+
+@app.route('/api/publish')
+@login_required
+def publish_list():
+    """最近的发布任务 (可按 account 过滤) + 各账号各状态计数"""
+    limit = min(request.args.get('limit', PUBLISH_LIST_LIMIT, type=int), 500)
+    return jsonify({"jobs": publisher.store.list(request.args.get('account'), limit), **publisher.stats()})
+
+@app.route('/api/publish/<job_id>')
+@login_required
+def publish_status(job_id):
+    job = publisher.store.get(job_id)
+    if not job: return jsonify({"code": 404, "msg": "发布任务不存在"}), 404
+    return jsonify(job)
+
+@app.route('/api/publish/<job_id>/retry', methods=['POST'])
+@login_required
+def publish_retry(job_id):
+    """失败的发布任务 (含进程中途退出的) 人工确认草稿箱后重新排队"""
+    job = publisher.store.get(job_id)
+    if not job: return jsonify({"code": 404, "msg": "发布任务不存在"}), 404
+    if job["state"] != PUBLISH_FAILED: return jsonify({"code": 409, "msg": f"任务状态为 {job['state']}，只有失败的任务可以重试"}), 409
+    payload = job["payload"]
+    if not all(os.path.exists(payload.get(k) or "") for k in ("html_path", "cover_path")):
+        return jsonify({"code": 409, "msg": "文章或封面已被清理，请重新生成后发布"}), 409
+    if not publisher.retry(job_id, job["account"]): return jsonify({"code": 409, "msg": "任务状态已变化，请刷新后重试"}), 409
+    return jsonify({"status": "queued", "job_id": job_id, "account": job["account"],
+                    "status_url": url_for('publish_status', job_id=job_id)}), 202
+
+# ================= 🚀 启动与预热 =================
+_app_ready = False
+_app_init_lock = threading.Lock()
+
+def warm_caches():
+    """把首个请求要用的东西提前加载：底图 / 字体 / Header Base64、Logo 负缓存、pangu 与 numpy"""
+    t0 = time.time()
+    for name in set(COVER_BACKGROUNDS.values()) | {COVER_DEFAULT_BG}:
+        assets.background(os.path.join(ASSETS_DIR, name), COVER_SIZE)
+    for size in COVER_FONT_SIZES:
+        try: assets.font(FONT_IMPACT_PATH, size)
+        except OSError: pass
+    assets.base64(os.path.join(ASSETS_DIR, 'header.gif'))
+    logo_misses.entries()
+    spacing_text("预热 warm up")
+    import numpy  # noqa: F401  封面编码的 SSIM 用到
+    logger.info(f"🔥 缓存预热完成，用时 {int((time.time() - t0) * 1000)}ms")
+
+def create_app(start_background=True, start_publisher=False):
+    """
+    应用工厂：建目录、建库、预热缓存、启动目录清理线程，进程内只执行一次
+    gunicorn 以 preload_app 方式调用时在 master 里完成，fork 出的 worker 直接共享预热结果，清理线程也只在 master 里跑一份
+    发布 worker (Playwright / CDP 线程 + publish.lock 文件锁) 不能放进会 fork 的 master：
+    生产环境单独运行 python publish_queue.py，Web 进程只负责入队与查询；start_publisher 仅供不 fork 的开发模式
+    """
+    global _app_ready
+    with _app_init_lock:
+        if not _app_ready:
+            ensure_dirs()
+            init_database()
+            warm_caches()
+            if start_background:
+                start_sweeper(OUTPUT_DIR, keep=workspaces_in_use)
+            if start_publisher: publisher.start()
+            _app_ready = True
+    return app
 
 if __name__ == '__main__':
-    init_database()
+    # 开发模式 (单进程，发布 worker 同进程运行)；生产环境用 gunicorn -c gunicorn.conf.py wsgi:app + python publish_queue.py
+    create_app(start_publisher=True)
     port = 23456
     app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
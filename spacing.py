@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# 文件名: spacing.py
+# 中英文空格服务：pangu 外加快速路径与有界 LRU 缓存 (输出与 pangu.spacing_text 完全一致)
+
+import re
+from functools import lru_cache
+
+SPACING_CACHE_SIZE = 4096
+
+# 与 pangu.CJK 相同的字符范围；快速路径自己判断，纯 CJK / 纯英文的行不必加载 pangu (导入时要编译几十条正则)
+_RE_CJK = re.compile(r'[\u2e80-\u2eff\u2f00-\u2fdf\u3040-\u309f\u30a0-\u30fa\u30fc-\u30ff\u3100-\u312f\u3200-\u32ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]')
+
+# pangu 各条规则涉及的全部非 CJK 字符：ASCII 可见字符、拉丁补充、希腊字母、引号/破折号/省略号/间隔号、
+# 数字形式与装饰符号。一行里一个都没有时 pangu 的替换全部落空，结果只是 strip()
+_RE_TRIGGER = re.compile('[\x21-\x7e¡-ÿͰ-Ͽ״—“”•…‧⅐-↏✀-➿]')
+
+
+@lru_cache(maxsize=SPACING_CACHE_SIZE)
+def _cached_spacing(text):
+    import pangu
+    return pangu.spacing_text(text)
+
+
+def spacing_text(text):
+    """
+    等价于 pangu.spacing_text，但：
+    - 没有 CJK 的行原样返回 (pangu 自身也是如此)
+    - 纯 CJK / 全角标点的行只做 strip()，不跑正则
+    - 其余行走 LRU 缓存 ("来源"、"核心洞察"、署名等样板行跨文章重复出现)
+    """
+    if len(text) <= 1 or not _RE_CJK.search(text): return text
+    if not _RE_TRIGGER.search(text): return text.strip()
+    return _cached_spacing(text)
+
+
+def cache_info():
+    return _cached_spacing.cache_info()
+
+
+def cache_clear():
+    _cached_spacing.cache_clear()
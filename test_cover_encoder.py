@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+封面编码行为测试：质量搜索与线性扫描一致、SSIM 下限、字节预算优先
+
+用法: python -m pytest test_cover_encoder.py
+"""
+
+import io
+
+import pytest
+from PIL import Image, ImageDraw
+
+import cover_encoder
+from cover_encoder import encode_cover, ssim, _lowest_passing, QUALITY_MIN, QUALITY_MAX
+
+
+def sample_cover():
+    img = Image.new("RGB", (480, 200), "white")
+    draw = ImageDraw.Draw(img)
+    for i in range(0, 480, 12):
+        draw.line([(i, 0), (480 - i, 200)], fill=(i % 255, 80, 200 - i % 200), width=3)
+    draw.rectangle([40, 60, 200, 140], fill=(20, 120, 220))
+    return img
+
+
+@pytest.mark.parametrize("threshold", [QUALITY_MIN, 51, 63, 80, QUALITY_MAX, QUALITY_MAX + 1])
+@pytest.mark.parametrize("seed", [QUALITY_MIN, 70, QUALITY_MAX, 0, 200])
+def test_lowest_passing_matches_linear_scan(threshold, seed):
+    ok = lambda q: q >= threshold
+    expected = next((q for q in range(QUALITY_MIN, QUALITY_MAX + 1) if ok(q)), QUALITY_MAX)
+    assert _lowest_passing(ok, QUALITY_MIN, QUALITY_MAX, seed) == expected
+
+
+def test_ssim_identity_and_degradation():
+    img = sample_cover()
+    assert ssim(img, img) == pytest.approx(1.0)
+    assert ssim(img, img.resize((60, 25)).resize(img.size)) < 0.9
+
+
+@pytest.mark.parametrize("fmt", ["jpeg", "webp"])
+def test_meets_ssim_floor_at_lowest_quality(fmt):
+    cover_encoder._last_quality.clear()
+    img = sample_cover()
+    data, params = encode_cover(img, fmt, max_bytes=0, ssim_floor=0.95)
+    assert params["ssim_ok"] and params["ssim"] >= 0.95 and params["bytes"] == len(data)
+    assert Image.open(io.BytesIO(data)).format == fmt.upper()
+    if params["quality"] > QUALITY_MIN:  # 低一档就不满足下限
+        lower = encode_cover(img, fmt, max_bytes=0, ssim_floor=0.95, quality_range=(QUALITY_MIN, params["quality"] - 1))[1]
+        assert not lower["ssim_ok"]
+    # 第二张从上次选中的质量起步，结果相同但尝试次数不多于第一次
+    again = encode_cover(img, fmt, max_bytes=0, ssim_floor=0.95)[1]
+    assert again["quality"] == params["quality"] and again["attempts"] <= params["attempts"]
+
+
+def test_budget_wins_over_ssim():
+    img = sample_cover()
+    loose = encode_cover(img, max_bytes=0, ssim_floor=0.9999)[1]
+    budget = loose["bytes"] // 2
+    data, params = encode_cover(img, max_bytes=budget, ssim_floor=0.9999)
+    assert params["bytes"] <= budget or params["quality"] == QUALITY_MIN
+    assert not params["ssim_ok"]
+
+
+def test_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        encode_cover(sample_cover(), "gif")
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成历史行为测试：键的构成、命中计数、按年龄 / 总大小淘汰
+
+用法: python -m pytest test_history.py
+"""
+
+import time
+
+from history import HistoryStore, history_key
+
+
+def test_key_covers_inputs_and_options():
+    base = history_key("正文", ["OpenAI"], "v1", image_mode="inline")
+    assert base == history_key("正文", ["OpenAI"], "v1", image_mode="inline")
+    assert base != history_key("正文", ["OpenAI"], "v2", image_mode="inline")
+    assert base != history_key("正文", [], "v1", image_mode="inline")
+    assert base != history_key("正文", ["OpenAI"], "v1", image_mode="link")
+    assert base != history_key("正文", ["OpenAI"], "v1", image_mode="inline", logos=[("OpenAI", 1)])
+
+
+def test_get_put_and_hits(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    assert store.get("k") is None
+    store.put("k", "job1", {"cover": "job1/c.jpg"}, 10)
+    assert store.get("k") == ("job1", {"cover": "job1/c.jpg"})
+    assert store.stats() == {"entries": 1, "bytes": 10, "hits": 1}
+    store.delete("k")
+    assert store.get("k") is None
+
+
+def test_evict_by_age_then_size(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    for job_id in ("old", "mid", "new"):
+        store.put(job_id, job_id, {}, 10)
+        time.sleep(0.01)
+    store.get("old")  # 最近用过的排到最后淘汰
+    assert store.evict(max_age=3600, max_bytes=25) == ["mid"]
+    assert sorted(store.evict(max_age=0, max_bytes=1000)) == ["new", "old"]
+    assert store.stats()["entries"] == 0
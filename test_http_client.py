@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片下载行为测试：本机起一个 HTTP 服务，校验正常下载与各类拒绝原因 (不联网)
+
+用法: python -m pytest test_http_client.py
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from http_client import fetch_image, FetchError
+
+
+def png_bytes(size):
+    buf = BytesIO()
+    Image.new("RGB", size, "red").save(buf, "PNG")
+    return buf.getvalue()
+
+
+ROUTES = {
+    "/ok.png": (200, "image/png", png_bytes((32, 16))),
+    "/huge.png": (200, "image/png", png_bytes((600, 600))),
+    "/octet": (200, "application/octet-stream", png_bytes((8, 8))),
+    "/page": (200, "text/html", b"<html></html>"),
+    "/svg": (200, "image/svg+xml", b"<svg/>"),
+    "/markup": (200, "image/png", b"  <html>not an image</html>"),
+    "/empty": (200, "image/png", b""),
+    "/missing": (404, "text/plain", b"nope"),
+}
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        status, ctype, body = ROUTES[self.path]
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_fetch_ok(base_url):
+    assert Image.open(fetch_image(f"{base_url}/ok.png")).size == (32, 16)
+    assert Image.open(fetch_image(f"{base_url}/octet")).size == (8, 8)
+
+
+@pytest.mark.parametrize("path, reason, limits", [
+    ("/missing", "status", {}),
+    ("/page", "content_type", {}),
+    ("/svg", "content_type", {}),
+    ("/markup", "content_type", {}),
+    ("/empty", "decode", {}),
+    ("/ok.png", "too_large", {"max_bytes": 10}),
+    ("/huge.png", "too_large", {"max_pixels": 500 * 500}),
+])
+def test_fetch_rejects(base_url, path, reason, limits):
+    with pytest.raises(FetchError) as e:
+        fetch_image(f"{base_url}{path}", **limits)
+    assert e.value.reason == reason
+
+
+def test_cancel_and_network(base_url):
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(FetchError) as e:
+        fetch_image(f"{base_url}/ok.png", cancel=cancel)
+    assert e.value.reason == "cancelled"
+    with pytest.raises(FetchError) as e:
+        fetch_image("http://127.0.0.1:9/none.png", timeout=1)
+    assert e.value.reason == "network"
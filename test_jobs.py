@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成任务队列行为测试：结果 / 异常、排队上限、磁盘快照、退出前收尾
+
+用法: python -m pytest test_jobs.py
+"""
+
+import os
+import threading
+
+import pytest
+
+from jobs import JobManager, QueueFull, DONE, FAILED, QUEUED, RUNNING
+
+
+def make_dirs(root, *job_ids):
+    for job_id in job_ids: os.makedirs(os.path.join(root, job_id))
+
+
+def test_result_and_error(tmp_path):
+    make_dirs(tmp_path, "ok", "bad")
+    jobs = JobManager(workers=2, state_dir=str(tmp_path))
+    ok = jobs.submit("ok", lambda emit: emit("step", n=1) or {"v": 1})
+    bad = jobs.submit("bad", lambda emit: 1 / 0)
+    ok.future.result(5)
+    bad.future.result(5)
+    assert ok.state == DONE and ok.result == {"v": 1}
+    assert [e["stage"] for e in ok.events] == [QUEUED, "started", "step", DONE]
+    assert bad.state == FAILED and "division" in bad.error
+    snap = jobs.snapshot("ok")
+    assert snap["state"] == DONE and snap["result"] == {"v": 1} and len(snap["events"]) == 4
+
+
+def test_queue_full_and_active_ids(tmp_path):
+    make_dirs(tmp_path, "a", "b")
+    release = threading.Event()
+    jobs = JobManager(workers=1, max_pending=1, state_dir=str(tmp_path))
+    a = jobs.submit("a", lambda emit: release.wait(5))
+    jobs.submit("b", lambda emit: release.wait(5))
+    with pytest.raises(QueueFull):
+        jobs.submit("c", lambda emit: None)
+    assert jobs.active_ids() == {"a", "b"}
+    # 其他进程只能看到快照：换一个 JobManager 读同一目录
+    assert JobManager(state_dir=str(tmp_path)).active_ids() == {"a", "b"}
+    release.set()
+    a.future.result(5)
+    jobs.get("b").future.result(5)
+    assert jobs.active_ids() == set() and jobs.stats()["active"] == 0
+
+
+def test_snapshot_rejects_bad_ids(tmp_path):
+    jobs = JobManager(state_dir=str(tmp_path))
+    for job_id in ("", "../x", ".hidden", "missing"):
+        assert jobs.snapshot(job_id) is None
+
+
+def test_shutdown_marks_leftovers_failed(tmp_path):
+    """排队中的直接取消，超时仍在跑的标记失败；快照都不会停在 queued / running"""
+    make_dirs(tmp_path, "running", "queued")
+    started, release = threading.Event(), threading.Event()
+    jobs = JobManager(workers=1, state_dir=str(tmp_path))
+    running = jobs.submit("running", lambda emit: started.set() or release.wait(5))
+    queued = jobs.submit("queued", lambda emit: None)
+    assert started.wait(5)
+    assert jobs.shutdown(timeout=0.1) == 2
+    release.set()
+    running.future.result(5)
+    assert running.state == FAILED and queued.state == FAILED  # 执行完也不再改判为 done
+    for job_id in ("running", "queued"):
+        assert jobs.snapshot(job_id)["state"] not in (QUEUED, RUNNING)
+    assert jobs.stats()["active"] == 0
+    with pytest.raises(QueueFull):
+        jobs.submit("late", lambda emit: None)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发布队列行为测试：按账号领取、中途退出的任务置失败、显式重试、调度器跑通一条任务
+
+用法: python -m pytest test_publish_queue.py
+"""
+
+import time
+
+from publish_queue import PublishStore, PublishScheduler, ORPHAN_ERROR, QUEUED, RUNNING, DONE, FAILED
+
+
+def test_claim_in_order_per_account(tmp_path):
+    store = PublishStore(str(tmp_path / "publish.db"))
+    first = store.enqueue("a", {"n": 1})
+    store.enqueue("b", {"n": 2})
+    store.enqueue("a", {"n": 3})
+    assert store.claim("a") == (first, {"n": 1})
+    assert store.claim("a")[1] == {"n": 3}
+    assert store.claim("a") is None
+    assert store.counts() == {"a": {RUNNING: 2}, "b": {QUEUED: 1}}
+
+
+def test_recover_fails_orphans_and_retry_requeues(tmp_path):
+    store = PublishStore(str(tmp_path / "publish.db"))
+    orphan = store.enqueue("a", {"html_path": "/x/news.html"})
+    waiting = store.enqueue("a", {})
+    store.claim("a")
+    assert store.pending_paths() == {"/x/news.html"}
+    assert store.recover() == 1
+    job = store.get(orphan)
+    assert job["state"] == FAILED and job["error"] == ORPHAN_ERROR
+    assert store.get(waiting)["state"] == QUEUED
+    assert not store.retry(waiting)  # 只有失败的任务能重试
+    assert store.retry(orphan)
+    job = store.get(orphan)
+    assert job["state"] == QUEUED and job["error"] is None and job["finished_at"] is None
+
+
+def test_scheduler_runs_jobs(tmp_path):
+    seen = []
+
+    def runner(job_id, account, cfg, payload):
+        seen.append((account, cfg["author"], payload["n"]))
+        if payload["n"] == 2: raise RuntimeError("boom")
+        return {"draft": payload["n"]}
+
+    store = PublishStore(str(tmp_path / "publish.db"))
+    scheduler = PublishScheduler(store, {"a": {"author": "INP"}}, runner,
+                                 lock_path=str(tmp_path / "publish.lock"), poll=0.05)
+    ok, bad = scheduler.submit("a", {"n": 1}), scheduler.submit("a", {"n": 2})
+    assert scheduler.start()
+    # 同一把锁只有一个调度器能拿到
+    assert not PublishScheduler(store, {"a": {}}, runner, lock_path=str(tmp_path / "publish.lock")).start()
+    deadline = time.time() + 5
+    while time.time() < deadline and any(store.get(j)["state"] in (QUEUED, RUNNING) for j in (ok, bad)):
+        time.sleep(0.02)
+    scheduler.stop()
+    scheduler.wait()
+    assert seen == [("a", "INP", 1), ("a", "INP", 2)]
+    assert store.get(ok)["state"] == DONE and store.get(ok)["result"] == {"draft": 1}
+    assert store.get(bad)["state"] == FAILED and store.get(bad)["error"] == "boom"
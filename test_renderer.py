@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+正文分类回归测试：公众号排版 (server) 与 CLI 预览 (main.py) 两套规则的 golden 输出
+
+用法: python -m pytest test_renderer.py
+"""
+
+from renderer import parse_blocks, META, HEADING, SHORT, TEXT
+
+# 同一行既是 # 标题又含"来源"；全文只用 ## 标题
+LINES = [
+    "## 背景",
+    "## 来源说明",
+    "OpenAI 今日发布了新一代模型，性能大幅提升。",
+    "### 细节",
+    "来源：OpenAI 官网",
+]
+
+
+def kinds(blocks):
+    return [(b.kind, b.text, b.level) for b in blocks]
+
+
+def test_server_rules():
+    """公众号排版：来源行优先于标题；层级按最浅的 # 归一化，只用 ## 时即为 H1"""
+    assert kinds(parse_blocks(LINES)) == [
+        (HEADING, "背景", 1),
+        (META, "## 来源说明", 0),
+        (TEXT, "OpenAI 今日发布了新一代模型，性能大幅提升。", 0),
+        (HEADING, "细节", 2),
+        (META, "来源：OpenAI 官网", 0),
+    ]
+
+
+def test_preview_rules():
+    """CLI 预览 (旧规则)：# 标题优先于来源行；层级即 # 的个数，## 仍是 H2"""
+    assert kinds(parse_blocks(LINES, meta_first=False, relative_levels=False)) == [
+        (HEADING, "背景", 2),
+        (HEADING, "来源说明", 2),
+        (TEXT, "OpenAI 今日发布了新一代模型，性能大幅提升。", 0),
+        (HEADING, "细节", 3),
+        (META, "来源：OpenAI 官网", 0),
+    ]
+
+
+def test_short_line():
+    assert kinds(parse_blocks(["一句短标题"])) == [(SHORT, "一句短标题", 0)]
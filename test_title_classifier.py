@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+标题分类回归测试
+逐条比对 title_golden.json 里的期望输出 (模式 / 主体 / 金额 / 封面金额拆分)
+
+用法: python test_title_classifier.py [--update]
+  --update  规则有意调整后，用当前输出重写 golden 文件 (提交前请人工核对 diff)
+"""
+
+import json
+import os
+import sys
+
+from title_classifier import classify_title, format_amount
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "title_golden.json")
+
+
+def snapshot(title):
+    t = classify_title(title)
+    return {"title": title, "mode": t.mode, "companies": t.companies, "amount": t.amount,
+            "cover_amount": list(format_amount(t.amount))}
+
+
+def load_golden():
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_title_golden():
+    """golden 集合逐条一致"""
+    failures = [(case, snapshot(case["title"])) for case in load_golden() if snapshot(case["title"]) != case]
+    for expected, actual in failures:
+        print(f"❌ {expected['title']}\n   期望: {expected}\n   实际: {actual}")
+    assert not failures, f"{len(failures)} 条标题分类与 golden 不一致"
+
+
+if __name__ == "__main__":
+    if "--update" in sys.argv:
+        cases = [snapshot(case["title"]) for case in load_golden()]
+        with open(GOLDEN_PATH, "w", encoding="utf-8") as f:
+            json.dump(cases, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"✅ 已重写 {len(cases)} 条 golden")
+    else:
+        test_title_golden()
+        print(f"✅ {len(load_golden())} 条标题分类全部一致")
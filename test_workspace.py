@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务目录清理行为测试：按年龄 / 配额删除，新目录与仍在使用的目录不删
+
+用法: python -m pytest test_workspace.py
+"""
+
+import os
+import time
+
+from workspace import new_workspace, sweep
+
+
+def make_workspace(root, name, age, size=10):
+    path = os.path.join(root, name)
+    os.makedirs(path)
+    with open(os.path.join(path, "news.html"), "wb") as f: f.write(b"x" * size)
+    t = time.time() - age
+    os.utime(path, (t, t))
+
+
+def test_new_workspace(tmp_path):
+    job_id, path = new_workspace(str(tmp_path))
+    assert os.path.isdir(path) and os.path.basename(path) == job_id
+
+
+def test_sweep_by_age_keeps_fresh_and_in_use(tmp_path):
+    root = str(tmp_path)
+    make_workspace(root, "expired", age=1000)
+    make_workspace(root, "expired-in-use", age=1000)
+    make_workspace(root, "recent", age=200)
+    make_workspace(root, "writing", age=10)
+    removed = sweep(root, max_age=500, quota=10**9, grace=60, keep=lambda: {"expired-in-use"})
+    assert removed == ["expired"]
+    assert sorted(os.listdir(root)) == ["expired-in-use", "recent", "writing"]
+
+
+def test_sweep_by_quota_oldest_first(tmp_path):
+    root = str(tmp_path)
+    make_workspace(root, "a", age=300, size=100)
+    make_workspace(root, "b", age=200, size=100)
+    make_workspace(root, "c", age=100, size=100)
+    assert sweep(root, max_age=10**6, quota=150, grace=60) == ["a", "b"]
+    assert os.listdir(root) == ["c"]
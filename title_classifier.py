@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# 文件名: title_classifier.py
+# 快讯标题分类：规则表编译成一条交替正则，单次扫描得到模式、主体公司与金额 (server.py 与 main.py 共用)
+
+import re
+from collections import namedtuple
+
+# ================= 模式 =================
+ACQUISITION = "acquisition"  # 收购 / 并购
+FINANCE = "finance"          # 融资
+IPO = "ipo"                  # 上市
+PARTNERSHIP = "partnership"  # 合作
+GENERAL = "general"          # 兜底
+MODES = (ACQUISITION, FINANCE, IPO, PARTNERSHIP, GENERAL)
+PAIR_MODES = (ACQUISITION, PARTNERSHIP)  # 封面并排两个 Logo 的模式
+MODE_TYPES = {ACQUISITION: "收购", FINANCE: "融资", IPO: "上市", PARTNERSHIP: "合作", GENERAL: "通用"}  # main.py 沿用的中文类型名
+
+# ================= 规则表 =================
+# (触发词, 模式, 优先级)：同一标题命中多条时取优先级数字最小的，同级取最靠前的。
+# 模式为 None 的词不决定分类，只作为主体名称的截断点 (如 "宣布"、"达成")。
+RULES = [
+    ("收购", ACQUISITION, 0), ("并购", ACQUISITION, 0), ("买下", ACQUISITION, 0),
+    ("融资", FINANCE, 1), ("获投", FINANCE, 1),
+    ("IPO", IPO, 2), ("上市", IPO, 2), ("招股", IPO, 2), ("递表", IPO, 2),
+    ("战略合作", PARTNERSHIP, 3), ("合作", PARTNERSHIP, 3), ("携手", PARTNERSHIP, 3), ("联手", PARTNERSHIP, 3),
+    ("完成", FINANCE, 4),  # "完成 B 轮" 是融资，但 "完成 IPO" 应归上市，所以优先级最低
+    ("宣布", None, 9), ("达成", None, 9), ("签署", None, 9), ("正式", None, 9), ("启动", None, 9), ("筹备", None, 9),
+]
+_RULE_INDEX = {word: (mode, prio) for word, mode, prio in RULES}
+
+# 金额：数字 + 量级和/或币种 (至少其一)，避免把 "2026 年" 这类数字当金额
+SCALES = (("千万", 10**7), ("百万", 10**6), ("亿", 10**8), ("万", 10**4))
+CURRENCIES = ("美元", "美金", "人民币", "港元", "港币", "欧元", "元")
+_SCALE = "|".join(s for s, _ in SCALES)
+_CURRENCY = "|".join(CURRENCIES)
+_AMOUNT = (rf"[$¥￥]?\d+(?:\.\d+)?\s*(?:(?:{_SCALE})\s*(?:{_CURRENCY}|[BM](?![A-Za-z]))?"
+           rf"|(?:{_CURRENCY})|[BM](?![A-Za-z]))")
+
+# 长词优先 ("战略合作" 先于 "合作")；开头的前瞻只放行可能起头的字符，其余位置直接跳过
+_TRIGGERS = "|".join(re.escape(w) for w, _, _ in sorted(RULES, key=lambda r: -len(r[0])))
+_FIRST_CHARS = re.escape("".join(sorted({w[0] for w, _, _ in RULES})))
+_RE_SCAN = re.compile(rf"(?=[\d$¥￥{_FIRST_CHARS}])(?:(?P<amount>{_AMOUNT})|(?P<trigger>{_TRIGGERS}))")
+_RE_CONTROL = re.compile(r'[\x00-\x1f\x7f-\x9f]')
+_RE_RMB = re.compile(r'人民币|[¥￥]|(?<![美港欧])元')
+_RE_PAIR_SEP = re.compile(r'\s*(?:与|和|&|、)\s*')
+
+TitleInfo = namedtuple("TitleInfo", "mode companies amount trigger")
+
+
+def clean_company_name(text):
+    """主体名称：去掉冒号后的内容，含空格时取第一个词 (调用方已去除控制字符)"""
+    text = text.split("：")[0].split(":")[0].strip()
+    if " " in text: return text.split(" ")[0]
+    return text
+
+
+def classify_title(title):
+    """
+    单次扫描标题，返回 TitleInfo(mode, companies, amount, trigger)
+    - 主体前半段截止到第一个触发词或截断词 ("宣布"、"达成" 等)
+    - 收购/合作：前后各取一个主体 (合作类 "A 与 B 达成合作" 从前半段拆出两方)
+    - 融资/上市：只取前半段
+    - 兜底：整句取首个词
+    """
+    if not title.isprintable(): title = _RE_CONTROL.sub('', title)  # 绝大多数标题没有控制字符，省掉一次正则替换
+    title = title.strip()
+    best, best_prio, first_cut, amount = None, None, None, ""
+    for m in _RE_SCAN.finditer(title):
+        if m.lastgroup == "amount":
+            if not amount: amount = m.group().strip()
+            continue
+        mode, prio = _RULE_INDEX[m.group()]
+        if first_cut is None: first_cut = m
+        if mode and (best is None or prio < best_prio): best, best_prio = m, prio
+
+    if best is None:
+        return TitleInfo(GENERAL, [clean_company_name(title)], amount, "")
+    mode = _RULE_INDEX[best.group()][0]
+    head, tail = title[:first_cut.start()], title[best.end():]
+    if mode == ACQUISITION:
+        companies = [clean_company_name(head), clean_company_name(tail)]
+    elif mode == PARTNERSHIP:
+        pair = [p for p in _RE_PAIR_SEP.split(head.strip(), maxsplit=1) if p]
+        companies = [clean_company_name(p) for p in pair] if len(pair) == 2 else [clean_company_name(head), clean_company_name(tail)]
+    else:
+        companies = [clean_company_name(head)]
+    return TitleInfo(mode, companies, amount, best.group())
+
+
+def format_amount(amt):
+    """金额拆成 (符号, 数值, 单位)，如 "5亿美元" -> ("$", "500", "M")；人民币用 ¥"""
+    if not amt: return "$", "0", ""
+    amt = amt.replace(' ', '')
+    sym = "¥" if _RE_RMB.search(amt) else "$"
+    num_match = re.search(r'(\d+(?:\.\d+)?)', amt)
+    val = float(num_match.group(1)) if num_match else 0
+    mult = next((m for s, m in SCALES if s in amt), 1)
+    if mult == 1 and amt.endswith("B"): mult = 10**9
+    elif mult == 1 and amt.endswith("M"): mult = 10**6
+    val = val * mult
+    if val >= 10**9: return sym, f"{val/10**9:g}", "B"
+    if val >= 10**6: return sym, f"{val/10**6:g}", "M"
+    return sym, f"{val:g}", ""
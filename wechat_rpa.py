@@ -1,208 +1,435 @@
 # -*- coding: utf-8 -*-
 # 文件名: wechat_rpa.py (V24 强力同步修复版)
 from playwright.sync_api import sync_playwright
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import time
 import re
 import os
 import sys
+from rpa_waits import WaitLog, WAIT_TIMEOUT_MS, EDITOR_TIMEOUT_MS, QUIET_MS, QUIET_TIMEOUT_MS, \
+    JS_EDITOR_READY, JS_FOCUSED, JS_HAS_SELECTION, JS_ARM_COPY, JS_COPIED, JS_VALUE_EMPTY, JS_DOM_QUIET
+from rpa_trace import Tracer
+from editor_inject import article_html, image_sources, needs_paste, injected_ok, ClipboardLock, CONTENT_MODES, CONTENT_MODE, JS_INJECT
 
 # ================= 配置区域 (同步版) =================
 PROJECT_DIR = "/Users/wangyu/AutoWeChat" # 假设 PROJECT_DIR 在这里定义
 NEWS_HTML_PATH = os.path.join(PROJECT_DIR, "output", "news.html")
+CDP_URL = os.environ.get('AUTOWECHAT_CDP_URL', "http://localhost:9222")
+MP_HOME = "https://mp.weixin.qq.com/"
+EDITOR_URL = "https://mp.weixin.qq.com/cgi-bin/appmsg?t=media/appmsg_edit_v2&action=edit&isNew=1&type=77&createType=0&token={token}&lang=zh_CN"
+EDITOR_MARK = "media/appmsg_edit_v2"
+WARM_EDITOR = True  # 每次发布后在后台预开一个空白编辑器，下次发布直接用
 
 
-class WeChatBot:
-    def __init__(self, headless=False):
+def _close_page(page):
+    """关闭标签页；已关闭 / 浏览器已断开时忽略"""
+    if page is None: return
+    try:
+        if not page.is_closed(): page.close()
+    except Exception:
         pass
 
-    def run_publish(self, title, author, content_html, cover_path):
-        """主发布流程 (包含 V24 强力修复逻辑)"""
-        html_path = NEWS_HTML_PATH # 使用全局配置的路径
+
+def _ms(t0):
+    return int((time.perf_counter() - t0) * 1000)
+
+
+class CDPSession:
+    """
+    常驻的 Chrome (CDP) 会话
+    - Playwright 同步 API 只能在创建它的线程里用，所以所有浏览器操作都排进一个专用线程 (也顺带让发布串行，不会抢剪贴板)
+    - 连接只建立一次；每次使用前做健康检查，浏览器断开 / 重启后自动重连
+    - 记住后台 token，发布成功后预开一个空白编辑器页，下一次发布跳过页面查找与编辑器加载
+    - 发布用过的编辑器页留给人工检查与群发，会话不再关闭或复用它们；只回收自己预开、仍是空白的页
+    """
+
+    def __init__(self, cdp_url=CDP_URL, warm=WARM_EDITOR):
+        self.cdp_url = cdp_url
+        self.warm = warm
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cdp")
+        self._pw = None
+        self._browser = None
+        self._token = None
+        self._spare = None  # 预热好的编辑器页
+        self._drafts = []   # 发布用过的编辑器页 (待人工检查，不再碰)
+        self.stats = {"connects": 0, "publishes": 0, "warm_hits": 0}
+
+    def run(self, fn, *args, tracer=None, **kwargs):
+        """
+        在会话线程里执行 fn(context, page, timings, waits, tracer, *args, **kwargs)，返回 (结果, timings)
+        timings 已含准备阶段耗时；waits 是本次发布的 WaitLog，结束后汇总到 timings["waits"]；
+        tracer 记录各步骤 span (connect / navigate / editor_ready 在这里记，其余由 fn 记)
+        """
+        tracer = tracer or Tracer("wechat_rpa", cdp=self.cdp_url)
+        return self._executor.submit(self._call, fn, tracer, args, kwargs).result()
+
+    def _call(self, fn, tracer, args, kwargs):
+        t0 = time.perf_counter()
+        with tracer.span("connect") as span:
+            timings = {"reused_connection": self._healthy()}
+            span.set(reused=timings["reused_connection"])
+            if not timings["reused_connection"]: self._connect()
+        timings["connect_ms"] = _ms(t0)
+        t1 = time.perf_counter()
+        waits = WaitLog()
+        page, timings["warm_page"] = self._take_editor(waits, tracer)
+        timings["editor_ms"] = _ms(t1)
+        timings["setup_ms"] = _ms(t0)
+        self.stats["publishes"] += 1
+        self._drafts = [p for p in self._drafts if not p.is_closed()] + [page]
+        result = fn(self._context(), page, timings, waits, tracer, *args, **kwargs)
+        timings["waits"] = waits.summary()
+        if self.warm: self._executor.submit(self._warm_editor)  # 只在发布成功后预热
+        return result, timings
+
+    def _healthy(self):
+        """连接仍在 (Chrome 关闭 / 重启后 Playwright 会把 browser 标记为断开)"""
+        if self._browser is None or not self._browser.is_connected(): return False
+        try: return bool(self._browser.contexts)
+        except Exception: return False
+
+    def _connect(self):
+        self.close_browser()
+        if self._pw is None: self._pw = sync_playwright().start()
+        print(f"🔌 连接 Chrome ({self.cdp_url})...")
+        self._browser = self._pw.chromium.connect_over_cdp(self.cdp_url)
+        self.stats["connects"] += 1
+
+    def _context(self):
+        return self._browser.contexts[0]
+
+    @staticmethod
+    def _page_alive(page):
+        if page is None or page.is_closed(): return False
+        try:
+            return page.evaluate("!!document.querySelector('#title')")
+        except Exception:
+            return False
+
+    def _take_editor(self, waits, tracer):
+        """返回 (编辑器页, 是否为预热页)；预热页失效时按老办法查找 / 跳转"""
+        with tracer.span("navigate") as span:
+            spare, self._spare = self._spare, None
+            warm = self._page_alive(spare) and EDITOR_MARK in spare.url
+            span.set(warm_page=warm)
+            if warm:
+                self.stats["warm_hits"] += 1
+                return spare, True
+            _close_page(spare)  # 自己预开的空白页，失效了就关掉
+            page = self._open_editor()
+        print("⏳ 等待编辑器加载...")
+        with tracer.span("editor_ready"):
+            page.wait_for_selector("#title", state="visible", timeout=EDITOR_TIMEOUT_MS)
+            waits.run("editor_ready", 2, page.wait_for_function, JS_EDITOR_READY, timeout=EDITOR_TIMEOUT_MS, soft=False)
+        return page, False
+
+    def _open_editor(self):
+        # 1. 强制跳转编辑器 (同步版)
+        context = self._context()
+        wechat_page = None
+        for page in context.pages:
+            if "mp.weixin.qq.com" in page.url and page not in self._drafts:  # 不在待检查的草稿页上跳转
+                wechat_page = page
+                break
+        if not wechat_page:
+            wechat_page = context.new_page()
+            wechat_page.goto(MP_HOME)
+
+        page = wechat_page
+        if EDITOR_MARK not in page.url:
+            if "token=" not in page.url:
+                page.goto(MP_HOME)
+                page.wait_for_url(lambda u: "token=" in u, timeout=10000)
+            self._token = re.search(r'token=(\d+)', page.url).group(1)
+            page.goto(EDITOR_URL.format(token=self._token))
+        else:
+            m = re.search(r'token=(\d+)', page.url)
+            if m: self._token = m.group(1)
+        return page
+
+    def _warm_editor(self):
+        """后台预开空白编辑器；失败不影响下一次发布 (届时按老办法打开)"""
+        if self._spare is not None or not self._token or not self._healthy(): return
+        page = None
+        try:
+            page = self._context().new_page()
+            page.goto(EDITOR_URL.format(token=self._token))
+            page.wait_for_selector("#title", state="visible", timeout=EDITOR_TIMEOUT_MS)
+            page.wait_for_function(JS_EDITOR_READY, timeout=EDITOR_TIMEOUT_MS)
+            self._spare = page
+        except Exception as e:
+            _close_page(page)
+            print(f"⚠️ 预热编辑器失败: {e}")
+
+    def close_browser(self):
+        """断开 CDP 连接 (不会关闭用户的 Chrome)"""
+        self._spare = None
+        self._drafts = []
+        if self._browser is not None:
+            try: self._browser.close()
+            except Exception: pass
+            self._browser = None
+
+    def shutdown(self):
+        def stop():
+            self.close_browser()
+            if self._pw is not None:
+                self._pw.stop()
+                self._pw = None
+        self._executor.submit(stop).result()
+        self._executor.shutdown()
+
+
+_default_session = None
+_default_session_lock = threading.Lock()
+
+def default_session():
+    """进程内共享的会话，首次发布时创建"""
+    global _default_session
+    with _default_session_lock:
+        if _default_session is None: _default_session = CDPSession()
+        return _default_session
+
+
+class WeChatBot:
+    def __init__(self, headless=False, session=None, content_mode=None):
+        self.session = session or default_session()
+        self.content_mode = content_mode if content_mode in CONTENT_MODES else CONTENT_MODE  # inject / paste
+
+    def run_publish(self, title, author, content_html, cover_path, html_path=None, run_id=None):
+        """
+        主发布流程 (包含 V24 强力修复逻辑)；html_path 为本次任务目录下的 news.html
+        返回本次耗时 (setup_ms = 连接检查 + 取得编辑器页；连接复用 / 预热页命中时接近 0)
+        各步骤 span 写入 logs/rpa_trace.jsonl (run_id 默认自动生成，发布队列传任务 id)
+        """
+        html_path = html_path or NEWS_HTML_PATH # 未指定时使用全局配置的路径
         if not os.path.exists(html_path):
             print("❌ 错误: 找不到 news.html")
             return
 
         print(f"🤖 机器人启动 (V24 强力同步修复版) | 目标文件: {html_path}")
+        t0 = time.perf_counter()
+        tracer = Tracer("wechat_rpa", run_id=run_id, cdp=self.session.cdp_url, content_mode=self.content_mode)
+        try:
+            with tracer.span("publish"):
+                _, timings = self.session.run(self._publish_steps, title, author, html_path, tracer=tracer)
+        except Exception as e:
+            print(f"❌ 错误: {e}")
+            import traceback
+            traceback.print_exc()
+            return
+        timings["total_ms"] = _ms(t0)
+        print(f"⏱️ 准备 {timings['setup_ms']}ms (连接复用: {timings['reused_connection']}, 预热页: {timings['warm_page']}) | 总计 {timings['total_ms']}ms")
+        print(f"⏱️ 显式等待: {timings['waits']['waited_ms']}ms，比固定 sleep 节省 {timings['waits']['saved_ms']}ms")
+        return timings
+
+    def _publish_steps(self, context, page, timings, waits, tracer, title, author, html_path):
+        """
+        各步骤之间等页面给出明确信号再继续 (元素可见 / 焦点到位 / copy 事件 / DOM 静默)；
+        waits.run 的第二个参数是旧流程在该处的固定 sleep 秒数，用于统计节省的时间
+        """
+        # 2. 正文在第 5 步写入 (默认直接注入；回退到复制粘贴时，复制与粘贴在同一把剪贴板锁内完成)
+        page.bring_to_front()
+
+        # 3. 移除遮罩，填写标题作者
+        print("🛡️ 移除遮罩...")
+        # 移除遮罩，防弹窗干扰
+        with tracer.span("fill_meta"):
+            page.evaluate("document.querySelectorAll('.media_list_box_mask, .weui-desktop-mask').forEach(e => e.remove());")
+            page.locator("#title").fill(title)
+            page.locator("#author").fill(author)
         
-        with sync_playwright() as p:
+        # 4. 清空摘要 - 💥 强力清空修复
+        print("🧹 清空摘要 (JS Focus + 键盘)...")
+        with tracer.span("digest") as span:
             try:
-                print("🔌 连接 Chrome (9222)...")
-                browser = p.chromium.connect_over_cdp("http://localhost:9222")
-                context = browser.contexts[0]
-                
-                # 1. 强制跳转编辑器 (同步版)
-                wechat_page = None
-                for page in context.pages:
-                    if "mp.weixin.qq.com" in page.url:
-                        wechat_page = page
-                        break
-                if not wechat_page:
-                    wechat_page = context.new_page()
-                    wechat_page.goto("https://mp.weixin.qq.com/")
-
-                page = wechat_page
-                if "media/appmsg_edit_v2" not in page.url:
-                    if "token=" not in page.url:
-                        page.goto("https://mp.weixin.qq.com/")
-                        page.wait_for_url(lambda u: "token=" in u, timeout=10000)
-                    token = re.search(r'token=(\d+)', page.url).group(1)
-                    page.goto(f"https://mp.weixin.qq.com/cgi-bin/appmsg?t=media/appmsg_edit_v2&action=edit&isNew=1&type=77&createType=0&token={token}&lang=zh_CN")
-
-                print("⏳ 等待编辑器加载...")
-                page.wait_for_selector("#title", state="visible", timeout=30000)
-                time.sleep(2)
-
-                # 2. 复制内容
-                print("📑 复制完整正文...")
-                file_url = f"file://{html_path}"
-                source_page = context.new_page()
-                source_page.goto(file_url)
-                time.sleep(1)
-                source_page.keyboard.press("Meta+A")
-                time.sleep(0.5)
-                source_page.keyboard.press("Meta+C")
-                time.sleep(1)
-                source_page.close()
+                page.evaluate("window.scrollTo(0, document.body.scrollHeight);")
+                sel = "#digest" 
+                waits.run("digest_visible", 0.5, page.locator(sel).wait_for, state="visible", timeout=WAIT_TIMEOUT_MS)
+                page.evaluate(f"document.querySelector('{sel}').focus()") # JS 强制聚焦
+                waits.run("digest_focused", 0.2, page.wait_for_function, JS_FOCUSED, arg="digest", timeout=WAIT_TIMEOUT_MS)
+                page.locator(sel).click()
+                page.keyboard.press("Meta+A")
+                waits.skip("digest_select_all", 0.2)  # 键盘事件按顺序派发，全选与删除之间无需等待
+                page.keyboard.press("Backspace")
+                page.keyboard.press("Backspace") 
+                waits.run("digest_cleared", 1, page.wait_for_function, JS_VALUE_EMPTY, arg=sel, timeout=WAIT_TIMEOUT_MS)
+                print("✅ 摘要已物理清空")
+                page.evaluate("window.scrollTo(0, 0)")
+            except Exception as e:
+                span.fail(e)
+                print(f"⚠️ 摘要清空失败: {e}")
+                page.evaluate("window.scrollTo(0, 0)")
+
+        # 5. 写入正文
+        t_content = time.perf_counter()
+        mode = None
+        if self.content_mode == "inject":
+            with tracer.span("inject") as span:
+                mode = self._inject_content(page, waits, html_path)
+                if not mode: span.fail("注入失败，回退到复制粘贴")
+        if not mode:
+            with ClipboardLock():
+                with tracer.span("copy"):
+                    self._copy_source(context, waits, html_path)
                 page.bring_to_front()
+                with tracer.span("paste") as span:
+                    span.set(fallback=self.content_mode == "inject")
+                    self._paste_content(page, waits)
+            mode = "paste"
+        timings["content"] = {"mode": mode, "ms": _ms(t_content)}
+        print(f"✅ 正文写入完成 ({mode})")
+
 
-                # 3. 移除遮罩，填写标题作者
-                print("🛡️ 移除遮罩...")
-                # 移除遮罩，防弹窗干扰
-                page.evaluate("document.querySelectorAll('.media_list_box_mask, .weui-desktop-mask').forEach(e => e.remove());")
-                page.locator("#title").fill(title)
-                page.locator("#author").fill(author)
+        # 6. 插入 '快讯模板' (或名片) - 💥 强力点击修复
+        print("📋 插入 '快讯模板' (强力点击)...")
+        with tracer.span("template") as span:
+            try:
+                page.evaluate("document.querySelectorAll('.media_list_box_mask').forEach(e => e.remove())")
+            
+                # 尝试点击 '模板' 按钮
+                template_btn = page.get_by_text("模板", exact=True).first
+                template_btn.click()
+            
+                dialog = page.locator(".weui-desktop-dialog__wrp")
+                dialog.wait_for(state="visible", timeout=10000)
+
+                # 寻找包含 '快讯' 的列表项 (列表异步渲染，等它出现)
+                target_item = dialog.locator("li").filter(has_text="快讯").first
+                waits.run("template_list", 2.5, target_item.wait_for, state="visible", timeout=WAIT_TIMEOUT_MS)
+            
+                if target_item.count() > 0:
+                    # 强制点击元素中心
+                    target_item.click(force=True, position={"x": 50, "y": 50}) 
+                    print("✅ 已点击快讯模版")
                 
-                # 4. 清空摘要 - 💥 强力清空修复
-                print("🧹 清空摘要 (JS Focus + 键盘)...")
-                try:
-                    page.evaluate("window.scrollTo(0, document.body.scrollHeight);")
-                    time.sleep(0.5)
-                    sel = "#digest" 
-                    page.evaluate(f"document.querySelector('{sel}').focus()") # JS 强制聚焦
-                    time.sleep(0.2)
-                    page.locator(sel).click()
-                    page.keyboard.press("Meta+A")
-                    time.sleep(0.2)
-                    page.keyboard.press("Backspace")
-                    page.keyboard.press("Backspace") 
-                    print("✅ 摘要已物理清空")
-                    page.evaluate("window.scrollTo(0, 0)")
-                    time.sleep(1)
-                except Exception as e:
-                    print(f"⚠️ 摘要清空失败: {e}")
-                    page.evaluate("window.scrollTo(0, 0)")
-
-                # 5. 粘贴正文
-                print("🖱️ 粘贴正文...")
-                page.locator("#author").click()
-                page.keyboard.press("Tab")
-                time.sleep(0.5)
-                page.keyboard.type("x") 
-                time.sleep(0.2)
-                page.keyboard.press("Meta+A")
-                page.keyboard.press("Meta+V")
-                print("✅ 粘贴完成")
-                time.sleep(3)
+                    try:
+                        dialog.wait_for(state="hidden", timeout=5000)
+                    except:
+                        span.retry()
+                        span.warn("弹窗未自动关闭")
+                        page.keyboard.press("Escape")
+                        print("⚠️ 弹窗未自动关闭，按 ESC 关闭")
+                else:
+                    span.fail("未找到快讯模版")
+                    print("❌ 未找到包含'快讯'的模版")
 
+            except Exception as e:
+                span.fail(e)
+                print(f"❌ 模版操作异常: {e}")
 
-                # 6. 插入 '快讯模板' (或名片) - 💥 强力点击修复
-                print("📋 插入 '快讯模板' (强力点击)...")
-                try:
-                    page.evaluate("document.querySelectorAll('.media_list_box_mask').forEach(e => e.remove())")
-                    
-                    # 尝试点击 '模板' 按钮
-                    template_btn = page.get_by_text("模板", exact=True).first
-                    template_btn.click()
-                    
-                    dialog = page.locator(".weui-desktop-dialog__wrp")
-                    dialog.wait_for(state="visible", timeout=10000)
-                    time.sleep(2.5) 
 
-                    # 寻找包含 '快讯' 的列表项
-                    target_item = dialog.locator("li").filter(has_text="快讯").first
-                    
-                    if target_item.count() > 0:
-                        # 强制点击元素中心
-                        target_item.click(force=True, position={"x": 50, "y": 50}) 
-                        print("✅ 已点击快讯模版")
-                        
-                        try:
-                            dialog.wait_for(state="hidden", timeout=5000)
-                        except:
-                            page.keyboard.press("Escape")
-                            print("⚠️ 弹窗未自动关闭，按 ESC 关闭")
-                    else:
-                        print("❌ 未找到包含'快讯'的模版")
-
-                except Exception as e:
-                    print(f"❌ 模版操作异常: {e}")
-                
+        # 7. 设置封面 - 💥 鼠标轨迹修复
+        print("🖼️ 设置封面 (鼠标轨迹模拟)...")
+        with tracer.span("cover") as span:
+            try:
+                page.evaluate("window.scrollTo(0, 0)")
+            
+                cover_area = page.locator(".js_cover_btn_area").first
+                waits.run("cover_area_visible", 1, cover_area.wait_for, state="visible", timeout=WAIT_TIMEOUT_MS)
+            
+                # 模拟真实鼠标移动
+                box = cover_area.bounding_box()
+                if box:
+                    page.mouse.move(box["x"] + box["width"] / 2, box["y"] + box["height"] / 2)
+                    page.mouse.move(box["x"] + box["width"] / 2 + 5, box["y"] + box["height"] / 2 + 5)
+                else:
+                    span.set(hover_fallback=True)
+                    cover_area.hover()
+
+                # 寻找并点击 "从正文选择" (悬停菜单浮现即可点)
+                target_btn = page.get_by_text("从正文选择").first
+                waits.run("cover_menu", 1, target_btn.wait_for, state="visible", timeout=WAIT_TIMEOUT_MS)
+            
+                if target_btn.is_visible():
+                    print("   -> 发现'从正文选择'按钮，点击中...")
+                    target_btn.click(force=True)
+                else:
+                    print("❌ 找不到'从正文选择'按钮")
+                    raise Exception("按钮不可见")
+
+                # 处理图片选择弹窗
+                page.wait_for_selector(".weui-desktop-dialog", timeout=3000)
+            
+                imgs = page.locator(".weui-desktop-img-picker__list .weui-desktop-img-picker__item")
+                count = imgs.count()
+            
+                if count > 0:
+                    imgs.nth(count - 1).click() # 点击最后一张
+                    waits.run("picker_selected", 0.5, page.locator("button:has-text('下一步'), button:has-text('完成')").first.wait_for,
+                              state="visible", timeout=WAIT_TIMEOUT_MS)
                 
-                # 7. 设置封面 - 💥 鼠标轨迹修复
-                print("🖼️ 设置封面 (鼠标轨迹模拟)...")
-                try:
-                    page.evaluate("window.scrollTo(0, 0)")
-                    time.sleep(1)
-                    
-                    cover_area = page.locator(".js_cover_btn_area").first
-                    
-                    # 模拟真实鼠标移动
-                    box = cover_area.bounding_box()
-                    if box:
-                        page.mouse.move(box["x"] + box["width"] / 2, box["y"] + box["height"] / 2)
-                        time.sleep(0.5) 
-                        page.mouse.move(box["x"] + box["width"] / 2 + 5, box["y"] + box["height"] / 2 + 5)
-                        time.sleep(0.5)
-                    else:
-                        cover_area.hover()
-                        time.sleep(1)
-
-                    # 寻找并点击 "从正文选择"
-                    target_btn = page.get_by_text("从正文选择").first
-                    
-                    if target_btn.is_visible():
-                        print("   -> 发现'从正文选择'按钮，点击中...")
-                        target_btn.click(force=True)
-                    else:
-                        print("❌ 找不到'从正文选择'按钮")
-                        raise Exception("按钮不可见")
-
-                    # 处理图片选择弹窗
-                    page.wait_for_selector(".weui-desktop-dialog", timeout=3000)
+                    if page.locator("button:has-text('下一步')").is_visible():
+                        page.locator("button:has-text('下一步')").click()
+                        waits.run("crop_step", 0.5, page.locator("button:has-text('完成')").wait_for, state="visible", timeout=WAIT_TIMEOUT_MS)
                     
-                    imgs = page.locator(".weui-desktop-img-picker__list .weui-desktop-img-picker__item")
-                    count = imgs.count()
-                    
-                    if count > 0:
-                        imgs.nth(count - 1).click() # 点击最后一张
-                        time.sleep(0.5)
-                        
-                        if page.locator("button:has-text('下一步')").is_visible():
-                            page.locator("button:has-text('下一步')").click()
-                            time.sleep(0.5)
-                            
-                        page.locator("button:has-text('完成')").click()
-                        print("✅ 封面已选定最后一张图")
-                    else:
-                        print("⚠️ 弹窗内无图片")
-                except Exception as e:
-                    print(f"❌ 封面设置异常: {e}")
-
-
-                # 8. 底部配置 (合集等，保持旧逻辑但移除名片/模版/摘要/封面逻辑)
-                print("⚙️ 底部配置...")
-                page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                time.sleep(1)
-
-                # ... (这里放您原 wechat_rpa.py 中 step 8 的逻辑)
-                # 例如：原创、留言、合集等逻辑，从您的旧 wechat_rpa.py 中移植过来
-                
-                print("\n✅✅✅ V24 流程结束！")
-
+                    page.locator("button:has-text('完成')").click()
+                    print("✅ 封面已选定最后一张图")
+                else:
+                    span.warn("弹窗内无图片")
+                    print("⚠️ 弹窗内无图片")
             except Exception as e:
-                print(f"❌ 错误: {e}")
-                import traceback
-                traceback.print_exc()
+                span.fail(e)
+                print(f"❌ 封面设置异常: {e}")
+
+
+        # 8. 底部配置 (合集等，保持旧逻辑但移除名片/模版/摘要/封面逻辑)
+        print("⚙️ 底部配置...")
+        with tracer.span("settings"):
+            page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            waits.skip("bottom_scroll", 1)  # scrollTo 是同步的
+
+        # ... (这里放您原 wechat_rpa.py 中 step 8 的逻辑)
+        # 例如：原创、留言、合集等逻辑，从您的旧 wechat_rpa.py 中移植过来
+        
+        waits.print_report()
+        print("\n✅✅✅ V24 流程结束！")
+
+    def _inject_content(self, page, waits, html_path):
+        """直接写入编辑器 iframe，返回 'ue' / 'dom'；失败返回 None，由调用方回退到复制粘贴"""
+        print("💉 注入正文...")
+        try:
+            html = article_html(html_path)
+            if needs_paste(html):
+                print("⚠️ 正文含本地图片，注入后编辑器不会上传，改用复制粘贴")
+                return None
+            result = page.evaluate(JS_INJECT, html)
+        except Exception as e:
+            print(f"⚠️ 注入失败，改用复制粘贴: {e}")
+            return None
+        if not injected_ok(result, len(image_sources(html))):
+            print("⚠️ 注入后编辑器内容不完整，改用复制粘贴")
+            return None
+        waits.run("inject_settled", 0, page.evaluate, JS_DOM_QUIET, ["#ueditor_0", QUIET_MS, QUIET_TIMEOUT_MS])
+        return result["mode"]
+
+    def _copy_source(self, context, waits, html_path):
+        print("📑 复制完整正文...")
+        file_url = f"file://{html_path}"
+        source_page = context.new_page()
+        try:
+            source_page.goto(file_url)
+            waits.run("source_loaded", 1, source_page.wait_for_load_state, "load", timeout=WAIT_TIMEOUT_MS)
+            source_page.keyboard.press("Meta+A")
+            waits.run("source_selected", 0.5, source_page.wait_for_function, JS_HAS_SELECTION, timeout=WAIT_TIMEOUT_MS)
+            source_page.evaluate(JS_ARM_COPY)
+            source_page.keyboard.press("Meta+C")
+            waits.run("clipboard_written", 1, source_page.wait_for_function, JS_COPIED, timeout=WAIT_TIMEOUT_MS)
+        finally:
+            _close_page(source_page)  # 复制失败也不能把源文件标签页留在会话里
+
+    def _paste_content(self, page, waits):
+        print("🖱️ 粘贴正文...")
+        page.locator("#author").click()
+        page.keyboard.press("Tab")
+        waits.run("editor_focused", 0.5, page.wait_for_function, JS_FOCUSED, arg="ueditor_0", timeout=WAIT_TIMEOUT_MS)
+        page.keyboard.type("x") 
+        waits.skip("editor_typed", 0.2)
+        page.keyboard.press("Meta+A")
+        page.keyboard.press("Meta+V")
+        # 粘贴后编辑器会做格式清洗、图片上传替换，等 iframe 内 DOM 静默下来
+        waits.run("paste_settled", 3, page.evaluate, JS_DOM_QUIET, ["#ueditor_0", QUIET_MS, QUIET_TIMEOUT_MS])
 
 # 示例：如果您需要一个入口来调用它
 if __name__ == "__main__":
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# 文件名: workspace.py
+# 每个生成任务独立的输出目录 + 后台清理线程
+
+import os
+import shutil
+import threading
+import time
+import uuid
+
+# ================= ⚙️ 配置区域 =================
+WORKSPACE_MAX_AGE = 6 * 3600              # 超过这个秒数的任务目录会被清理
+WORKSPACE_QUOTA_BYTES = 500 * 1024 * 1024  # output/ 总占用上限，超出后从最旧的开始删
+WORKSPACE_GRACE = 120                     # 新建不足这个秒数的目录永不清理 (可能仍在写入)
+SWEEP_INTERVAL = 300
+
+
+def new_workspace(root):
+    """创建任务目录，返回 (job_id, 绝对路径)；job_id 以时间开头，按名字排序即按新旧排序"""
+    job_id = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    path = os.path.join(root, job_id)
+    os.makedirs(path)
+    return job_id, path
+
+
+def _dir_size(path):
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try: total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError: pass
+    return total
+
+
+def sweep(root, max_age=WORKSPACE_MAX_AGE, quota=WORKSPACE_QUOTA_BYTES, grace=WORKSPACE_GRACE, keep=None):
+    """
+    按年龄与磁盘配额清理任务目录，返回删除的 job_id 列表
+    keep: 返回仍在使用的目录名集合的函数 (排队 / 执行中的任务、待发布的任务)，这些目录跳过不删
+    """
+    now = time.time()
+    protected = keep() if keep else set()
+    workspaces = []
+    try: names = os.listdir(root)
+    except OSError: return []
+    for name in names:
+        path = os.path.join(root, name)
+        if not os.path.isdir(path): continue
+        try: mtime = os.path.getmtime(path)
+        except OSError: continue
+        workspaces.append((mtime, name, path, _dir_size(path)))
+    workspaces.sort()  # 最旧的在前
+
+    removed = []
+    total = sum(w[3] for w in workspaces)
+    for mtime, name, path, size in workspaces:
+        age = now - mtime
+        if age < grace: break
+        if name in protected: continue
+        if age > max_age or total > quota:
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(name)
+            total -= size
+    return removed
+
+
+class WorkspaceSweeper(threading.Thread):
+    """后台定时清理线程 (daemon)"""
+
+    def __init__(self, root, interval=SWEEP_INTERVAL, **limits):
+        super().__init__(name="workspace-sweeper", daemon=True)
+        self.root = root
+        self.interval = interval
+        self.limits = limits
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try: sweep(self.root, **self.limits)
+            except Exception: pass
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_sweeper = None
+_sweeper_lock = threading.Lock()
+
+
+def start_sweeper(root, **kwargs):
+    """启动进程内唯一的清理线程 (重复调用无副作用)"""
+    global _sweeper
+    with _sweeper_lock:
+        if _sweeper is None or not _sweeper.is_alive():
+            _sweeper = WorkspaceSweeper(root, **kwargs)
+            _sweeper.start()
+        return _sweeper
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+# 文件名: wsgi.py
+# 生产入口：gunicorn -c gunicorn.conf.py wsgi:app
+
+from server import create_app
+
+app = create_app()